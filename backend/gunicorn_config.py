@@ -43,6 +43,14 @@ def when_ready(server):
     """Called just after the server is started."""
     print("Gunicorn server is ready. Spawning workers")
 
+def worker_exit(server, worker):
+    """Called when a worker exits: write buffered video progress first."""
+    try:
+        from quiz.video_progress_buffer import flush
+        flush()
+    except Exception as e:
+        print(f"Could not flush video progress on worker exit: {e}")
+
 # SSL/TLS (handled by Render reverse proxy, not needed here)
 # keyfile = None
 # certfile = None
@@ -69,6 +69,39 @@ CACHES = {
     }
 }
 
+# Topic quiz live state (quiz/quiz_state.py): keep in-progress attempt state
+# in the cache and write answers behind on a background thread
+TOPIC_QUIZ_LIVE_STATE = True
+TOPIC_QUIZ_ASYNC_WRITES = True
+
+# Answer keys and topic question pools (quiz/answer_keys.py) are re-read from
+# the DB at least this often, even if no bump reached this worker (seconds)
+ANSWER_KEY_VERSION_TIMEOUT = 60 * 5
+
+# Leaderboards (quiz/leaderboard.py) are rebuilt from the DB this often
+LEADERBOARD_RECONCILE_SECONDS = 60 * 60
+
+# Buffered video heartbeats (quiz/video_progress_buffer.py) are written to
+# the DB by a background thread in each worker this often
+VIDEO_PROGRESS_FLUSH_SECONDS = 30
+
+# Tag-invalidated view caches (quiz/cache_tags.py) keep entries this long;
+# correctness comes from bumping tags on writes, not from expiry
+CACHE_TAGGED_TIMEOUT = 60 * 60 * 24
+
+# Workers keep hot catalog payloads in-process and re-check their tag
+# versions against the shared cache at most this often (seconds)
+CACHE_LOCAL_TTL = 5
+
+# App bootstrap endpoint (quiz/bootstrap_views.py): sections run on this
+# many threads, each with its own DB connection
+BOOTSTRAP_WORKERS = 6
+BOOTSTRAP_TIMEOUT_SECONDS = 10
+
+# Request query instrumentation (quiz/query_metrics.py): a statement run this
+# many times in one request is logged as a likely N+1
+QUERY_REPEAT_THRESHOLD = 5
+
 
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
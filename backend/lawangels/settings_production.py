@@ -158,8 +158,10 @@ else:
 
 # Use in-memory cache for development, Redis for production if available
 CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+# Whether all workers share one cache (the settings below depend on it)
+SHARED_CACHE = CACHE_BACKEND == 'django.core.cache.backends.redis.RedisCache'
 
-if CACHE_BACKEND == 'django.core.cache.backends.redis.RedisCache':
+if SHARED_CACHE:
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.redis.RedisCache',
@@ -180,6 +182,19 @@ else:
         }
     }
 
+# Topic quiz live state needs a cache shared by all workers; with the
+# per-process LocMemCache the attempt row stays the source of truth
+TOPIC_QUIZ_LIVE_STATE = SHARED_CACHE
+TOPIC_QUIZ_ASYNC_WRITES = os.getenv('TOPIC_QUIZ_ASYNC_WRITES', 'True') == 'True'
+
+# Leaderboards are updated in place in a shared cache; per-process caches
+# only see their own updates, so reconcile them with the DB more often
+LEADERBOARD_RECONCILE_SECONDS = 60 * 60 if SHARED_CACHE else 60 * 5
+
+# Cache tag bumps only reach other workers through a shared cache; with
+# per-process caches, fall back to short expiry for cross-worker freshness
+CACHE_TAGGED_TIMEOUT = 60 * 60 * 24 if SHARED_CACHE else 60 * 5
+
 # ============================================================================
 # SESSION CONFIGURATION - USE CACHE TO REDUCE DB LOAD
 # ============================================================================
@@ -14,6 +14,8 @@ from django.conf import settings
 from functools import wraps
 import traceback
 
+from quiz import query_metrics
+
 # Configure logger
 logger = logging.getLogger('quiz.requests')
 
@@ -27,7 +29,6 @@ class RequestContext:
     def reset(self):
         self.start_time = None
         self.models_accessed: Dict[str, List[Dict]] = {}
-        self.initial_query_count = 0
         self.final_query_count = 0
         self.request_method = None
         self.request_path = None
@@ -80,8 +81,13 @@ class DetailedRequestLoggingMiddleware:
     Middleware to log all HTTP requests and responses with model data access tracking
     
     Output format:
-    [22/Nov/2025 13:02:34] "POST /api/exam-attempts/ HTTP/1.1" 201 - 145ms - user:john - queries:8
+    [22/Nov/2025 13:02:34] "POST /api/exam-attempts/ HTTP/1.1" 201 - 145ms - user:john - queries:8 db:12.40ms dup:0
     Models: quiz.ExamAttempt: CREATE(1), quiz.Question: LIST(40)
+
+    Queries are counted by a quiz.query_metrics.QueryRecorder, so the counts
+    are also right with DEBUG=False. The summary is left on
+    request.query_stats for RequestTimingMiddleware's slow-request log and
+    added to the per-route totals behind /api/health/queries/.
     """
     
     def __init__(self, get_response):
@@ -96,24 +102,26 @@ class DetailedRequestLoggingMiddleware:
         _request_context.user_id = request.user.id if request.user.is_authenticated else None
         _request_context.user_username = request.user.username if request.user.is_authenticated else 'anonymous'
         
-        # Get initial query count
-        _request_context.initial_query_count = len(connection.queries)
-        
         # Log incoming request
         self._log_request_start(request)
         
+        recorder = query_metrics.QueryRecorder()
+        request.query_recorder = recorder
         try:
-            response = self.get_response(request)
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
             status_code = response.status_code
         except Exception as e:
             # Log error
             duration_ms = (time.time() - _request_context.start_time) * 1000
-            query_count = len(connection.queries) - _request_context.initial_query_count
+            query_stats = self._record_queries(request, recorder, duration_ms)
+            query_count = query_stats['queries']
             
             logger.error(
                 f"[{_request_context.request_method}] {_request_context.request_path} - "
                 f"ERROR ({type(e).__name__}) - {duration_ms:.2f}ms - "
-                f"user:{_request_context.user_username} - queries:{query_count}",
+                f"user:{_request_context.user_username} - queries:{query_count} "
+                f"db:{query_stats['db_ms']:.2f}ms",
                 exc_info=True,
                 extra={
                     'request_method': request.method,
@@ -124,15 +132,24 @@ class DetailedRequestLoggingMiddleware:
                     'error_message': str(e),
                     'models_accessed': _request_context.models_accessed,
                     'query_count': query_count,
+                    'db_ms': query_stats['db_ms'],
                 }
             )
             raise
         
         # Log response with model data
-        self._log_request_end(request, response)
+        self._log_request_end(request, response, recorder)
         
         return response
     
+    @staticmethod
+    def _record_queries(request: HttpRequest, recorder, duration_ms: float) -> Dict:
+        """Summarize the request's queries and add them to its route's totals"""
+        query_stats = recorder.summary()
+        request.query_stats = query_stats
+        query_metrics.record_request(query_metrics.route_name(request), query_stats, duration_ms)
+        return query_stats
+    
     def _log_request_start(self, request: HttpRequest):
         """Log incoming request details"""
         body_preview = ""
@@ -157,10 +174,11 @@ class DetailedRequestLoggingMiddleware:
             }
         )
     
-    def _log_request_end(self, request: HttpRequest, response: HttpResponse):
+    def _log_request_end(self, request: HttpRequest, response: HttpResponse, recorder):
         """Log response with model data access info"""
         duration_ms = (time.time() - _request_context.start_time) * 1000
-        query_count = len(connection.queries) - _request_context.initial_query_count
+        query_stats = self._record_queries(request, recorder, duration_ms)
+        query_count = query_stats['queries']
         _request_context.final_query_count = query_count
         
         # Main log line
@@ -170,7 +188,8 @@ class DetailedRequestLoggingMiddleware:
         main_log = (
             f"[{_request_context.request_method}] {_request_context.request_path} - "
             f"{status_code} {status_indicator} - {duration_ms:.2f}ms - "
-            f"user:{_request_context.user_username} - queries:{query_count}"
+            f"user:{_request_context.user_username} - queries:{query_count} "
+            f"db:{query_stats['db_ms']:.2f}ms dup:{query_stats['duplicates']}"
         )
         
         # Log level based on status code
@@ -191,10 +210,19 @@ class DetailedRequestLoggingMiddleware:
                 'user_username': _request_context.user_username,
                 'duration_ms': duration_ms,
                 'query_count': query_count,
+                'db_ms': query_stats['db_ms'],
+                'duplicate_queries': query_stats['duplicates'],
                 'models_accessed': _request_context.models_accessed,
             }
         )
         
+        # Same statement over and over: likely an N+1
+        for statement in query_stats['repeated']:
+            logger.warning(
+                f"  Repeated query ({statement['count']}x): {statement['sql'][:300]}",
+                extra={'request_path': request.path, 'repeated_count': statement['count']}
+            )
+        
         # Log model access if any
         if _request_context.models_accessed:
             model_summary = _request_context.get_model_summary()
@@ -23,8 +23,19 @@ class RequestTimingMiddleware(MiddlewareMixin):
             
             log_message = f"[API] {method} {path} - {status} - {duration:.2f}ms"
             
+            # Set by DetailedRequestLoggingMiddleware (logging_utils.py)
+            query_stats = getattr(request, 'query_stats', None)
+            if query_stats:
+                log_message += (
+                    f" - queries:{query_stats['queries']} db:{query_stats['db_ms']:.2f}ms"
+                    f" dup:{query_stats['duplicates']}"
+                )
+            
             # Log slower requests at higher log level
             if duration > 500:
+                if query_stats and query_stats['repeated']:
+                    worst = query_stats['repeated'][0]
+                    log_message += f" - repeated {worst['count']}x: {worst['sql'][:200]}"
                 logger.warning(log_message)
             else:
                 logger.info(log_message)
@@ -0,0 +1,238 @@
+"""
+Daily activity rollup (UserActivityDaily).
+
+Write paths call record_activity() with increments for the day the
+activity happened: starting and finishing topic quizzes and mock exams,
+each topic quiz answer (on the quiz write-behind queue), video watch time
+(when the heartbeat buffer is flushed), video completions and the first
+textbook progress save per textbook per day. Each call
+is one UPDATE ... SET field = field + n, with an INSERT the first time a
+user is active on a given day.
+
+Dashboards read a bounded date range (get_days), weekly sums over a
+bounded range grouped in the DB (get_weeks) or the user's totals
+(get_totals) from the rollup instead of the raw attempt and progress
+tables. backfill_user_activity rebuilds rows from those tables.
+
+Every write also sets the day's bit in the user's UserActivityBitmap
+(once per user per day, guarded by a cache marker); get_streaks reads the
+current and longest study streak from it without touching the daily rows.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, TruncDate, TruncWeek
+from django.utils import timezone
+
+from .activity_models import UserActivityBitmap, UserActivityDaily
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = (
+    'quizzes_started', 'quizzes_completed', 'questions_correct', 'questions_wrong',
+    'points_earned', 'quiz_seconds', 'exams_started', 'exams_completed', 'exams_scored', 'exams_passed',
+    'exam_score_sum', 'exam_seconds', 'video_seconds', 'videos_completed', 'textbooks_read',
+)
+
+# Mock exam pass mark used by the dashboards
+PASS_SCORE = 70
+
+# Outlives the day in any timezone, so a marker never hides a new day's bit
+ACTIVE_MARKER_TIMEOUT = 60 * 60 * 26
+
+
+def record_activity(user_id, when=None, **increments):
+    """Add increments to the user's row for the day of `when` (default: now)."""
+    when = when or timezone.now()
+    day = timezone.localdate(when)
+    updates = {field: F(field) + value for field, value in increments.items() if value}
+    rows = UserActivityDaily.objects.filter(user_id=user_id, date=day)
+    if not rows.update(last_activity_at=Greatest('last_activity_at', Value(when)), **updates):
+        try:
+            with transaction.atomic():
+                UserActivityDaily.objects.create(user_id=user_id, date=day, last_activity_at=when, **increments)
+        except IntegrityError:
+            # Another request created today's row first
+            rows.update(last_activity_at=Greatest('last_activity_at', Value(when)), **updates)
+    mark_active(user_id, day)
+
+
+def _marker_key(user_id, day):
+    return f'activity_day_{user_id}_{day.isoformat()}'
+
+
+def mark_active(user_id, day):
+    """Set the day's bit in the user's activity bitmap (a no-op after the first call per day)."""
+    key = _marker_key(user_id, day)
+    if cache.get(key):
+        return
+    with transaction.atomic():
+        bitmap = UserActivityBitmap.objects.select_for_update().filter(user_id=user_id).first()
+        if bitmap is None:
+            bitmap = UserActivityBitmap(user_id=user_id, start_date=_signup_date(user_id, day))
+        bitmap.set_day(day)
+        bitmap.save()
+    # Only once the bit is committed: if the request's transaction rolls
+    # back, the next write for this day sets it again
+    transaction.on_commit(lambda: cache.set(key, 1, ACTIVE_MARKER_TIMEOUT))
+
+
+def average_exam_score(values):
+    """Average score of the scored completed exams in a rollup row or sum (0 if none)."""
+    scored = values['exams_scored']
+    return round(values['exam_score_sum'] / scored) if scored else 0
+
+
+def _signup_date(user_id, default):
+    from django.contrib.auth.models import User
+
+    joined = User.objects.filter(pk=user_id).values_list('date_joined', flat=True).first()
+    return min(timezone.localdate(joined), default) if joined else default
+
+
+def get_streaks(user_id, today=None):
+    """Return (current streak, longest streak) in days from the user's activity bitmap."""
+    bitmap = UserActivityBitmap.objects.filter(user_id=user_id).first()
+    if bitmap is None:
+        return 0, 0
+    return bitmap.current_streak(today or timezone.localdate()), bitmap.longest_streak
+
+
+def get_days(user_id, start, end=None):
+    """Return {date: {field: value}} for the user's active days in [start, end]."""
+    rows = UserActivityDaily.objects.filter(user_id=user_id, date__gte=start)
+    if end is not None:
+        rows = rows.filter(date__lte=end)
+    return {row['date']: row for row in rows.values('date', 'last_activity_at', *COUNTER_FIELDS)}
+
+
+def get_weeks(user_id, start, end):
+    """Return {week start (Monday): {field: sum}} for the user's active weeks in [start, end], grouped in the DB."""
+    rows = (
+        UserActivityDaily.objects.filter(user_id=user_id, date__range=(start, end))
+        .annotate(week=TruncWeek('date'))
+        .order_by()
+        .values('week')
+        .annotate(last_activity_at=Max('last_activity_at'), **{field: Sum(field) for field in COUNTER_FIELDS})
+    )
+    return {row.pop('week'): row for row in rows}
+
+
+def get_totals(user_id):
+    """Sum of every counter over all of the user's days, plus last_activity_at."""
+    return UserActivityDaily.objects.filter(user_id=user_id).aggregate(
+        last_activity_at=Max('last_activity_at'),
+        **{field: Coalesce(Sum(field), 0) for field in COUNTER_FIELDS},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Backfill from the raw tables
+# ---------------------------------------------------------------------------
+
+def _grouped(queryset, user_field, moment, **aggregates):
+    """Yield ((user_id, date), {aggregate: value, 'last': max moment}) per user and day."""
+    rows = (
+        queryset.exclude(**{f'{moment}__isnull': True})
+        .annotate(day=TruncDate(moment))
+        .order_by()
+        .values(user_field, 'day')
+        .annotate(last=Max(moment), **aggregates)
+    )
+    for row in rows:
+        yield (row.pop(user_field), row.pop('day')), row
+
+
+def compute_days(user_ids=None):
+    """Build {(user_id, date): UserActivityDaily} from attempts, answers and progress rows."""
+    from .models import ExamAttempt
+    from .textbook_models import TextbookProgress
+    from .topic_models import TopicQuizAnswer, TopicQuizAttempt
+    from .video_models import VideoProgress
+
+    def scoped(queryset, user_field='user_id'):
+        return queryset if user_ids is None else queryset.filter(**{f'{user_field}__in': user_ids})
+
+    completed_at = Coalesce('completed_at', 'started_at')
+    ended_at = Coalesce('ended_at', 'started_at')
+    sources = [
+        _grouped(scoped(TopicQuizAttempt.objects.all()), 'user_id', 'started_at', quizzes_started=Count('id')),
+        _grouped(
+            scoped(TopicQuizAttempt.objects.filter(status='completed')).annotate(finished=completed_at),
+            'user_id', 'finished', quizzes_completed=Count('id'), points_earned=Sum('points_earned'),
+        ),
+        _grouped(
+            scoped(TopicQuizAnswer.objects.all(), 'attempt__user_id'), 'attempt__user_id', 'answered_at',
+            questions_correct=Count('id', filter=Q(is_correct=True)),
+            questions_wrong=Count('id', filter=Q(is_correct=False)),
+            quiz_seconds=Sum('time_spent_seconds'),
+        ),
+        _grouped(scoped(ExamAttempt.objects.all()), 'user_id', 'started_at', exams_started=Count('id')),
+        _grouped(
+            scoped(ExamAttempt.objects.filter(status='completed')).annotate(finished=ended_at),
+            'user_id', 'finished',
+            exams_completed=Count('id'),
+            exams_scored=Count('id', filter=Q(score__isnull=False)),
+            exams_passed=Count('id', filter=Q(score__gte=PASS_SCORE)),
+            exam_score_sum=Sum('score'),
+            exam_seconds=Sum('time_spent_seconds'),
+        ),
+        _grouped(scoped(VideoProgress.objects.all()), 'user_id', 'last_watched_at', video_seconds=Sum('watched_seconds')),
+        _grouped(
+            scoped(VideoProgress.objects.filter(is_completed=True)), 'user_id', 'completed_at',
+            videos_completed=Count('id'),
+        ),
+        _grouped(scoped(TextbookProgress.objects.all()), 'user_id', 'last_read_at', textbooks_read=Count('id')),
+    ]
+
+    days = {}
+    for source in sources:
+        for (user_id, date), values in source:
+            last = values.pop('last')
+            row = days.get((user_id, date))
+            if row is None:
+                row = days[(user_id, date)] = UserActivityDaily(user_id=user_id, date=date, last_activity_at=last)
+            row.last_activity_at = max(row.last_activity_at, last)
+            for field, value in values.items():
+                setattr(row, field, getattr(row, field) + (value or 0))
+    return days
+
+
+def compute_bitmaps(days):
+    """Build {user_id: UserActivityBitmap} from {(user_id, date): ...} day keys."""
+    from django.contrib.auth.models import User
+
+    dates_by_user = {}
+    for user_id, date in days:
+        dates_by_user.setdefault(user_id, []).append(date)
+    joined = dict(User.objects.filter(pk__in=list(dates_by_user)).values_list('pk', 'date_joined'))
+
+    bitmaps = {}
+    for user_id, dates in dates_by_user.items():
+        start = min(dates)
+        if joined.get(user_id):
+            start = min(start, timezone.localdate(joined[user_id]))
+        bitmap = bitmaps[user_id] = UserActivityBitmap(user_id=user_id, start_date=start)
+        for date in sorted(dates):
+            bitmap.set_day(date)
+    return bitmaps
+
+
+def rebuild(user_ids=None):
+    """Replace the rollup and bitmaps (for some users, or everyone) with rows computed from the raw tables."""
+    days = compute_days(user_ids)
+    bitmaps = compute_bitmaps(days)
+    with transaction.atomic():
+        for model in (UserActivityDaily, UserActivityBitmap):
+            existing = model.objects.all()
+            if user_ids is not None:
+                existing = existing.filter(user_id__in=user_ids)
+            existing.delete()
+        UserActivityDaily.objects.bulk_create(days.values(), batch_size=1000)
+        UserActivityBitmap.objects.bulk_create(bitmaps.values(), batch_size=1000)
+    # Buffered activity isn't in the raw tables yet; let today's next write set its bit again
+    cache.delete_many([_marker_key(user_id, timezone.localdate()) for user_id in bitmaps])
+    logger.info(f"[ACTIVITY] Rebuilt {len(days)} daily activity rows and {len(bitmaps)} bitmaps")
+    return len(days)
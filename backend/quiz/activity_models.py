@@ -0,0 +1,109 @@
+"""
+Daily per-user activity rollup and the per-user activity bitmap used for
+streaks. Both are updated incrementally from the quiz, exam and video
+write paths (see quiz/activity.py) so dashboards read a few rows per user
+instead of scanning attempts, answers and progress tables.
+"""
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class UserActivityDaily(models.Model):
+    """One row per user per (local) day with counters for that day's study activity."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    date = models.DateField()
+
+    # Topic quizzes
+    quizzes_started = models.IntegerField(default=0)
+    quizzes_completed = models.IntegerField(default=0)
+    questions_correct = models.IntegerField(default=0)
+    questions_wrong = models.IntegerField(default=0)
+    points_earned = models.IntegerField(default=0)
+    quiz_seconds = models.IntegerField(default=0)
+
+    # Mock exams
+    exams_started = models.IntegerField(default=0)
+    exams_completed = models.IntegerField(default=0)
+    # Completed exams with a score (the denominator for average scores)
+    exams_scored = models.IntegerField(default=0)
+    exams_passed = models.IntegerField(default=0)
+    exam_score_sum = models.IntegerField(default=0, help_text='Sum of completed exam scores (for averages)')
+    exam_seconds = models.IntegerField(default=0)
+
+    # Videos and reading
+    video_seconds = models.IntegerField(default=0)
+    videos_completed = models.IntegerField(default=0)
+    textbooks_read = models.IntegerField(default=0)
+
+    last_activity_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['user', 'date']
+        verbose_name = "User Activity (Daily)"
+        verbose_name_plural = "User Activity (Daily)"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date}"
+
+
+class UserActivityBitmap(models.Model):
+    """
+    One bit per day since the user signed up, set when they were active that
+    day (bit i is start_date + i days, little-endian). Streaks are bit
+    operations on the whole map; longest_streak is kept up to date as bits are set.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='activity_bitmap')
+    start_date = models.DateField()
+    bits = models.BinaryField(default=b'')
+    longest_streak = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "User Activity Bitmap"
+        verbose_name_plural = "User Activity Bitmaps"
+
+    def __str__(self):
+        return f"{self.user_id} - since {self.start_date}"
+
+    def _int(self):
+        return int.from_bytes(bytes(self.bits or b''), 'little')
+
+    def _store(self, value):
+        self.bits = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+    def set_day(self, day):
+        """Mark a day active (extending the map backwards if needed) and update longest_streak."""
+        value = self._int()
+        if day < self.start_date:
+            value <<= (self.start_date - day).days
+            self.start_date = day
+        index = (day - self.start_date).days
+        value |= 1 << index
+        self._store(value)
+        self.longest_streak = max(self.longest_streak, _run_length(value, index))
+
+    def is_active(self, day):
+        index = (day - self.start_date).days
+        return index >= 0 and bool(self._int() >> index & 1)
+
+    def current_streak(self, today):
+        """Consecutive active days ending today (or yesterday, if today has no activity yet)."""
+        value = self._int()
+        index = (today - self.start_date).days
+        if index >= 0 and not value >> index & 1:
+            index -= 1
+        if index < 0 or not value >> index & 1:
+            return 0
+        # Highest clear bit at or below index ends the run
+        clear = ~value & ((1 << (index + 1)) - 1)
+        return index - (clear.bit_length() - 1)
+
+
+def _run_length(value, index):
+    """Length of the run of set bits containing bit `index`."""
+    clear_below = ~value & ((1 << index) - 1)
+    below = index - clear_below.bit_length()
+    above = value >> index
+    # Lowest clear bit of `above` is the first inactive day after the run
+    above_run = (~above & (above + 1)).bit_length() - 1
+    return below + above_run
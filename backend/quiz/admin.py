@@ -3,10 +3,14 @@ from .models import (
     Exam, Question, QuestionOption, ExamAttempt,
     QuestionAnswer, ExamTimingConfig, Review
 )
-from .topic_models import UserGameProfile, TopicQuizAttempt, TopicQuizAnswer
+from .topic_models import UserGameProfile, TopicQuizAttempt, TopicQuizAnswer, UserAreaMastery, UserTopicMastery
 from .textbook_models import Textbook
 from .video_models import VideoCourse, Video, VideoProgress, CourseProgress
 from .chat_models import ChatConversation, ChatMessage
+from .analytics_models import QuestionStatistics, ExamScoreHistogram
+from .activity_models import UserActivityBitmap, UserActivityDaily
+from .resume_models import UserResumePointer
+from .rescoring import rescore_exams
 
 
 class QuestionOptionInline(admin.TabularInline):
@@ -28,6 +32,14 @@ class ExamAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description']
     inlines = [QuestionInline]
     readonly_fields = ['total_questions', 'created_at', 'updated_at']
+    actions = ['rescore_attempts']
+
+    @admin.action(description='Rescore attempts for selected exams')
+    def rescore_attempts(self, request, queryset):
+        results = rescore_exams(queryset.values_list('id', flat=True))
+        attempts = sum(len(r['changed_attempts']) for r in results)
+        answers = sum(r['stale_answers'] for r in results)
+        self.message_user(request, f'Rescored {answers} answers across {attempts} attempts.')
 
 
 @admin.register(Question)
@@ -98,6 +110,46 @@ class QuestionAnswerAdmin(admin.ModelAdmin):
     readonly_fields = ['is_correct', 'answered_at']
 
 
+@admin.register(QuestionStatistics)
+class QuestionStatisticsAdmin(admin.ModelAdmin):
+    list_display = ['question', 'exam', 'responses', 'p_value', 'discrimination', 'flag', 'updated_at']
+    list_filter = ['flag', 'exam']
+    search_fields = ['question__text', 'exam__title']
+    ordering = ['exam', 'question__question_number']
+    readonly_fields = [
+        'question', 'exam', 'responses', 'correct_responses', 'p_value', 'discrimination', 'flag',
+        'distractor_frequencies', 'score_sum_correct', 'score_sum_incorrect', 'score_sum_squares',
+        'option_counts', 'last_attempt_ended_at', 'updated_at',
+    ]
+    fieldsets = (
+        ('Question', {
+            'fields': ('question', 'exam', 'flag')
+        }),
+        ('Statistics', {
+            'fields': ('responses', 'correct_responses', 'p_value', 'discrimination', 'distractor_frequencies')
+        }),
+        ('Accumulators', {
+            'fields': (
+                'score_sum_correct', 'score_sum_incorrect', 'score_sum_squares',
+                'option_counts', 'last_attempt_ended_at', 'updated_at',
+            ),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ExamScoreHistogram)
+class ExamScoreHistogramAdmin(admin.ModelAdmin):
+    list_display = ['exam', 'total', 'updated_at']
+    readonly_fields = ['exam', 'counts', 'total', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(ExamTimingConfig)
 class ExamTimingConfigAdmin(admin.ModelAdmin):
     list_display = ['default_duration_minutes', 'default_speed_reader_seconds', 'allow_custom_timing']
@@ -210,6 +262,48 @@ class TopicQuizAnswerAdmin(admin.ModelAdmin):
     readonly_fields = ['answered_at']
 
 
+@admin.register(UserAreaMastery)
+class UserAreaMasteryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'area', 'mastery', 'answered', 'correct', 'updated_at']
+    list_filter = ['area__topic']
+    search_fields = ['user__username']
+    raw_id_fields = ['user', 'area']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(UserTopicMastery)
+class UserTopicMasteryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'topic', 'quizzes_started', 'quizzes_completed', 'answered', 'correct', 'best_score', 'last_activity_at']
+    list_filter = ['topic']
+    search_fields = ['user__username']
+    raw_id_fields = ['user', 'topic']
+
+
+@admin.register(UserActivityDaily)
+class UserActivityDailyAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'quizzes_completed', 'exams_completed', 'questions_correct', 'questions_wrong', 'last_activity_at']
+    list_filter = ['date']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+    date_hierarchy = 'date'
+
+
+@admin.register(UserActivityBitmap)
+class UserActivityBitmapAdmin(admin.ModelAdmin):
+    list_display = ['user', 'start_date', 'longest_streak', 'updated_at']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+    readonly_fields = ['bits', 'updated_at']
+
+
+@admin.register(UserResumePointer)
+class UserResumePointerAdmin(admin.ModelAdmin):
+    list_display = ['user', 'textbook', 'video', 'quiz_attempt', 'updated_at']
+    search_fields = ['user__username']
+    raw_id_fields = ['user', 'textbook', 'video', 'quiz_attempt']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(Textbook)
 class TextbookAdmin(admin.ModelAdmin):
     list_display = ['title', 'subject', 'category', 'file_name', 'order']
@@ -0,0 +1,87 @@
+"""
+Materialized analytics for mock exams.
+Populated by batch jobs (see quiz/item_statistics.py) so admin views and
+question selection can read results without scanning QuestionAnswer.
+"""
+from django.db import models
+
+from .models import Exam, Question
+
+
+class QuestionStatistics(models.Model):
+    """
+    Classical item statistics for a mock exam question.
+
+    The raw accumulators are stored alongside the derived metrics so the
+    table can be refreshed incrementally from newly completed attempts.
+    """
+    FLAG_NONE = ''
+    FLAG_TOO_EASY = 'too_easy'
+    FLAG_TOO_HARD = 'too_hard'
+    FLAG_LOW_DISCRIMINATION = 'low_discrimination'
+    FLAG_POSSIBLE_MISKEY = 'possible_miskey'
+    FLAG_CHOICES = [
+        (FLAG_NONE, 'OK'),
+        (FLAG_TOO_EASY, 'Too easy'),
+        (FLAG_TOO_HARD, 'Too hard'),
+        (FLAG_LOW_DISCRIMINATION, 'Low discrimination'),
+        (FLAG_POSSIBLE_MISKEY, 'Possible mis-key'),
+    ]
+
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='statistics')
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='question_statistics')
+
+    # Accumulators (responses from completed attempts)
+    responses = models.IntegerField(default=0)
+    correct_responses = models.IntegerField(default=0)
+    score_sum_correct = models.FloatField(default=0)
+    score_sum_incorrect = models.FloatField(default=0)
+    score_sum_squares = models.FloatField(default=0)
+    option_counts = models.JSONField(default=dict, blank=True, help_text='Selections per option label')
+
+    # Derived metrics
+    p_value = models.FloatField(null=True, blank=True, help_text='Proportion of responses that were correct')
+    discrimination = models.FloatField(null=True, blank=True, help_text='Point-biserial correlation with attempt score')
+    flag = models.CharField(max_length=30, choices=FLAG_CHOICES, blank=True, default=FLAG_NONE, db_index=True)
+
+    # Watermark for incremental refresh, and the attempts already counted
+    # that ended within WATERMARK_OVERLAP of it (quiz/item_statistics.py)
+    last_attempt_ended_at = models.DateTimeField(null=True, blank=True)
+    recent_attempt_ids = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Question Statistics"
+        verbose_name_plural = "Question Statistics"
+        indexes = [
+            models.Index(fields=['exam', 'flag']),
+        ]
+
+    def __str__(self):
+        return f"Q{self.question_id} - p={self.p_value} r={self.discrimination}"
+
+    @property
+    def distractor_frequencies(self):
+        """Share of responses per option label"""
+        if not self.responses:
+            return {}
+        return {label: round(count / self.responses, 3) for label, count in sorted(self.option_counts.items())}
+
+
+class ExamScoreHistogram(models.Model):
+    """
+    Distribution of completed-attempt scores for an exam.
+    counts[s] is the number of completed attempts that scored s (0-100).
+    Updated incrementally as attempts complete (see quiz/score_percentiles.py).
+    """
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name='score_histogram')
+    counts = models.JSONField(default=list, blank=True)
+    total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Exam Score Histogram"
+        verbose_name_plural = "Exam Score Histograms"
+
+    def __str__(self):
+        return f"{self.exam.title} ({self.total} attempts)"
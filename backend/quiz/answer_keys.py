@@ -0,0 +1,130 @@
+"""
+Versioned answer-key cache.
+
+Grading only needs ``question_id -> correct_answer``. Answer keys are loaded
+once per worker, shared between workers through the Django cache, and
+invalidated by bumping a version number when a question is edited
+(see quiz/signals.py). The submit-answer feedback payloads of an exam's
+questions are cached the same way, under the exam's version.
+
+Version tokens expire after ANSWER_KEY_VERSION_TIMEOUT and worker-local
+copies are dropped after the same time. With a per-process cache
+(LocMemCache) a bump in one worker never reaches the others, so this
+bounds how long another worker can grade against an old key. Bulk imports
+bypass the signals and call bump_all_versions() (via counters.reconcile_all).
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Per-worker copies: (namespace, ident, kind) -> (version, loaded_at, data)
+_local_keys = {}
+
+
+def version_timeout():
+    return getattr(settings, 'ANSWER_KEY_VERSION_TIMEOUT', 60 * 5)
+
+
+def _version_key(namespace, ident):
+    return f'answer_key_version_{namespace}_{ident}'
+
+
+def current_version(namespace, ident):
+    """Version token for a namespace ('exam' or 'topic'); changes whenever its questions change."""
+    key = _version_key(namespace, ident)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def _get_versioned(namespace, ident, kind, loader):
+    version = current_version(namespace, ident)
+    local = _local_keys.get((namespace, ident, kind))
+    if local is not None and local[0] == version and time.monotonic() - local[1] < version_timeout():
+        return local[2]
+
+    data_key = f'{kind}_{namespace}_{ident}_v{version}'
+    data = cache.get(data_key)
+    if data is None:
+        data = loader(ident)
+        # Outlives its version token only briefly; a new token means a reload
+        cache.set(data_key, data, version_timeout())
+        logger.debug(f"[ANSWER_KEY] Loaded {kind} for {namespace} {ident}: {len(data)} questions")
+
+    _local_keys[(namespace, ident, kind)] = (version, time.monotonic(), data)
+    return data
+
+
+def bump_version(namespace, ident):
+    cache.set(_version_key(namespace, ident), time.time_ns(), version_timeout())
+    for key in [key for key in _local_keys if key[:2] == (namespace, ident)]:
+        _local_keys.pop(key, None)
+
+
+def bump_all_versions():
+    """Bump every exam and topic answer key, for bulk imports that bypass signals."""
+    from .models import Exam
+    from .practice_question_models import PracticeQuestionTopic
+
+    version = time.time_ns()
+    keys = [_version_key('exam', exam_id) for exam_id in Exam.objects.values_list('id', flat=True)]
+    keys += [
+        _version_key('topic', slug)
+        for slug in set(PracticeQuestionTopic.objects.values_list('slug', flat=True))
+    ]
+    cache.set_many(dict.fromkeys(keys, version), version_timeout())
+    _local_keys.clear()
+
+
+def _load_exam_key(exam_id):
+    from .models import Question
+    return dict(Question.objects.filter(exam_id=exam_id).values_list('id', 'correct_answer'))
+
+
+def _load_exam_feedback(exam_id):
+    from .models import Question
+    from .serializers import QuestionForAttemptSerializer
+    questions = Question.objects.filter(exam_id=exam_id).prefetch_related('options')
+    return {
+        question['id']: question
+        for question in QuestionForAttemptSerializer(questions, many=True).data
+    }
+
+
+def _load_topic_key(topic_slug):
+    from .practice_question_models import PracticeQuestion
+    return dict(
+        PracticeQuestion.objects.filter(area__topic__slug=topic_slug).values_list('id', 'correct_answer')
+    )
+
+
+def get_exam_answer_key(exam_id):
+    """Return {question_id: correct_answer} for a mock exam."""
+    return _get_versioned('exam', exam_id, 'answer_key', _load_exam_key)
+
+
+def get_exam_question_feedback(exam_id, question_id):
+    """
+    Return the submit-answer feedback payload of a mock exam question
+    (QuestionForAttemptSerializer data, including the answer), or None.
+    """
+    return _get_versioned('exam', exam_id, 'answer_feedback', _load_exam_feedback).get(question_id)
+
+
+def get_topic_answer_key(topic_slug):
+    """Return {practice_question_pk: correct_answer} for a practice topic."""
+    return _get_versioned('topic', topic_slug, 'answer_key', _load_topic_key)
+
+
+def invalidate_exam_answer_key(exam_id):
+    bump_version('exam', exam_id)
+
+
+def invalidate_topic_answer_key(topic_slug):
+    bump_version('topic', topic_slug)
@@ -0,0 +1,155 @@
+"""
+App bootstrap endpoint.
+
+GET /api/bootstrap/?sections=dashboard,continue_learning,my_courses,game_profile,me
+
+On load the frontend needs several payloads that each have their own
+endpoint. This endpoint authenticates once and runs the requested
+sections' existing views concurrently on a small thread pool, passing the
+already-authenticated user through (so sections skip JWT / session
+authentication). Each thread uses its own DB connection, closed after the
+section by close_old_connections(). Section queries are recorded into the
+request's query recorder (quiz/query_metrics.py).
+
+Sections share the request's deadline (BOOTSTRAP_TIMEOUT_SECONDS). Sections
+still queued when the request gives up are cancelled, and a section whose
+thread only starts after the deadline is skipped, so one slow request's
+sections don't keep the pool busy with work nobody will read.
+
+Response: {"sections": {name: {"status", "data", "ms"}}, "ms": total}.
+A failing or slow section reports its own status (500 / 504) without
+failing the others.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework import status
+
+from auth_app.views import AuthViewSet
+from .billing_views import SubscriptionStatusView
+from .dashboard_views import DashboardViewSet
+from .my_courses_views import MyCoursesViewSet
+from . import query_metrics
+from .topic_views import UserGameProfileViewSet
+
+logger = logging.getLogger(__name__)
+
+# section -> view callable (built once; DRF views are safe to share across threads)
+SECTIONS = {
+    'dashboard': DashboardViewSet.as_view({'get': 'list'}),
+    'continue_learning': DashboardViewSet.as_view({'get': 'continue_learning'}),
+    'my_courses': MyCoursesViewSet.as_view({'get': 'list'}),
+    'game_profile': UserGameProfileViewSet.as_view({'get': 'list'}),
+    'me': AuthViewSet.as_view({'get': 'me'}),
+    'subscription': SubscriptionStatusView.as_view(),
+}
+DEFAULT_SECTIONS = ('dashboard', 'continue_learning', 'my_courses', 'game_profile', 'me')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BOOTSTRAP_WORKERS', 6), thread_name_prefix='bootstrap'
+                )
+    return _executor
+
+
+def _section_request(request):
+    """A bare GET request for a section view, carrying the caller's authentication."""
+    section_request = HttpRequest()
+    section_request.method = 'GET'
+    section_request.path = request.path
+    section_request.META = request.META.copy()
+    section_request.GET = QueryDict()
+    section_request.COOKIES = request.COOKIES
+    if request.user.is_authenticated:
+        # DRF's Request honours these and skips its authenticators
+        section_request._force_auth_user = request.user
+        section_request._force_auth_token = request.auth
+    return section_request
+
+
+def _run_section(view, section_request, recorder, deadline):
+    if time.monotonic() >= deadline:
+        # The request already answered 504 for this section
+        return None
+    started = time.perf_counter()
+    try:
+        with query_metrics.recording(recorder):
+            response = view(section_request)
+        return {
+            'status': response.status_code,
+            'data': getattr(response, 'data', None),
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+    finally:
+        # Pool threads outlive requests; release the connection like the request cycle would
+        close_old_connections()
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def bootstrap(request):
+    """Assemble several page payloads in one round trip (see the module docstring)."""
+    started = time.perf_counter()
+    requested = request.query_params.get('sections')
+    names = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(DEFAULT_SECTIONS)
+    unknown = [name for name in names if name not in SECTIONS]
+    if unknown:
+        return Response(
+            {'error': f"Unknown sections: {', '.join(unknown)}", 'available': sorted(SECTIONS)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    names = list(dict.fromkeys(names))
+
+    executor = _get_executor()
+    recorder = getattr(request, 'query_recorder', None)
+    timeout = getattr(settings, 'BOOTSTRAP_TIMEOUT_SECONDS', 10)
+    deadline = time.monotonic() + timeout
+    futures = {
+        name: executor.submit(_run_section, SECTIONS[name], _section_request(request), recorder, deadline)
+        for name in names
+    }
+    wait(futures.values(), timeout=timeout)
+
+    sections = {}
+    for name, future in futures.items():
+        if not future.done():
+            # Frees the pool slot if the section hasn't started yet
+            future.cancel()
+            logger.warning(f"[BOOTSTRAP] Section {name} timed out")
+            sections[name] = {'status': status.HTTP_504_GATEWAY_TIMEOUT, 'data': None, 'ms': None}
+            continue
+        try:
+            # None: skipped at the deadline, just after wait() returned
+            sections[name] = future.result() or {
+                'status': status.HTTP_504_GATEWAY_TIMEOUT, 'data': None, 'ms': None,
+            }
+        except Exception as e:
+            logger.error(f"[BOOTSTRAP] Section {name} failed: {str(e)}", exc_info=True)
+            sections[name] = {
+                'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                'data': {'error': 'Section failed'},
+                'ms': None,
+            }
+
+    response = Response({
+        'sections': sections,
+        'ms': round((time.perf_counter() - started) * 1000, 1),
+    })
+    response['Cache-Control'] = 'private, no-store'
+    return response
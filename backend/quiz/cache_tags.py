@@ -0,0 +1,318 @@
+"""
+Tag-versioned cache for view data.
+
+Every cached value declares the tags it depends on, e.g. ``user:42``,
+``deck:7`` or ``catalog:videos``. Each tag has a version token in the
+cache, and a value's key embeds the current token of each of its tags, so
+bumping a tag makes every value built under the old token unreachable.
+Stale entries are never deleted; they age out of the cache.
+
+Tags are bumped from model signals (quiz/signals.py) and from the few write
+paths that bypass signals (bulk updates). Because invalidation is explicit,
+values can be cached for CACHE_TAGGED_TIMEOUT instead of a few minutes.
+
+Hot catalog payloads pass local=True to add a worker-local tier in front
+of the shared cache. The worker keeps the tag versions it last saw and
+re-checks them against the shared cache at most every CACHE_LOCAL_TTL
+seconds. Local values are keyed by the versioned key, so a newer version
+is never served an old value. Between checks a hit needs no network I/O,
+and another worker's bump is seen at most CACHE_LOCAL_TTL seconds late.
+Per-user data stays shared-only so users always read their own writes.
+Local values are shared between requests; callers must not mutate them.
+
+The shared tier goes through get_or_compute(), which protects recomputes
+from stampedes in three ways:
+- Single flight: one worker recomputes a missing value under a cache.add
+  lock. The others wait for its result.
+- Early refresh: entries remember how long they took to compute. Shortly
+  before expiry one request refreshes the entry early, with probability
+  rising as expiry nears (XFetch).
+- Serve stale: catalog payloads (local=True) keep their latest value under
+  a version-less key. It is served while another worker recomputes after a
+  bump, instead of making the request wait.
+
+Usage:
+
+    data = get_or_set('flashcard_decks', [user_tag(user.id), CATALOG_FLASHCARDS], build)
+    topics = get_or_set('flashcard_topics', [CATALOG_FLASHCARDS], build_topics, local=True)
+
+stats() reports this worker's hits and misses per tier.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .local_cache import LocalLRU
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MAX_TAGS = 256
+LOCAL_MAX_VALUES = 128
+
+# A recompute holds its lock at most this long
+COMPUTE_LOCK_TIMEOUT = 30
+# Waiters give up and compute themselves after this long
+COMPUTE_WAIT_SECONDS = 5
+COMPUTE_POLL_SECONDS = 0.05
+# XFetch: higher values refresh earlier
+EARLY_REFRESH_BETA = 1.0
+
+CATALOG_VIDEOS = 'catalog:videos'
+CATALOG_FLASHCARDS = 'catalog:flashcards'
+CATALOG_SUMMARY_NOTES = 'catalog:summary_notes'
+CATALOG_PRACTICE = 'catalog:practice'
+CATALOG_EXAMS = 'catalog:exams'
+CATALOG_TEXTBOOKS = 'catalog:textbooks'
+CATALOG_TAGS = (
+    CATALOG_VIDEOS, CATALOG_FLASHCARDS, CATALOG_SUMMARY_NOTES, CATALOG_PRACTICE, CATALOG_EXAMS, CATALOG_TEXTBOOKS,
+)
+
+
+def user_tag(user_id):
+    return f'user:{user_id}' if user_id is not None else None
+
+
+def deck_tag(deck_id):
+    return f'deck:{deck_id}' if deck_id is not None else None
+
+
+def summary_notes_tag(summary_notes_id):
+    return f'summary_notes:{summary_notes_id}' if summary_notes_id is not None else None
+
+
+def resume_tag(user_id):
+    return f'resume:{user_id}' if user_id is not None else None
+
+
+def _timeout():
+    return getattr(settings, 'CACHE_TAGGED_TIMEOUT', 60 * 60 * 24)
+
+
+def _local_ttl():
+    return getattr(settings, 'CACHE_LOCAL_TTL', 5)
+
+
+# tag -> (monotonic time last read from the shared cache, version token)
+_local_versions = LocalLRU(LOCAL_MAX_TAGS)
+# versioned key -> value
+_local_values = LocalLRU(LOCAL_MAX_VALUES)
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def stats():
+    """This worker's counters: hits and misses per tier, and shared version reads."""
+    with _stats_lock:
+        counters = dict(_stats)
+    return {
+        'local': {
+            'hits': counters.get('local_hits', 0),
+            'misses': counters.get('local_misses', 0),
+            'values': len(_local_values),
+            'tags': len(_local_versions),
+        },
+        'shared': {
+            'hits': counters.get('shared_hits', 0),
+            'misses': counters.get('shared_misses', 0),
+            'version_reads': counters.get('version_reads', 0),
+        },
+        'computes': {
+            'total': counters.get('computes', 0),
+            'early_refreshes': counters.get('early_refreshes', 0),
+            'waits': counters.get('compute_waits', 0),
+            'wait_timeouts': counters.get('compute_wait_timeouts', 0),
+            'stale_served': counters.get('stale_served', 0),
+        },
+    }
+
+
+def _version_key(tag):
+    return f'cache_tag_v_{tag}'
+
+
+def get_versions(tags):
+    """Return {tag: version token} from the shared cache, creating tokens for tags that have none."""
+    _count('version_reads')
+    keys = {tag: _version_key(tag) for tag in tags}
+    found = cache.get_many(list(keys.values()))
+    versions = {tag: found[key] for tag, key in keys.items() if key in found}
+    missing = [tag for tag in tags if tag not in versions]
+    if missing:
+        # Always a fresh token, so an evicted version key can't bring back stale values
+        token = time.time_ns()
+        for tag in missing:
+            cache.add(keys[tag], token, None)
+        found = cache.get_many([keys[tag] for tag in missing])
+        versions.update({tag: found.get(keys[tag], token) for tag in missing})
+    return versions
+
+
+def _get_local_versions(tags):
+    """Versions for `tags` as last read by this worker, or None if any is missing or due a re-check."""
+    now = time.monotonic()
+    versions = {}
+    for tag in tags:
+        entry = _local_versions.get(tag)
+        if entry is None or now - entry[0] > _local_ttl():
+            return None
+        versions[tag] = entry[1]
+    return versions
+
+
+def _remember_versions(versions):
+    now = time.monotonic()
+    for tag, version in versions.items():
+        _local_versions.set(tag, (now, version))
+
+
+def _make_key(name, tags, versions):
+    return f'tagged_v2_{name}_' + '_'.join(f'{tag}={versions[tag]}' for tag in tags)
+
+
+def _stale_key(name, tags):
+    return f'tagged_v2_{name}_' + '_'.join(tags) + '_latest'
+
+
+# ---------------------------------------------------------------------------
+# Stampede-protected compute
+# ---------------------------------------------------------------------------
+
+def _should_refresh_early(expires_at, compute_seconds):
+    """XFetch: true with a probability that rises as expiry nears, scaled by compute time."""
+    # 1 - random() is in (0, 1], so the log is defined
+    return time.time() - compute_seconds * EARLY_REFRESH_BETA * math.log(1 - random.random()) >= expires_at
+
+
+def _compute_and_store(key, compute, timeout, stale_key):
+    started = time.monotonic()
+    value = compute()
+    _count('computes')
+    if value is not None:
+        entry = (value, time.time() + timeout, time.monotonic() - started)
+        entries = {key: entry}
+        if stale_key:
+            entries[stale_key] = entry
+        cache.set_many(entries, timeout)
+    return value
+
+
+def get_or_compute(key, compute, timeout, stale_key=None):
+    """
+    Return the value cached under `key`, or compute() it with stampede
+    protection (see the module docstring). If `stale_key` is given, the
+    latest value is also kept there and served while another worker
+    recomputes. A compute() result of None is returned but not cached.
+    """
+    return _get_or_compute(key, compute, timeout, stale_key)[0]
+
+
+def _get_or_compute(key, compute, timeout, stale_key):
+    """get_or_compute() returning (value, False if the value was served stale)."""
+    entry = cache.get(key)
+    if entry is not None:
+        _count('shared_hits')
+        value, expires_at, compute_seconds = entry
+        if _should_refresh_early(expires_at, compute_seconds) and cache.add(f'{key}_lock', 1, COMPUTE_LOCK_TIMEOUT):
+            _count('early_refreshes')
+            try:
+                return _compute_and_store(key, compute, timeout, stale_key), True
+            finally:
+                cache.delete(f'{key}_lock')
+        return value, True
+
+    _count('shared_misses')
+    deadline = time.monotonic() + COMPUTE_WAIT_SECONDS
+    waited = False
+    while not cache.add(f'{key}_lock', 1, COMPUTE_LOCK_TIMEOUT):
+        # Another worker is computing this value
+        if stale_key:
+            stale = cache.get(stale_key)
+            if stale is not None:
+                _count('stale_served')
+                return stale[0], False
+        if not waited:
+            _count('compute_waits')
+            waited = True
+        time.sleep(COMPUTE_POLL_SECONDS)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0], True
+        if time.monotonic() > deadline:
+            _count('compute_wait_timeouts')
+            logger.warning(f"[CACHE_TAGS] Gave up waiting for {key}, computing it here")
+            return _compute_and_store(key, compute, timeout, stale_key), True
+    try:
+        # The previous lock holder may have finished just before we got the lock
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0], True
+        return _compute_and_store(key, compute, timeout, stale_key), True
+    finally:
+        cache.delete(f'{key}_lock')
+
+
+def tagged_key(name, tags):
+    """Cache key for `name` under the current versions of `tags`."""
+    return _make_key(name, tags, get_versions(tags))
+
+
+def get_or_set(name, tags, compute, timeout=None, local=False):
+    """
+    Return the cached value for `name` under `tags`, or compute() and cache it.
+    None tags (e.g. an anonymous user's) are skipped. A compute() result of
+    None (e.g. not found) is returned but not cached. local=True also keeps
+    the value in this worker and serves the latest value while another worker
+    recomputes (see the module docstring).
+    """
+    tags = [tag for tag in tags if tag]
+    versions = _get_local_versions(tags) if local else None
+    if versions is None:
+        versions = get_versions(tags)
+        if local:
+            _remember_versions(versions)
+    key = _make_key(name, tags, versions)
+
+    if local:
+        value = _local_values.get(key)
+        if value is not None:
+            _count('local_hits')
+            return value
+        _count('local_misses')
+
+    stale_key = _stale_key(name, tags) if local else None
+    value, fresh = _get_or_compute(key, compute, timeout or _timeout(), stale_key)
+    if local and fresh and value is not None:
+        _local_values.set(key, value)
+    return value
+
+
+def _set_versions(tags):
+    versions = {tag: time.time_ns() for tag in tags}
+    cache.set_many({_version_key(tag): version for tag, version in versions.items()}, None)
+    # This worker sees its own bumps immediately
+    _remember_versions({tag: version for tag, version in versions.items() if _local_versions.get(tag) is not None})
+
+
+def bump(*tags):
+    """Invalidate everything cached under any of `tags`."""
+    tags = {tag for tag in tags if tag}
+    if not tags:
+        return
+    _set_versions(tags)
+    if transaction.get_connection().in_atomic_block:
+        # Again after commit, in case a reader cached uncommitted-state data meanwhile
+        transaction.on_commit(lambda: _set_versions(tags))
+    logger.debug(f"[CACHE_TAGS] Bumped {', '.join(sorted(tags))}")
@@ -0,0 +1,144 @@
+"""
+Denormalized content counters.
+
+VideoCourse.total_videos / total_duration_seconds, FlashcardDeck.total_cards,
+SummaryNotes.total_chapters and the PracticeQuestionArea / PracticeQuestionTopic
+question and area counts are stored on the parent row so list views and
+progress properties don't count children per object.
+
+Each recount is a single UPDATE ... SET = (SELECT COUNT(...)) for the
+affected parents, so it is idempotent and can't drift. Signals (see
+quiz/signals.py) schedule a recount when a child is created, deleted,
+moved or (de)activated; recounts are deduplicated per transaction.
+Bulk operations bypass signals - call reconcile_all() (or run
+reconcile_counters) after imports.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _child_aggregate(queryset, parent_field, aggregate=None):
+    """Correlated subquery aggregating children of OuterRef('pk')."""
+    rows = (
+        queryset.filter(**{parent_field: OuterRef('pk')})
+        .order_by()
+        .values(parent_field)
+        .annotate(value=aggregate or Count('pk'))
+        .values('value')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def _parents(model, ids):
+    queryset = model.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset
+
+
+def recount_video_courses(ids=None):
+    from .video_models import Video, VideoCourse
+    videos = Video.objects.filter(is_active=True)
+    return _parents(VideoCourse, ids).update(
+        total_videos=_child_aggregate(videos, 'course'),
+        total_duration_seconds=_child_aggregate(videos, 'course', Sum('duration_seconds')),
+    )
+
+
+def recount_flashcard_decks(ids=None):
+    from .flashcard_models import Flashcard, FlashcardDeck
+    return _parents(FlashcardDeck, ids).update(
+        total_cards=_child_aggregate(Flashcard.objects.filter(is_active=True), 'deck'),
+    )
+
+
+def recount_summary_notes(ids=None):
+    from .summary_notes_models import SummaryNotes, SummaryNotesChapter
+    return _parents(SummaryNotes, ids).update(
+        total_chapters=_child_aggregate(SummaryNotesChapter.objects.filter(is_active=True), 'summary_notes'),
+    )
+
+
+def recount_practice_topics(ids=None):
+    from .practice_question_models import PracticeQuestion, PracticeQuestionArea, PracticeQuestionTopic
+    return _parents(PracticeQuestionTopic, ids).update(
+        area_count=_child_aggregate(PracticeQuestionArea.objects.all(), 'topic'),
+        question_count=_child_aggregate(PracticeQuestion.objects.all(), 'area__topic'),
+    )
+
+
+def recount_practice_areas(ids=None):
+    """Recount areas and the topics they belong to."""
+    from .practice_question_models import PracticeQuestion, PracticeQuestionArea
+    updated = _parents(PracticeQuestionArea, ids).update(
+        question_count=_child_aggregate(PracticeQuestion.objects.all(), 'area'),
+    )
+    topic_ids = None
+    if ids is not None:
+        topic_ids = set(PracticeQuestionArea.objects.filter(pk__in=ids).values_list('topic_id', flat=True))
+    recount_practice_topics(topic_ids)
+    return updated
+
+
+RECOUNTS = {
+    'video_courses': recount_video_courses,
+    'flashcard_decks': recount_flashcard_decks,
+    'summary_notes': recount_summary_notes,
+    'practice_areas': recount_practice_areas,
+    'practice_topics': recount_practice_topics,
+}
+
+
+def reconcile_all():
+    """
+    Recompute every counter and invalidate cached catalog data, answer keys
+    and topic question pools. Returns {counter: rows updated}.
+    """
+    from .answer_keys import bump_all_versions
+    from .cache_tags import CATALOG_TAGS, bump
+
+    updated = {name: recount() for name, recount in RECOUNTS.items()}
+    # Bulk imports bypass the signals that bump catalog tags and answer-key
+    # versions (topic question pools share the topic versions)
+    bump_all_versions()
+    bump(*CATALOG_TAGS)
+    return updated
+
+
+# ---------------------------------------------------------------------------
+# Deduplicated scheduling (one UPDATE per parent type per transaction)
+# ---------------------------------------------------------------------------
+
+_pending = threading.local()
+
+
+def schedule_recount(recount, parent_ids):
+    """Run recount(parent_ids) now, or once on commit if inside a transaction."""
+    parent_ids = {parent_id for parent_id in parent_ids if parent_id is not None}
+    if not parent_ids:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        recount(parent_ids)
+        return
+
+    pending = getattr(_pending, 'recounts', None)
+    if pending is None:
+        pending = _pending.recounts = {}
+    pending.setdefault(recount, set()).update(parent_ids)
+    # One callback per call: a rolled-back transaction drops its callbacks,
+    # so the next transaction's call must still register one. The first to
+    # run takes the whole batch and the rest find it gone. (Ids left over
+    # from a rolled-back transaction are recounted then, which is harmless.)
+    transaction.on_commit(lambda: _run_pending(pending))
+
+
+def _run_pending(pending):
+    if getattr(_pending, 'recounts', None) is not pending:
+        return
+    _pending.recounts = None
+    for recount, parent_ids in pending.items():
+        recount(parent_ids)
@@ -5,11 +5,13 @@ from rest_framework.permissions import IsAuthenticated
 from django.db import models
 from django.db.models import Avg, Sum, Count, Max
 from django.utils import timezone
-from datetime import timedelta
 import logging
 
+from .cache_tags import CATALOG_EXAMS, get_or_set
 from .models import Exam, ExamAttempt
 from .serializers import ExamMinimalSerializer
+from .score_percentiles import get_percentiles
+from . import activity, resume
 
 logger = logging.getLogger(__name__)
 
@@ -28,118 +30,51 @@ class DashboardViewSet(viewsets.ViewSet):
         """
         Get complete dashboard data in a single optimized request.
         
-        OPTIMIZED: All data fetched in 4-5 queries total, ~200-400ms response time
+        OPTIMIZED: Stats come from the daily activity rollup (quiz/activity.py);
+        4 queries total, none of them scanning attempt or progress tables
         """
         user = request.user
         
-        # Import all needed models at once
-        from .topic_models import TopicQuizAttempt, TopicQuizAnswer
-        from .video_models import VideoProgress
-        from .textbook_models import TextbookProgress
-        
-        # === BATCH ALL QUERIES ===
-        
-        # Query 1: Get exam attempts (limited to recent for performance)
-        attempts = list(ExamAttempt.objects.filter(user=user).select_related('exam').order_by('-started_at')[:50])
+        # Query 1: Recent exam attempts for the activity feed
+        attempts = list(ExamAttempt.objects.filter(user=user).select_related('exam').order_by('-started_at')[:5])
         
         # Query 2: Get active exams
         active_exams = list(Exam.objects.filter(is_active=True).order_by('-created_at')[:3])
         
-        # Query 3: Get ALL aggregate stats in ONE query
-        # This combines quiz time, video time, and last activity dates
-        quiz_stats = TopicQuizAnswer.objects.filter(
-            attempt__user=user
-        ).aggregate(
-            quiz_time=Sum('time_spent_seconds')
-        )
-        
-        video_stats = VideoProgress.objects.filter(user=user).aggregate(
-            video_time=Sum('watched_seconds'),
-            last_video_date=models.Max('last_watched_at')
-        )
-        
-        # Query 4: Get last activity dates in batch
-        last_quiz = TopicQuizAttempt.objects.filter(user=user).order_by('-started_at').values('started_at').first()
-        last_textbook = TextbookProgress.objects.filter(user=user).order_by('-last_read_at').values('last_read_at').first()
-        
-        # Query 5: Get all activity dates for streak (use values_list for efficiency)
-        # Only fetch dates from last 60 days for streak calculation (optimization)
-        cutoff_date = timezone.now() - timedelta(days=60)
-        
-        all_activity_dates = set()
+        # Query 3: Lifetime totals from the rollup
+        totals = activity.get_totals(user.id)
         
-        # Exam dates from already-fetched attempts
-        for a in attempts:
-            if a.started_at:
-                all_activity_dates.add(a.started_at.date())
+        # Query 4: Study streaks from the activity bitmap
+        streak, longest_streak = activity.get_streaks(user.id)
         
-        # Quiz dates
-        for dt in TopicQuizAttempt.objects.filter(
-            user=user, started_at__gte=cutoff_date
-        ).values_list('started_at', flat=True):
-            if dt:
-                all_activity_dates.add(dt.date())
+        # === CALCULATE STATS FROM THE ROLLUP ===
         
-        # Video dates
-        for dt in VideoProgress.objects.filter(
-            user=user, last_watched_at__gte=cutoff_date
-        ).values_list('last_watched_at', flat=True):
-            if dt:
-                all_activity_dates.add(dt.date())
-        
-        # Textbook dates
-        for dt in TextbookProgress.objects.filter(
-            user=user, last_read_at__gte=cutoff_date
-        ).values_list('last_read_at', flat=True):
-            if dt:
-                all_activity_dates.add(dt.date())
-        
-        # === CALCULATE STATS FROM PREFETCHED DATA ===
-        
-        completed_attempts = [a for a in attempts if a.status == 'completed']
-        scores = [a.score for a in completed_attempts if a.score is not None]
-        
-        average_score = round(sum(scores) / len(scores)) if scores else 0
-        passed_count = len([s for s in scores if s >= 70])
-        pass_rate = round((passed_count / len(scores)) * 100) if scores else 0
+        completed_exams = totals['exams_completed']
+        average_score = activity.average_exam_score(totals)
+        scored_exams = totals['exams_scored']
+        pass_rate = round((totals['exams_passed'] / scored_exams) * 100) if scored_exams else 0
         
         # Calculate total study time
-        exam_time_seconds = sum(a.time_spent_seconds or 0 for a in completed_attempts)
-        quiz_time_seconds = quiz_stats['quiz_time'] or 0
-        video_time_seconds = video_stats['video_time'] or 0
-        total_time_seconds = exam_time_seconds + quiz_time_seconds + video_time_seconds
-        
-        # Calculate streak from pre-fetched dates
-        streak = self._calculate_streak_from_dates(all_activity_dates)
-        
-        # Get last active date
-        activity_dates = []
-        if attempts:
-            activity_dates.append(attempts[0].started_at)
-        if last_quiz and last_quiz['started_at']:
-            activity_dates.append(last_quiz['started_at'])
-        if video_stats['last_video_date']:
-            activity_dates.append(video_stats['last_video_date'])
-        if last_textbook and last_textbook['last_read_at']:
-            activity_dates.append(last_textbook['last_read_at'])
-        
-        last_active = max(activity_dates) if activity_dates else None
+        total_time_seconds = totals['exam_seconds'] + totals['quiz_seconds'] + totals['video_seconds']
+        
+        last_active = totals['last_activity_at']
         
         # Build response
         user_stats = {
-            'totalExams': len(attempts),
-            'completedExams': len(completed_attempts),
+            'totalExams': totals['exams_started'],
+            'completedExams': completed_exams,
             'averageScore': average_score,
             'totalTimeSpentMinutes': round(total_time_seconds / 60),
             'currentStreak': streak,
+            'longestStreak': longest_streak,
             'lastActiveDate': last_active.isoformat() if last_active else None,
             'passRate': pass_rate,
         }
         
         # Build recent activity from already-fetched attempts
         recent_activity = []
-        for attempt in attempts[:5]:
-            passed = attempt.score is not None and attempt.score >= 70
+        for attempt in attempts:
+            passed = attempt.score is not None and attempt.score >= activity.PASS_SCORE
             activity_type = 'quiz_passed' if attempt.status == 'completed' and passed else ('quiz_failed' if attempt.status == 'completed' else 'exam_started')
             
             recent_activity.append({
@@ -160,30 +95,6 @@ class DashboardViewSet(viewsets.ViewSet):
             'recentActivity': recent_activity,
             'upcomingExams': upcoming_exams,
         })
-    
-    def _calculate_streak_from_dates(self, dates):
-        """Calculate streak from pre-fetched date set (no DB queries)."""
-        if not dates:
-            return 0
-        
-        today = timezone.now().date()
-        streak = 0
-        current_date = today
-        
-        # Check if today or yesterday has activity
-        if today not in dates:
-            yesterday = today - timedelta(days=1)
-            if yesterday in dates:
-                current_date = yesterday
-            else:
-                return 0
-        
-        # Count consecutive days
-        while current_date in dates:
-            streak += 1
-            current_date -= timedelta(days=1)
-        
-        return streak
 
     @action(detail=False, methods=['get'])
     def mock_exams(self, request):
@@ -196,25 +107,17 @@ class DashboardViewSet(viewsets.ViewSet):
         - exams: List of exams with attempt stats (attemptsTaken, avgScore, bestScore, lastAttempt)
         - userStats: Overall user statistics
         
-        Performance: 2 database queries total + caching
+        Performance: 3 database queries total + caching
         """
-        from django.core.cache import cache
-        
         user = request.user
         
-        # Try cache for static exam data (30 min cache)
-        # Try cache for static exam data (30 min cache)
-        exams_cache_key = 'mock_exams_list_v2'
-        all_exams = cache.get(exams_cache_key)
-        
-        if all_exams is None:
-            # Query 1: Get ALL active exams
-            all_exams = list(Exam.objects.filter(is_active=True).values(
+        # Query 1: Get ALL active exams (cached until an exam changes)
+        all_exams = get_or_set('mock_exams_list', [CATALOG_EXAMS], lambda: list(
+            Exam.objects.filter(is_active=True).values(
                 'id', 'title', 'description', 'subject', 'category', 'duration_minutes',
                 'speed_reader_seconds', 'passing_score_percentage', 'total_questions', 'is_active'
-            ))
-            # Cache static exam data for 30 minutes
-            cache.set(exams_cache_key, all_exams, 1800)
+            )
+        ), local=True)
         
         # Query 2: Get ALL user attempts with exam data (user-specific, not cached long)
         attempts = list(ExamAttempt.objects.filter(user=user).select_related('exam').values(
@@ -238,19 +141,8 @@ class DashboardViewSet(viewsets.ViewSet):
         pass_rate = round((passed_count / len(scores)) * 100) if scores else 0
         total_time_seconds = sum(a['time_spent_seconds'] or 0 for a in completed_attempts)
         
-        # Calculate streak
-        dates = set()
-        for a in attempts:
-            if a['started_at']:
-                dates.add(a['started_at'].date())
-        
-        streak = 0
-        if dates:
-            today = timezone.now().date()
-            current = today if today in dates else today - timedelta(days=1)
-            while current in dates:
-                streak += 1
-                current -= timedelta(days=1)
+        # Study streak from the activity bitmap
+        streak, _ = activity.get_streaks(user.id)
         
         user_stats = {
             'totalExams': len(attempts),
@@ -261,6 +153,13 @@ class DashboardViewSet(viewsets.ViewSet):
             'passRate': pass_rate,
         }
         
+        # Percentile of the user's best score per exam (one cache round trip)
+        best_scores = {}
+        for a in completed_attempts:
+            if a['score'] is not None and a['score'] > best_scores.get(a['exam_id'], -1):
+                best_scores[a['exam_id']] = a['score']
+        percentiles = get_percentiles(best_scores)
+        
         # Enrich exams with attempt stats
         colors = ['blue', 'purple', 'green', 'red', 'yellow', 'indigo']
         enriched_exams = []
@@ -279,6 +178,7 @@ class DashboardViewSet(viewsets.ViewSet):
                 'attemptsTaken': len(completed),
                 'averageScore': round(sum(exam_scores) / len(exam_scores)) if exam_scores else 0,
                 'bestScore': max(exam_scores) if exam_scores else 0,
+                'bestScorePercentile': percentiles.get(exam['id']),
                 'lastAttempt': last_attempt.isoformat() if last_attempt else None,
                 'color': colors[idx % len(colors)],
             })
@@ -303,7 +203,8 @@ class DashboardViewSet(viewsets.ViewSet):
         - examProgress: List of completed exams with progress data
         - progressBySubject: Progress grouped by subject
         
-        Performance: 2 database queries total
+        Performance: 5 database queries total; stats come from the daily
+        activity rollup and per-exam/per-subject figures are grouped in the DB
         """
         user = request.user
         
@@ -315,53 +216,34 @@ class DashboardViewSet(viewsets.ViewSet):
             )
         }
         
-        # Query 2: Get ALL user attempts with exam data
-        attempts = list(ExamAttempt.objects.filter(user=user).select_related('exam').values(
-            'id', 'exam_id', 'status', 'score', 'time_spent_seconds', 'started_at', 'ended_at'
-        ))
+        # Queries 2-3: Lifetime totals from the rollup and the streak from the activity bitmap
+        totals = activity.get_totals(user.id)
+        streak, _ = activity.get_streaks(user.id)
         
-        # Calculate user stats from attempts (no additional queries)
-        completed_attempts = [a for a in attempts if a['status'] == 'completed']
-        scores = [a['score'] for a in completed_attempts if a['score'] is not None]
-        
-        average_score = round(sum(scores) / len(scores)) if scores else 0
-        passed_count = len([s for s in scores if s >= 70])
-        pass_rate = round((passed_count / len(scores)) * 100) if scores else 0
-        total_time_seconds = sum(a['time_spent_seconds'] or 0 for a in completed_attempts)
-        
-        # Calculate streak
-        dates = set()
-        for a in attempts:
-            if a['started_at']:
-                dates.add(a['started_at'].date())
-        
-        streak = 0
-        if dates:
-            today = timezone.now().date()
-            current = today if today in dates else today - timedelta(days=1)
-            while current in dates:
-                streak += 1
-                current -= timedelta(days=1)
-        
-        last_active = max([a['started_at'] for a in attempts if a['started_at']], default=None)
+        completed_exams = totals['exams_completed']
+        average_score = activity.average_exam_score(totals)
+        scored_exams = totals['exams_scored']
+        pass_rate = round((totals['exams_passed'] / scored_exams) * 100) if scored_exams else 0
+        last_active = totals['last_activity_at']
         
         user_stats = {
-            'totalExams': len(attempts),
-            'completedExams': len(completed_attempts),
+            'totalExams': totals['exams_started'],
+            'completedExams': completed_exams,
             'averageScore': average_score,
-            'totalTimeSpentMinutes': round(total_time_seconds / 60),
+            'totalTimeSpentMinutes': round(totals['exam_seconds'] / 60),
             'currentStreak': streak,
             'lastActiveDate': last_active.isoformat() if last_active else None,
             'passRate': pass_rate,
         }
         
-        # Build exam progress (best score per exam)
-        exam_best_scores = {}
-        for a in completed_attempts:
-            if a['score'] is not None:
-                exam_id = a['exam_id']
-                if exam_id not in exam_best_scores or a['score'] > exam_best_scores[exam_id]['score']:
-                    exam_best_scores[exam_id] = a
+        completed_attempts = ExamAttempt.objects.filter(
+            user=user, status='completed', score__isnull=False
+        ).order_by()
+        
+        # Query 4: Best score per exam
+        exam_best_scores = completed_attempts.values('exam_id').annotate(
+            best=Max('score'), last_started=Max('started_at')
+        )
         
         subject_names = {
             'land_law': 'Land Law',
@@ -376,34 +258,30 @@ class DashboardViewSet(viewsets.ViewSet):
         }
         
         exam_progress = []
-        for exam_id, attempt in exam_best_scores.items():
-            exam = all_exams.get(exam_id)
+        for row in exam_best_scores:
+            exam = all_exams.get(row['exam_id'])
             if exam:
                 subject = exam['subject']
                 exam_progress.append({
-                    'id': exam_id,
+                    'id': row['exam_id'],
                     'title': exam['title'],
-                    'progress': attempt['score'] or 0,
-                    'completed': round((attempt['score'] or 0) / 100 * exam['total_questions']),
+                    'progress': row['best'] or 0,
+                    'completed': round((row['best'] or 0) / 100 * exam['total_questions']),
                     'total': exam['total_questions'],
                     'subject': subject_names.get(subject, subject),
-                    'lastAccessed': attempt['started_at'].isoformat() if attempt['started_at'] else None,
-                    'score': attempt['score'],
+                    'lastAccessed': row['last_started'].isoformat() if row['last_started'] else None,
+                    'score': row['best'],
                 })
         
-        # Build progress by subject
-        subject_stats = {}
-        for a in completed_attempts:
-            if a['score'] is not None and a['exam_id'] in all_exams:
-                subject = all_exams[a['exam_id']]['subject']
-                if subject not in subject_stats:
-                    subject_stats[subject] = {'scores': [], 'count': 0}
-                subject_stats[subject]['scores'].append(a['score'])
-                subject_stats[subject]['count'] += 1
+        # Query 5: Progress by subject
+        subject_stats = completed_attempts.filter(exam__is_active=True).values('exam__subject').annotate(
+            avg_score=Avg('score'), count=Count('id')
+        )
         
         progress_by_subject = []
-        for subject, stats in subject_stats.items():
-            avg_score = round(sum(stats['scores']) / len(stats['scores'])) if stats['scores'] else 0
+        for stats in subject_stats:
+            subject = stats['exam__subject']
+            avg_score = round(stats['avg_score'] or 0)
             correct = round(avg_score / 100 * stats['count'] * 10)  # Approximate
             progress_by_subject.append({
                 'subject': subject_names.get(subject, subject),
@@ -426,169 +304,7 @@ class DashboardViewSet(viewsets.ViewSet):
         """
         Get data for 'Pick Up Where You Left Off' section.
         
-        Returns last activity for reading, videos, and practice.
-        """
-        user = request.user
-        
-        # Default response - no activity
-        reading_data = None
-        video_data = None
-        practice_data = None
-        
-        try:
-            # Get last in-progress quiz attempt
-            from .topic_models import TopicQuizAttempt
-            last_quiz = TopicQuizAttempt.objects.filter(
-                user=user,
-                status='in_progress'
-            ).order_by('-started_at').first()
-            
-            if last_quiz:
-                topic_names = {
-                    'land_law': 'Land Law',
-                    'trusts': 'Trusts',
-                    'criminal_law': 'Criminal Law',
-                    'criminal_practice': 'Criminal Practice',
-                    'professional_ethics': 'Professional Ethics',
-                    'solicitors_accounts': 'Solicitors Accounts',
-                    'taxation': 'Tax Law',
-                }
-                practice_data = {
-                    'subject': topic_names.get(last_quiz.topic, last_quiz.topic.replace('_', ' ').title()),
-                    'title': f'{last_quiz.topic.replace("_", " ").title()} Quiz',
-                    'current': last_quiz.current_question_index + 1,
-                    'total': last_quiz.total_questions,
-                    'progress': round((last_quiz.current_question_index / last_quiz.total_questions) * 100) if last_quiz.total_questions else 0,
-                    'href': f'/quiz/play/{last_quiz.topic}/{last_quiz.id}',
-                }
-        except Exception as e:
-            logger.warning(f"Error getting quiz progress: {e}")
-        
-        try:
-            # Get last video progress
-            from .video_models import VideoProgress, Video
-            last_video = VideoProgress.objects.filter(
-                user=user,
-                is_completed=False
-            ).select_related('video', 'video__course').order_by('-last_watched_at').first()
-            
-            if last_video and last_video.video:
-                # Calculate progress
-                total_videos = Video.objects.filter(
-                    course=last_video.video.course,
-                    is_active=True
-                ).count()
-                completed_videos = VideoProgress.objects.filter(
-                    user=user,
-                    video__course=last_video.video.course,
-                    is_completed=True
-                ).count()
-                progress = round((completed_videos / total_videos) * 100) if total_videos else 0
-                
-                video_data = {
-                    'subject': last_video.video.course.title if last_video.video.course else 'Video',
-                    'title': last_video.video.title,
-                    'current': completed_videos + 1,
-                    'total': total_videos,
-                    'progress': progress,
-                    'href': f'/video-tutorials/watch/{last_video.video.id}',
-                }
-        except Exception as e:
-            logger.warning(f"Error getting video progress: {e}")
-        
-        try:
-            # Get first available textbook as reading suggestion
-            from .textbook_models import Textbook
-            first_textbook = Textbook.objects.first()
-            if first_textbook:
-                reading_data = {
-                    'subject': first_textbook.subject,
-                    'title': first_textbook.title,
-                    'current': 1,
-                    'total': len(first_textbook.chapters) if first_textbook.chapters else 1,
-                    'progress': 0,
-                    'href': f'/textbook/{first_textbook.id}',
-                }
-        except Exception as e:
-            logger.warning(f"Error getting textbook: {e}")
-        
-        return Response({
-            'reading': reading_data,
-            'video': video_data,
-            'practice': practice_data,
-        })
-
-    def _calculate_streak(self, attempts):
+        Returns the reading, video and practice cards from the user's resume
+        pointer, which the progress write paths keep up to date (quiz/resume.py).
         """
-        Calculate consecutive days with ANY study activity.
-        Includes: exam attempts, topic quizzes, video watching.
-        """
-        dates = set()
-        
-        # 1. Exam attempt dates
-        for attempt in attempts:
-            dates.add(attempt.started_at.date())
-        
-        # 2. Topic quiz dates
-        try:
-            from .topic_models import TopicQuizAttempt
-            user = attempts[0].user if attempts else None
-            if user:
-                quiz_dates = TopicQuizAttempt.objects.filter(
-                    user=user
-                ).values_list('started_at', flat=True)
-                for dt in quiz_dates:
-                    if dt:
-                        dates.add(dt.date())
-        except Exception as e:
-            logger.warning(f"Error getting quiz dates for streak: {e}")
-        
-        # 3. Video watch dates
-        try:
-            from .video_models import VideoProgress
-            user = attempts[0].user if attempts else None
-            if user:
-                video_dates = VideoProgress.objects.filter(
-                    user=user
-                ).values_list('last_watched_at', flat=True)
-                for dt in video_dates:
-                    if dt:
-                        dates.add(dt.date())
-        except Exception as e:
-            logger.warning(f"Error getting video dates for streak: {e}")
-        
-        # 4. Textbook reading dates
-        try:
-            from .textbook_models import TextbookProgress
-            user = attempts[0].user if attempts else None
-            if user:
-                textbook_dates = TextbookProgress.objects.filter(
-                    user=user
-                ).values_list('last_read_at', flat=True)
-                for dt in textbook_dates:
-                    if dt:
-                        dates.add(dt.date())
-        except Exception as e:
-            logger.warning(f"Error getting textbook dates for streak: {e}")
-        
-        if not dates:
-            return 0
-        
-        today = timezone.now().date()
-        streak = 0
-        current_date = today
-        
-        # Check if today or yesterday has activity
-        if today not in dates:
-            yesterday = today - timedelta(days=1)
-            if yesterday in dates:
-                current_date = yesterday
-            else:
-                return 0
-        
-        # Count consecutive days
-        while current_date in dates:
-            streak += 1
-            current_date -= timedelta(days=1)
-        
-        return streak
+        return Response(resume.get_cards(request.user.id))
@@ -25,6 +25,8 @@ class FlashcardDeck(models.Model):
     icon = models.CharField(max_length=10, default='📚')
     order = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Denormalized count of active cards (maintained by quiz/counters.py)
+    total_cards = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -35,10 +37,6 @@ class FlashcardDeck(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.category})"
-    
-    @property
-    def total_cards(self):
-        return self.cards.filter(is_active=True).count()
 
 
 class Flashcard(models.Model):
@@ -106,3 +104,46 @@ class FlashcardProgress(models.Model):
         if total == 0:
             return 0
         return round((self.cards_studied / total) * 100)
+
+
+class FlashcardReviewState(models.Model):
+    """
+    Per-user spaced repetition state for a flashcard (SM-2).
+    
+    deck is denormalized from the card so due queues can be read per user
+    or per user and deck with a single index range scan.
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='flashcard_reviews'
+    )
+    card = models.ForeignKey(
+        Flashcard,
+        on_delete=models.CASCADE,
+        related_name='review_states'
+    )
+    deck = models.ForeignKey(
+        FlashcardDeck,
+        on_delete=models.CASCADE,
+        related_name='review_states'
+    )
+    repetitions = models.PositiveSmallIntegerField(default=0)
+    lapses = models.PositiveSmallIntegerField(default=0)
+    interval_days = models.PositiveIntegerField(default=0)
+    ease = models.FloatField(default=2.5)
+    due_at = models.DateTimeField()
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['user', 'card']
+        indexes = [
+            models.Index(fields=['user', 'due_at']),
+            models.Index(fields=['user', 'deck', 'due_at']),
+        ]
+        verbose_name = 'Flashcard Review State'
+        verbose_name_plural = 'Flashcard Review States'
+    
+    def __str__(self):
+        return f"{self.user.username} - Card {self.card_id} (due {self.due_at:%Y-%m-%d})"
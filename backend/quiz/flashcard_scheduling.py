@@ -0,0 +1,109 @@
+"""
+SM-2 scheduling for flashcards.
+
+Reviews are graded 0-5 (SM-2 quality): below 3 the card lapses and comes
+back tomorrow; otherwise the interval grows 1 day, 6 days, then by the
+card's ease factor, which moves with each grade (never below 1.3).
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+
+from .flashcard_models import Flashcard, FlashcardProgress, FlashcardReviewState
+
+MIN_EASE = 1.3
+PASSING_GRADE = 3
+MAX_BATCH_SIZE = 200
+
+
+def apply_review(state, grade, reviewed_at):
+    """Update an SM-2 state in place for one graded review."""
+    if grade < PASSING_GRADE:
+        state.repetitions = 0
+        state.lapses += 1
+        state.interval_days = 1
+    else:
+        if state.repetitions == 0:
+            state.interval_days = 1
+        elif state.repetitions == 1:
+            state.interval_days = 6
+        else:
+            state.interval_days = max(1, round(state.interval_days * state.ease))
+        state.repetitions += 1
+
+    state.ease = max(MIN_EASE, state.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    state.last_reviewed_at = reviewed_at
+    state.due_at = reviewed_at + timedelta(days=state.interval_days)
+    return state
+
+
+def submit_reviews(user, reviews, now):
+    """
+    Apply a batch of [(card_id, grade), ...] reviews for a user.
+    Returns (updated states, touched deck IDs); unknown or inactive cards
+    are skipped.
+    Uses a fixed number of queries regardless of batch size.
+    """
+    card_ids = {card_id for card_id, _ in reviews}
+    decks = dict(
+        Flashcard.objects.filter(id__in=card_ids, is_active=True, deck__is_active=True).values_list('id', 'deck_id')
+    )
+
+    try:
+        return _submit_reviews(user, reviews, decks, now)
+    except IntegrityError:
+        # A concurrent first review inserted one of the states; the retry
+        # locks and updates the row that request created
+        return _submit_reviews(user, reviews, decks, now)
+
+
+def _submit_reviews(user, reviews, decks, now):
+    with transaction.atomic():
+        states = {
+            s.card_id: s
+            for s in FlashcardReviewState.objects.select_for_update().filter(user=user, card_id__in=decks)
+        }
+        new_states = {}
+        # deck_id -> [attempts, correct, newly studied cards]
+        per_deck = {}
+        for card_id, grade in reviews:
+            if card_id not in decks:
+                continue
+            counts = per_deck.setdefault(decks[card_id], [0, 0, 0])
+            state = states.get(card_id) or new_states.get(card_id)
+            if state is None:
+                state = new_states[card_id] = FlashcardReviewState(
+                    user=user, card_id=card_id, deck_id=decks[card_id], due_at=now
+                )
+                counts[2] += 1
+            apply_review(state, grade, now)
+            counts[0] += 1
+            counts[1] += grade >= PASSING_GRADE
+
+        FlashcardReviewState.objects.bulk_create(new_states.values())
+        FlashcardReviewState.objects.bulk_update(
+            states.values(), ['repetitions', 'lapses', 'interval_days', 'ease', 'due_at', 'last_reviewed_at']
+        )
+
+        # Keep the deck-level counters in step (one INSERT, one UPDATE)
+        FlashcardProgress.objects.bulk_create(
+            [FlashcardProgress(user=user, deck_id=deck_id) for deck_id in per_deck],
+            ignore_conflicts=True,
+        )
+
+        def per_deck_value(position):
+            return Case(
+                *[When(deck_id=deck_id, then=Value(counts[position])) for deck_id, counts in per_deck.items()],
+                default=Value(0),
+            )
+
+        if per_deck:
+            FlashcardProgress.objects.filter(user=user, deck_id__in=per_deck).update(
+                total_attempts=F('total_attempts') + per_deck_value(0),
+                correct_answers=F('correct_answers') + per_deck_value(1),
+                cards_studied=F('cards_studied') + per_deck_value(2),
+                last_studied_at=now,
+            )
+
+    return list(states.values()) + list(new_states.values()), list(per_deck)
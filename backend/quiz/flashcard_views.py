@@ -9,11 +9,15 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Q
-from django.core.cache import cache
-from .flashcard_models import FlashcardDeck, Flashcard, FlashcardProgress
+from django.db.models import Count, Sum
+from django.utils import timezone
+from .cache_tags import CATALOG_FLASHCARDS, bump, deck_tag, get_or_set, user_tag
+from .flashcard_models import FlashcardDeck, Flashcard, FlashcardProgress, FlashcardReviewState
+from .flashcard_scheduling import MAX_BATCH_SIZE, submit_reviews
 from rest_framework import serializers
 
+MAX_DUE_COUNT = 999
+
 
 # Serializers
 class FlashcardSerializer(serializers.ModelSerializer):
@@ -34,9 +38,19 @@ class FlashcardProgressSerializer(serializers.ModelSerializer):
                   'accuracy_percentage', 'progress_percentage', 'last_studied_at']
 
 
+class FlashcardReviewItemSerializer(serializers.Serializer):
+    """A single graded review (SM-2 quality 0-5)."""
+    card_id = serializers.IntegerField()
+    grade = serializers.IntegerField(min_value=0, max_value=5)
+
+
+class FlashcardReviewBatchSerializer(serializers.Serializer):
+    """Batch of reviews submitted at the end of (or during) a study session."""
+    reviews = FlashcardReviewItemSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_SIZE)
+
+
 class FlashcardDeckListSerializer(serializers.ModelSerializer):
     """Serializer for deck list view - minimal fields for speed."""
-    total_cards = serializers.IntegerField(source='card_count', read_only=True)
     user_progress = serializers.SerializerMethodField()
     
     class Meta:
@@ -52,7 +66,6 @@ class FlashcardDeckListSerializer(serializers.ModelSerializer):
 class FlashcardDeckDetailSerializer(serializers.ModelSerializer):
     """Serializer for deck detail view with all cards."""
     cards = FlashcardSerializer(many=True, read_only=True)
-    total_cards = serializers.SerializerMethodField()
     user_progress = serializers.SerializerMethodField()
     
     class Meta:
@@ -60,9 +73,6 @@ class FlashcardDeckDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'subject', 'description', 'category', 'icon', 
                   'total_cards', 'cards', 'user_progress']
     
-    def get_total_cards(self, obj):
-        return obj.cards.filter(is_active=True).count()
-    
     def get_user_progress(self, obj):
         user = self.context['request'].user
         if user.is_authenticated:
@@ -84,47 +94,37 @@ class FlashcardDeckViewSet(viewsets.ReadOnlyModelViewSet):
         return FlashcardDeckListSerializer
     
     def get_queryset(self):
-        """Get queryset with card count annotation - single optimized query."""
-        return FlashcardDeck.objects.filter(is_active=True).annotate(
-            card_count=Count('cards', filter=Q(cards__is_active=True))
-        ).only('id', 'title', 'subject', 'category', 'icon', 'order').order_by('category', 'order', 'title')
+        """Get decks with their stored card counts - single query."""
+        return FlashcardDeck.objects.filter(is_active=True).only(
+            'id', 'title', 'subject', 'category', 'icon', 'order', 'total_cards'
+        ).order_by('category', 'order', 'title')
     
     def list(self, request, *args, **kwargs):
-        """List all decks - optimized with caching."""
-        # Try cache first (cache key includes user for progress)
-        cache_key = f'flashcard_decks_user_{request.user.id}'
-        cached = cache.get(cache_key)
-        
-        if cached is not None:
-            response = Response(cached)
-            response['Cache-Control'] = 'private, max-age=300, stale-while-revalidate=60'
-            return response
-        
-        # Get all deck IDs first (fast)
-        deck_ids = list(FlashcardDeck.objects.filter(is_active=True).values_list('id', flat=True))
-        
-        # Single query for all decks with annotation
-        queryset = self.get_queryset()
-        
-        # Single query for user progress
-        user_progress_map = {}
-        if request.user.is_authenticated:
-            progress_list = FlashcardProgress.objects.filter(
-                user=request.user,
-                deck_id__in=deck_ids
-            ).only('deck_id', 'cards_studied', 'correct_answers', 'total_attempts', 'last_studied_at')
-            user_progress_map = {p.deck_id: p for p in progress_list}
-        
-        # Attach progress
-        decks_list = list(queryset)
-        for deck in decks_list:
-            deck._prefetched_progress = user_progress_map.get(deck.id)
-        
-        serializer = self.get_serializer(decks_list, many=True)
-        data = serializer.data
+        """List all decks - optimized with caching (invalidated by deck and progress changes)."""
+        def build():
+            # Get all deck IDs first (fast)
+            deck_ids = list(FlashcardDeck.objects.filter(is_active=True).values_list('id', flat=True))
+            
+            # Single query for all decks with annotation
+            queryset = self.get_queryset()
+            
+            # Single query for user progress
+            user_progress_map = {}
+            if request.user.is_authenticated:
+                progress_list = FlashcardProgress.objects.filter(
+                    user=request.user,
+                    deck_id__in=deck_ids
+                ).only('deck_id', 'cards_studied', 'correct_answers', 'total_attempts', 'last_studied_at')
+                user_progress_map = {p.deck_id: p for p in progress_list}
+            
+            # Attach progress
+            decks_list = list(queryset)
+            for deck in decks_list:
+                deck._prefetched_progress = user_progress_map.get(deck.id)
+            
+            return self.get_serializer(decks_list, many=True).data
         
-        # Cache for 5 minutes (300 seconds)
-        cache.set(cache_key, data, 300)
+        data = get_or_set('flashcard_decks', [user_tag(request.user.id), CATALOG_FLASHCARDS], build)
         
         response = Response(data)
         response['Cache-Control'] = 'private, max-age=300, stale-while-revalidate=60'
@@ -133,26 +133,16 @@ class FlashcardDeckViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def topics(self, request):
         """Get grouped topics - highly optimized endpoint."""
-        cache_key = 'flashcard_topics'
-        cached = cache.get(cache_key)
-        
-        if cached is not None:
-            response = Response(cached)
-            response['Cache-Control'] = 'public, max-age=1800, stale-while-revalidate=300'
-            return response
+        def build():
+            # Single aggregation query over decks (card counts are stored per deck)
+            return list(FlashcardDeck.objects.filter(is_active=True).values(
+                'subject', 'category', 'icon'
+            ).annotate(
+                total_decks=Count('id'),
+                total_cards=Sum('total_cards')
+            ).order_by('category', 'subject'))
         
-        # Single aggregation query - count distinct decks per subject
-        topics_data = FlashcardDeck.objects.filter(is_active=True).values(
-            'subject', 'category', 'icon'
-        ).annotate(
-            total_decks=Count('id', distinct=True),
-            total_cards=Count('cards', filter=Q(cards__is_active=True))
-        ).order_by('category', 'subject')
-        
-        result = list(topics_data)
-        
-        # Cache for 30 minutes (topics rarely change)
-        cache.set(cache_key, result, 1800)
+        result = get_or_set('flashcard_topics', [CATALOG_FLASHCARDS], build, local=True)
         
         response = Response(result)
         response['Cache-Control'] = 'public, max-age=1800, stale-while-revalidate=300'
@@ -179,12 +169,9 @@ class FlashcardDeckViewSet(viewsets.ReadOnlyModelViewSet):
         if correct:
             progress.correct_answers += 1
         
+        # Saving bumps the user's cache tag (quiz/signals.py)
         progress.save()
         
-        # Invalidate user caches
-        cache.delete(f'flashcard_decks_user_{request.user.id}')
-        cache.delete(f'flashcard_progress_{request.user.id}_{pk}')
-        
         serializer = FlashcardProgressSerializer(progress)
         return Response(serializer.data)
     
@@ -192,21 +179,17 @@ class FlashcardDeckViewSet(viewsets.ReadOnlyModelViewSet):
     def study(self, request, pk=None):
         """Get cards for study session - optimized with caching."""
         
-        # Try to get cached static data (deck and cards)
-        static_cache_key = f'flashcard_study_{pk}'
-        cached_static = cache.get(static_cache_key)
-        
-        if cached_static is None:
+        # Static data (deck and cards), invalidated when the deck or its cards change
+        def build_static():
             deck = FlashcardDeck.objects.filter(id=pk, is_active=True).first()
-            
             if not deck:
-                return Response({'error': 'Deck not found'}, status=404)
+                return None
             
             cards = list(deck.cards.filter(is_active=True).order_by('order').values(
                 'id', 'question', 'answer', 'hint', 'order'
             ))
             
-            cached_static = {
+            return {
                 'deck': {
                     'id': deck.id,
                     'title': deck.title,
@@ -218,22 +201,22 @@ class FlashcardDeckViewSet(viewsets.ReadOnlyModelViewSet):
                 },
                 'cards': cards,
             }
-            cache.set(static_cache_key, cached_static, 1800)  # 30 minutes
         
-        # Get user progress (cached for 2 minutes)
+        cached_static = get_or_set(f'flashcard_study_{pk}', [deck_tag(pk)], build_static)
+        if cached_static is None:
+            return Response({'error': 'Deck not found'}, status=404)
+        
+        # User progress, invalidated when the user's progress or the deck changes
         progress_data = None
         if request.user.is_authenticated:
-            progress_cache_key = f'flashcard_progress_{request.user.id}_{pk}'
-            progress_data = cache.get(progress_cache_key)
-            
-            if progress_data is None:
+            def build_progress():
                 progress, _ = FlashcardProgress.objects.get_or_create(
                     user=request.user,
                     deck_id=pk,
                     defaults={'cards_studied': 0, 'correct_answers': 0, 'total_attempts': 0}
                 )
                 total_cards = cached_static['deck']['total_cards']
-                progress_data = {
+                return {
                     'id': progress.id,
                     'cards_studied': progress.cards_studied,
                     'correct_answers': progress.correct_answers,
@@ -242,13 +225,118 @@ class FlashcardDeckViewSet(viewsets.ReadOnlyModelViewSet):
                     'progress_percentage': round(progress.cards_studied / total_cards * 100) if total_cards > 0 else 0,
                     'last_studied_at': progress.last_studied_at.isoformat() if progress.last_studied_at else None,
                 }
-                cache.set(progress_cache_key, progress_data, 120)  # 2 minutes
+            
+            progress_data = get_or_set(
+                f'flashcard_progress_{pk}', [user_tag(request.user.id), deck_tag(pk)], build_progress
+            )
+        
+        # Order cards by schedule: due (oldest first), then new, then the rest
+        cards = cached_static['cards']
+        if request.user.is_authenticated:
+            schedule = dict(
+                FlashcardReviewState.objects.filter(user=request.user, deck_id=pk).values_list('card_id', 'due_at')
+            )
+            if schedule:
+                now = timezone.now()
+                
+                def schedule_rank(card):
+                    due_at = schedule.get(card['id'])
+                    if due_at is None:
+                        return (1, card['order'])
+                    return (0 if due_at <= now else 2, due_at)
+                
+                cards = sorted(cards, key=schedule_rank)
+                cards = [
+                    {**card, 'due_at': schedule[card['id']].isoformat() if card['id'] in schedule else None}
+                    for card in cards
+                ]
         
         return Response({
             'deck': {
                 **cached_static['deck'],
                 'user_progress': progress_data,
             },
-            'cards': cached_static['cards'],
+            'cards': cards,
             'progress': progress_data,
         })
+
+    @action(detail=False, methods=['get'])
+    def due(self, request):
+        """
+        Next cards due for review across the user's decks (or one deck).
+        Query params: limit (default 20, max 100), deck (optional deck ID).
+        due_count is capped at MAX_DUE_COUNT.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        deck_id = request.query_params.get('deck')
+        if deck_id:
+            try:
+                deck_id = int(deck_id)
+            except ValueError:
+                return Response({'error': 'deck must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        now = timezone.now()
+        states = FlashcardReviewState.objects.filter(user=request.user, due_at__lte=now, card__is_active=True)
+        if deck_id:
+            states = states.filter(deck_id=deck_id)
+        
+        # Range scan on (user, due_at) / (user, deck, due_at), cards joined by PK
+        due_cards = list(
+            states.order_by('due_at').values(
+                'card_id', 'deck_id', 'due_at', 'interval_days', 'repetitions',
+                'card__question', 'card__answer', 'card__hint',
+            )[:limit]
+        )
+        
+        return Response({
+            'cards': [
+                {
+                    'id': row['card_id'],
+                    'deck_id': row['deck_id'],
+                    'question': row['card__question'],
+                    'answer': row['card__answer'],
+                    'hint': row['card__hint'],
+                    'due_at': row['due_at'].isoformat(),
+                    'interval_days': row['interval_days'],
+                    'repetitions': row['repetitions'],
+                }
+                for row in due_cards
+            ],
+            # Bounded count so a large backlog doesn't turn into a full scan
+            'due_count': states[:MAX_DUE_COUNT].count(),
+        })
+
+    @action(detail=False, methods=['post'])
+    def review(self, request):
+        """
+        Submit a batch of graded reviews and reschedule the cards (SM-2).
+        Body: {"reviews": [{"card_id": 1, "grade": 4}, ...]}
+        """
+        serializer = FlashcardReviewBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        reviews = [(item['card_id'], item['grade']) for item in serializer.validated_data['reviews']]
+        states, deck_ids = submit_reviews(request.user, reviews, timezone.now())
+        
+        # Bulk writes skip signals, so bump the user's cache tag here
+        if deck_ids:
+            bump(user_tag(request.user.id))
+        
+        return Response({
+            'reviewed': len(states),
+            'cards': [
+                {
+                    'id': state.card_id,
+                    'deck_id': state.deck_id,
+                    'due_at': state.due_at.isoformat(),
+                    'interval_days': state.interval_days,
+                    'ease': round(state.ease, 2),
+                    'repetitions': state.repetitions,
+                }
+                for state in states
+            ],
+        })
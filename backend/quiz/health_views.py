@@ -1,10 +1,14 @@
 """
 Health check endpoint for warm-up pings and monitoring.
 """
+import os
+
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 
+from . import cache_tags, query_metrics
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -19,3 +23,23 @@ def health_check(request):
     Returns 200 OK if server is running.
     """
     return Response({'status': 'ok'})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """
+    Hit/miss counters for the two-tier view cache (quiz/cache_tags.py).
+    Counters are per worker process; the pid tells workers apart.
+    """
+    return Response({'pid': os.getpid(), **cache_tags.stats()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def query_stats(request):
+    """
+    Per-route query counts, DB time and repeated (N+1) statements
+    (quiz/query_metrics.py). Totals are per worker process.
+    """
+    return Response({'pid': os.getpid(), **query_metrics.stats()})
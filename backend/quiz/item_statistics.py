@@ -0,0 +1,182 @@
+"""
+Item statistics job for mock exam questions.
+
+Streams QuestionAnswer rows of completed attempts in chunks and folds them
+into per-question accumulators (response counts, score sums, option
+counts), then derives:
+- p-value: proportion of correct responses
+- point-biserial discrimination against the attempt score
+- distractor frequencies
+
+Results are stored in QuestionStatistics. Incremental runs read attempts
+that ended after the stored watermark minus WATERMARK_OVERLAP, skipping
+the ones already counted, so an attempt whose ended_at was stamped before
+a run but that committed after it is still picked up by the next run.
+Rescoring resets an exam's statistics (reset_item_statistics) so they are
+rebuilt from the corrected scores.
+"""
+import logging
+import math
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import Exam, ExamAttempt, QuestionAnswer
+from .analytics_models import QuestionStatistics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+MIN_RESPONSES_FOR_FLAGS = 30
+# Longer than a completion transaction can stay open after stamping ended_at
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+
+def _flag_for(stats, correct_answer):
+    if stats.responses < MIN_RESPONSES_FOR_FLAGS or stats.p_value is None:
+        return QuestionStatistics.FLAG_NONE
+    # A distractor chosen more often than the key by stronger candidates
+    # usually means the key is wrong.
+    top_option = max(stats.option_counts.items(), key=lambda kv: kv[1], default=(None, 0))[0]
+    if stats.discrimination is not None and stats.discrimination < 0 and top_option != correct_answer:
+        return QuestionStatistics.FLAG_POSSIBLE_MISKEY
+    if stats.p_value > 0.9:
+        return QuestionStatistics.FLAG_TOO_EASY
+    if stats.p_value < 0.2:
+        return QuestionStatistics.FLAG_TOO_HARD
+    if stats.discrimination is not None and stats.discrimination < 0.1:
+        return QuestionStatistics.FLAG_LOW_DISCRIMINATION
+    return QuestionStatistics.FLAG_NONE
+
+
+def _derive(stats):
+    """Recompute p-value and point-biserial correlation from accumulators."""
+    n = stats.responses
+    if not n:
+        stats.p_value = None
+        stats.discrimination = None
+        return
+    n1 = stats.correct_responses
+    n0 = n - n1
+    p = n1 / n
+    stats.p_value = round(p, 4)
+
+    total = stats.score_sum_correct + stats.score_sum_incorrect
+    mean = total / n
+    variance = stats.score_sum_squares / n - mean * mean
+    if n1 == 0 or n0 == 0 or variance <= 0:
+        stats.discrimination = None
+        return
+    mean_correct = stats.score_sum_correct / n1
+    mean_incorrect = stats.score_sum_incorrect / n0
+    stats.discrimination = round(
+        (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p)), 4
+    )
+
+
+def refresh_item_statistics(exam_id, full=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fold newly completed attempts of an exam into QuestionStatistics.
+    With full=True the exam's statistics are rebuilt from scratch.
+    Returns the number of attempts processed.
+    """
+    existing = {s.question_id: s for s in QuestionStatistics.objects.filter(exam_id=exam_id)}
+    watermark, counted = None, set()
+    if full:
+        for stats in existing.values():
+            stats.responses = stats.correct_responses = 0
+            stats.score_sum_correct = stats.score_sum_incorrect = stats.score_sum_squares = 0
+            stats.option_counts = {}
+    else:
+        watermarks = [s.last_attempt_ended_at for s in existing.values() if s.last_attempt_ended_at]
+        watermark = min(watermarks, default=None)
+        for stats in existing.values():
+            counted.update(stats.recent_attempt_ids)
+
+    attempts = ExamAttempt.objects.filter(
+        exam_id=exam_id, status='completed', score__isnull=False, ended_at__isnull=False
+    )
+    if watermark:
+        attempts = attempts.filter(ended_at__gt=watermark - WATERMARK_OVERLAP)
+    window_rows = list(attempts.order_by('ended_at').values_list('id', 'score', 'ended_at'))
+    attempt_rows = [row for row in window_rows if row[0] not in counted]
+    if not attempt_rows and not full:
+        return 0
+
+    # question_id -> [responses, correct, sum_correct, sum_incorrect, sum_squares, {label: count}]
+    acc = {}
+    for i in range(0, len(attempt_rows), chunk_size):
+        chunk = attempt_rows[i:i + chunk_size]
+        scores = {attempt_id: float(score) for attempt_id, score, _ in chunk}
+        answers = QuestionAnswer.objects.filter(
+            exam_attempt_id__in=list(scores)
+        ).values_list('question_id', 'exam_attempt_id', 'selected_answer', 'is_correct')
+        for question_id, attempt_id, selected, is_correct in answers.iterator(chunk_size=chunk_size):
+            score = scores[attempt_id]
+            row = acc.get(question_id)
+            if row is None:
+                row = acc[question_id] = [0, 0, 0.0, 0.0, 0.0, {}]
+            row[0] += 1
+            if is_correct:
+                row[1] += 1
+                row[2] += score
+            else:
+                row[3] += score
+            row[4] += score * score
+            row[5][selected] = row[5].get(selected, 0) + 1
+
+    # A late-committing attempt can end before the current watermark
+    new_watermark = watermark
+    if attempt_rows and (new_watermark is None or attempt_rows[-1][2] > new_watermark):
+        new_watermark = attempt_rows[-1][2]
+    recent_ids = sorted(
+        attempt_id for attempt_id, _, ended_at in window_rows
+        if new_watermark and ended_at > new_watermark - WATERMARK_OVERLAP
+    )
+    correct_answers = dict(Exam.objects.get(id=exam_id).questions.values_list('id', 'correct_answer'))
+
+    to_create, to_update = [], []
+    for question_id in set(acc) | set(existing):
+        if question_id not in correct_answers:
+            continue
+        stats = existing.get(question_id)
+        if stats is None:
+            stats = QuestionStatistics(question_id=question_id, exam_id=exam_id)
+            to_create.append(stats)
+        else:
+            to_update.append(stats)
+        row = acc.get(question_id)
+        if row:
+            stats.responses += row[0]
+            stats.correct_responses += row[1]
+            stats.score_sum_correct += row[2]
+            stats.score_sum_incorrect += row[3]
+            stats.score_sum_squares += row[4]
+            counts = dict(stats.option_counts)
+            for label, count in row[5].items():
+                counts[label] = counts.get(label, 0) + count
+            stats.option_counts = counts
+        if new_watermark:
+            stats.last_attempt_ended_at = new_watermark
+            stats.recent_attempt_ids = recent_ids
+        _derive(stats)
+        stats.flag = _flag_for(stats, correct_answers[question_id])
+
+    with transaction.atomic():
+        QuestionStatistics.objects.bulk_create(to_create, batch_size=500)
+        QuestionStatistics.objects.bulk_update(to_update, [
+            'responses', 'correct_responses', 'score_sum_correct', 'score_sum_incorrect',
+            'score_sum_squares', 'option_counts', 'p_value', 'discrimination', 'flag',
+            'last_attempt_ended_at', 'recent_attempt_ids',
+        ], batch_size=500)
+
+    logger.info(
+        f"[ITEM_STATS] Exam {exam_id}{' (full)' if full else ''} - "
+        f"{len(attempt_rows)} attempts, {len(to_create) + len(to_update)} questions"
+    )
+    return len(attempt_rows)
+
+
+def reset_item_statistics(exam_id):
+    """Drop an exam's statistics; the next refresh rebuilds them from every completed attempt."""
+    return QuestionStatistics.objects.filter(exam_id=exam_id).delete()[0]
@@ -0,0 +1,303 @@
+"""
+Topic quiz leaderboards.
+
+Boards:
+
+- global:          UserGameProfile.total_points
+- weekly_<Y>_<W>:  points from quizzes completed in that ISO week
+- topic_<slug>:    points from completed quizzes on that topic
+
+With a Redis cache (RedisCache), each board is a sorted set: an update is a
+ZADD, "my rank" a ZSCORE plus ZCOUNT of higher scores, and a top-N page a
+ZREVRANGE, all O(log n). A marker key with the board's expiry tells a
+built board (possibly empty) from a missing one.
+
+Other caches fall back to one cache value per board holding a sorted list
+of (-score, user_id) and a {user_id: score} map. Every update and rank
+lookup reads, and updates rewrite, the whole board (O(n) per operation).
+With a per-process LocMemCache each worker keeps its own boards, which
+only agree after they are rebuilt from the DB.
+
+Updates set a user's absolute score under a short cache lock, so a write
+that races with a rebuild can't double count. Boards expire after
+LEADERBOARD_RECONCILE_SECONDS and are rebuilt from the DB on the next
+read (rebuild_leaderboards does the same on demand).
+"""
+import bisect
+import logging
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 5
+LOCK_WAIT_SECONDS = 2
+
+BOARD_GLOBAL = 'global'
+BOARD_WEEKLY = 'weekly'
+BOARD_TOPIC = 'topic'
+
+
+def _reconcile_seconds():
+    return getattr(settings, 'LEADERBOARD_RECONCILE_SECONDS', 60 * 60)
+
+
+def week_start(now=None):
+    """Start of the current ISO week (Monday 00:00, local time)."""
+    today = timezone.localdate(now)
+    monday = today - timedelta(days=today.weekday())
+    return timezone.make_aware(datetime.combine(monday, datetime.min.time()))
+
+
+def board_name(board, topic=None, now=None):
+    """Cache name for a board type ('global', 'weekly' or 'topic')."""
+    if board == BOARD_WEEKLY:
+        year, week, _ = timezone.localdate(now).isocalendar()
+        return f'weekly_{year}_{week}'
+    if board == BOARD_TOPIC:
+        return f'topic_{topic}'
+    return BOARD_GLOBAL
+
+
+def _board_key(name):
+    return f'leaderboard_{name}'
+
+
+def _load_scores(name):
+    """Compute {user_id: score} for a board from the DB."""
+    from .topic_models import TopicQuizAttempt, UserGameProfile
+
+    if name == BOARD_GLOBAL:
+        rows = UserGameProfile.objects.filter(total_points__gt=0).values_list('user_id', 'total_points')
+    else:
+        attempts = TopicQuizAttempt.objects.filter(status='completed', points_earned__gt=0)
+        if name.startswith('weekly_'):
+            attempts = attempts.filter(completed_at__gte=week_start())
+        else:
+            attempts = attempts.filter(topic=name[len('topic_'):])
+        rows = attempts.order_by().values('user_id').annotate(score=Sum('points_earned')).values_list('user_id', 'score')
+    return dict(rows)
+
+
+def _lock(name):
+    key = f'leaderboard_lock_{name}'
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while not cache.add(key, 1, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(0.02)
+    return key
+
+
+class _ListStore:
+    """Board as one cache value: sorted (-score, user_id) entries plus a score map."""
+
+    def store(self, name, scores):
+        entries = sorted((-score, user_id) for user_id, score in scores.items() if score > 0)
+        cache.set(_board_key(name), {'entries': entries, 'scores': scores}, _reconcile_seconds())
+        return len(entries)
+
+    def drop(self, name):
+        cache.delete(_board_key(name))
+
+    def update(self, name, user_id, score):
+        data = cache.get(_board_key(name))
+        if data is None:
+            return
+        entries, scores = data['entries'], data['scores']
+        old = scores.get(user_id)
+        if old == score:
+            return
+        if old is not None and old > 0:
+            index = bisect.bisect_left(entries, (-old, user_id))
+            if index < len(entries) and entries[index] == (-old, user_id):
+                del entries[index]
+        scores[user_id] = score
+        if score > 0:
+            bisect.insort(entries, (-score, user_id))
+        cache.set(_board_key(name), data, _reconcile_seconds())
+
+    @staticmethod
+    def _rank(entries, score):
+        # Competition ranking: 1 + number of users with a strictly higher score
+        return bisect.bisect_left(entries, (-score,)) + 1
+
+    def page(self, name, start, size):
+        data = cache.get(_board_key(name))
+        if data is None:
+            return None
+        entries = data['entries']
+        rows = [(self._rank(entries, -neg), user_id, -neg) for neg, user_id in entries[start:start + size]]
+        return len(entries), rows
+
+    def rank(self, name, user_id):
+        data = cache.get(_board_key(name))
+        if data is None:
+            return None
+        score = data['scores'].get(user_id, 0)
+        if score <= 0:
+            return None, 0, len(data['entries'])
+        return self._rank(data['entries'], score), score, len(data['entries'])
+
+
+class _SortedSetStore:
+    """Board as a Redis sorted set (user_id -> score) plus a marker key."""
+
+    # Apply an update only to a built board; a new member inherits its expiry
+    UPDATE_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+    if tonumber(ARGV[2]) > 0 then
+        redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+        redis.call('PEXPIRE', KEYS[2], redis.call('PTTL', KEYS[1]))
+    else
+        redis.call('ZREM', KEYS[2], ARGV[1])
+    end
+    return 1
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.client = backend._cache.get_client(write=True)
+
+    def _keys(self, name):
+        return (
+            self.backend.make_and_validate_key(f'{_board_key(name)}_built'),
+            self.backend.make_and_validate_key(_board_key(name)),
+        )
+
+    def store(self, name, scores):
+        marker, board = self._keys(name)
+        members = {str(user_id): score for user_id, score in scores.items() if score > 0}
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(board)
+        if members:
+            pipe.zadd(board, members)
+            pipe.expire(board, _reconcile_seconds())
+        pipe.set(marker, 1, ex=_reconcile_seconds())
+        pipe.execute()
+        return len(members)
+
+    def drop(self, name):
+        self.client.delete(*self._keys(name))
+
+    def update(self, name, user_id, score):
+        self.client.eval(self.UPDATE_SCRIPT, 2, *self._keys(name), str(user_id), score)
+
+    def _ranks(self, board, scores):
+        pipe = self.client.pipeline(transaction=False)
+        for score in scores:
+            pipe.zcount(board, f'({score}', '+inf')
+        return {score: higher + 1 for score, higher in zip(scores, pipe.execute())}
+
+    def page(self, name, start, size):
+        marker, board = self._keys(name)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(marker)
+        pipe.zcard(board)
+        pipe.zrevrange(board, start, start + size - 1, withscores=True)
+        built, total, members = pipe.execute()
+        if not built:
+            return None
+        rows = [(int(user_id), int(score)) for user_id, score in members]
+        ranks = self._ranks(board, sorted({score for _, score in rows}))
+        return total, [(ranks[score], user_id, score) for user_id, score in rows]
+
+    def rank(self, name, user_id):
+        marker, board = self._keys(name)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(marker)
+        pipe.zcard(board)
+        pipe.zscore(board, str(user_id))
+        built, total, score = pipe.execute()
+        if not built:
+            return None
+        if not score or score <= 0:
+            return None, 0, total
+        score = int(score)
+        return self._ranks(board, [score])[score], score, total
+
+
+def _store():
+    # `cache` is a proxy, so check the configured backend itself
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        return _SortedSetStore(backend)
+    return _ListStore()
+
+
+def rebuild(name):
+    """Rebuild a board from the DB and store it. Returns the number of ranked users."""
+    key = _lock(name)
+    try:
+        count = _store().store(name, _load_scores(name))
+    finally:
+        if key:
+            cache.delete(key)
+    logger.debug(f"[LEADERBOARD] Rebuilt {name}: {count} entries")
+    return count
+
+
+def set_scores(updates):
+    """
+    Set absolute scores: {board_name: (user_id, score)}.
+    Boards that aren't built are left to be rebuilt on the next read.
+    """
+    store = _store()
+    for name, (user_id, score) in updates.items():
+        key = _lock(name)
+        if key is None:
+            # Couldn't get the lock - drop the board rather than lose the update
+            store.drop(name)
+            continue
+        try:
+            store.update(name, user_id, score)
+        finally:
+            cache.delete(key)
+
+
+def record_total_points(user_id, total_points):
+    """Feed the global board (called from UserGameProfile.add_xp)."""
+    set_scores({BOARD_GLOBAL: (user_id, total_points)})
+
+
+def record_quiz_completion(user_id, topic):
+    """Feed the global, weekly and topic boards after a quiz is completed."""
+    from .topic_models import TopicQuizAttempt, UserGameProfile
+
+    total_points = UserGameProfile.objects.filter(user_id=user_id).values_list('total_points', flat=True).first()
+    totals = TopicQuizAttempt.objects.filter(user_id=user_id, status='completed').aggregate(
+        weekly=Sum('points_earned', filter=Q(completed_at__gte=week_start())),
+        topic=Sum('points_earned', filter=Q(topic=topic)),
+    )
+    set_scores({
+        BOARD_GLOBAL: (user_id, total_points or 0),
+        board_name(BOARD_WEEKLY): (user_id, totals['weekly'] or 0),
+        board_name(BOARD_TOPIC, topic): (user_id, totals['topic'] or 0),
+    })
+
+
+def get_page(name, page=1, page_size=20):
+    """Return (total, [(rank, user_id, score), ...]) for a page of a board."""
+    store = _store()
+    start = (page - 1) * page_size
+    result = store.page(name, start, page_size)
+    if result is None:
+        rebuild(name)
+        result = store.page(name, start, page_size) or (0, [])
+    return result
+
+
+def get_user_rank(name, user_id):
+    """Return (rank, score, total) for a user; rank is None if they aren't on the board."""
+    store = _store()
+    result = store.rank(name, user_id)
+    if result is None:
+        rebuild(name)
+        result = store.rank(name, user_id) or (None, 0, 0)
+    return result
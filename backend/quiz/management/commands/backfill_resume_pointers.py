@@ -0,0 +1,27 @@
+"""
+Django management command to build resume pointers (UserResumePointer)
+for users who don't have one yet, from their latest in-progress topic
+quiz, video progress and textbook progress. Run once after deploying the
+pointers; afterwards they are updated from the write paths. Users who
+read the dashboard first get theirs built on demand.
+"""
+from django.core.management.base import BaseCommand
+
+from quiz.resume import backfill
+
+
+class Command(BaseCommand):
+    help = 'Build missing UserResumePointer rows from quiz attempts, video and textbook progress'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            help='Build the pointer for a specific user ID only (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        built = backfill(options.get('user_id'))
+        self.stdout.write(f'Built {built} resume pointers')
+        self.stdout.write(self.style.SUCCESS('Done!'))
@@ -0,0 +1,27 @@
+"""
+Django management command to rebuild the daily activity rollup
+(UserActivityDaily) and activity bitmaps (UserActivityBitmap) from topic
+quiz attempts and answers, mock exam attempts, video and textbook progress. Run once after deploying the
+rollup; afterwards rows are updated from the write paths. Rows for the
+selected users are replaced, so run it when those users are idle.
+"""
+from django.core.management.base import BaseCommand
+
+from quiz.activity import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild UserActivityDaily rows and activity bitmaps from attempts, answers and progress records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            help='Rebuild activity for a specific user ID only (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild(options.get('user_id'))
+        self.stdout.write(f'Wrote {rows} daily activity rows')
+        self.stdout.write(self.style.SUCCESS('Done!'))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from django.db.models import F
 from quiz.models import Exam
 
 class Command(BaseCommand):
@@ -6,5 +7,8 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         self.stdout.write('Clearing snapshots for all exams...')
-        updated_count = Exam.objects.update(questions_snapshot=None)
+        updated_count = Exam.objects.update(
+            questions_snapshot=None,
+            snapshot_version=F('snapshot_version') + 1,
+        )
         self.stdout.write(self.style.SUCCESS(f'Successfully cleared snapshots for {updated_count} exams.'))
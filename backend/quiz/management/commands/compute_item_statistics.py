@@ -0,0 +1,53 @@
+"""
+Django management command to refresh per-question item statistics
+(p-value, point-biserial discrimination, distractor frequencies).
+Intended to run on a schedule; each run only reads newly completed attempts
+unless --full is given.
+"""
+from django.core.management.base import BaseCommand
+from quiz.models import Exam
+from quiz.item_statistics import refresh_item_statistics, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Refresh item statistics for mock exam questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exam-id',
+            type=int,
+            help='Refresh statistics for a specific exam ID only',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild from all completed attempts instead of refreshing incrementally',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of attempts read per chunk',
+        )
+
+    def handle(self, *args, **options):
+        exam_id = options.get('exam_id')
+
+        if exam_id:
+            exam_ids = list(Exam.objects.filter(id=exam_id).values_list('id', flat=True))
+            if not exam_ids:
+                self.stderr.write(self.style.ERROR(f'Exam {exam_id} not found'))
+                return
+        else:
+            exam_ids = list(Exam.objects.values_list('id', flat=True))
+
+        self.stdout.write(f'Refreshing item statistics for {len(exam_ids)} exams...')
+
+        for exam_id in exam_ids:
+            processed = refresh_item_statistics(
+                exam_id, full=options['full'], chunk_size=options['chunk_size']
+            )
+            if processed:
+                self.stdout.write(f'  Exam {exam_id}: {processed} attempts')
+
+        self.stdout.write(self.style.SUCCESS('Done!'))
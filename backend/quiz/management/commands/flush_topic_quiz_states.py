@@ -0,0 +1,49 @@
+"""
+Django management command to persist live topic quiz state.
+
+In-progress topic quizzes keep their game state in the cache and write
+answers behind the response. Run this on a schedule to flush the counters
+of attempts that have been running for a while, so the attempt rows stay
+durable even if a quiz is never finished.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from quiz.topic_models import TopicQuizAttempt
+from quiz.quiz_state import flush_state, live_state_enabled, peek_state
+
+
+class Command(BaseCommand):
+    help = 'Flush live state of long-running topic quiz attempts to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-minutes',
+            type=int,
+            default=30,
+            help='Only flush attempts started more than this many minutes ago',
+        )
+
+    def handle(self, *args, **options):
+        if not live_state_enabled():
+            self.stdout.write('Live quiz state is disabled; nothing to flush.')
+            return
+
+        cutoff = timezone.now() - timedelta(minutes=options['older_than_minutes'])
+        attempt_ids = list(TopicQuizAttempt.objects.filter(
+            status='in_progress', started_at__lt=cutoff
+        ).values_list('id', flat=True))
+
+        flushed = 0
+        for attempt_id in attempt_ids:
+            state = peek_state(attempt_id)
+            if state is None:
+                continue
+            flush_state(state)
+            flushed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Flushed {flushed} of {len(attempt_ids)} in-progress attempts.'
+        ))
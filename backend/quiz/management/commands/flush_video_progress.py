@@ -0,0 +1,17 @@
+"""
+Django management command to flush buffered video watch positions to the
+database. Workers flush their buffers on a background thread every
+VIDEO_PROGRESS_FLUSH_SECONDS; with a shared cache, run this before a deploy
+to write what is still buffered. With a per-process cache (LocMemCache)
+this command only sees its own, empty buffer.
+"""
+from django.core.management.base import BaseCommand
+from quiz.video_progress_buffer import flush
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered video watch progress to VideoProgress/CourseProgress'
+
+    def handle(self, *args, **options):
+        written = flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {written} video positions'))
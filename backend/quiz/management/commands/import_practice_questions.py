@@ -8,6 +8,7 @@ import json
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from quiz.counters import reconcile_all
 from quiz.practice_question_models import (
     PracticeQuestionCourse,
     PracticeQuestionTopic,
@@ -119,6 +120,11 @@ class Command(BaseCommand):
                         
                         total_questions += len(area_data.get('questions', []))
 
+        # bulk_create skips the signals that keep question counts, answer keys
+        # and question pools current
+        self.stdout.write('Recounting questions and invalidating caches...')
+        reconcile_all()
+
         self.stdout.write(self.style.SUCCESS(
             f'\nImport complete!\n'
             f'  Courses: {total_courses}\n'
@@ -0,0 +1,51 @@
+"""
+Django management command to report how much space topic quiz question
+data takes: the versioned store versus legacy per-attempt snapshots.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum, TextField
+from django.db.models.functions import Cast, Length
+
+from quiz.models import PracticeQuestionVersion
+from quiz.topic_models import TopicQuizAttempt
+
+
+def _json_length(field):
+    # PostgreSQL has no length(jsonb); measure the JSON text instead
+    return Length(Cast(field, TextField()))
+
+
+class Command(BaseCommand):
+    help = 'Report storage used by topic quiz question snapshots and versions'
+
+    def handle(self, *args, **options):
+        attempts = TopicQuizAttempt.objects.all()
+        legacy = attempts.filter(questions_snapshot__isnull=False)
+
+        # JSON text sizes in characters (database independent)
+        snapshot_bytes = legacy.aggregate(
+            total=Sum(_json_length('questions_snapshot'))
+        )['total'] or 0
+        reference_bytes = attempts.aggregate(
+            total=Sum(_json_length('question_versions'))
+        )['total'] or 0
+        version_bytes = PracticeQuestionVersion.objects.aggregate(
+            total=Sum(_json_length('payload'))
+        )['total'] or 0
+
+        self.stdout.write(f'Attempts: {attempts.count()} ({legacy.count()} with legacy snapshots)')
+        self.stdout.write(f'Question versions: {PracticeQuestionVersion.objects.count()}')
+        self.stdout.write(f'Legacy snapshot JSON: {snapshot_bytes / 1024:.1f} KB')
+        self.stdout.write(f'Version references JSON: {reference_bytes / 1024:.1f} KB')
+        self.stdout.write(f'Version payload JSON: {version_bytes / 1024:.1f} KB')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in (TopicQuizAttempt, PracticeQuestionVersion):
+                    cursor.execute(
+                        'SELECT pg_size_pretty(pg_total_relation_size(%s))', [model._meta.db_table]
+                    )
+                    self.stdout.write(f'{model._meta.db_table} on disk: {cursor.fetchone()[0]}')
+
+        self.stdout.write(self.style.SUCCESS('Done!'))
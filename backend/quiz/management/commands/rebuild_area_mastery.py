@@ -0,0 +1,56 @@
+"""
+Django management command to rebuild per-area mastery from recorded topic
+quiz answers. Run once to backfill; afterwards mastery is updated as
+answers are submitted.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from quiz.mastery import apply_answer
+from quiz.practice_question_models import PracticeQuestion
+from quiz.topic_models import TopicQuizAnswer, UserAreaMastery
+
+
+class Command(BaseCommand):
+    help = 'Rebuild UserAreaMastery rows by replaying topic quiz answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Rebuild mastery for a specific user ID only',
+        )
+
+    def handle(self, *args, **options):
+        area_of = dict(PracticeQuestion.objects.values_list('id', 'area_id'))
+        answers = TopicQuizAnswer.objects.all()
+        if options.get('user_id'):
+            answers = answers.filter(attempt__user_id=options['user_id'])
+        answers = answers.order_by('attempt__user_id', 'id').values_list(
+            'attempt__user_id', 'question_id', 'is_correct'
+        )
+
+        users = 0
+        current_user, rows = None, {}
+        for user_id, question_id, is_correct in answers.iterator(chunk_size=2000):
+            if user_id != current_user:
+                if current_user is not None:
+                    self._save(current_user, rows)
+                    users += 1
+                current_user, rows = user_id, {}
+            area_id = area_of.get(question_id)
+            if area_id is None:
+                continue
+            row = rows.get(area_id)
+            if row is None:
+                row = rows[area_id] = UserAreaMastery(user_id=user_id, area_id=area_id, seen_question_ids=[])
+            apply_answer(row, question_id, is_correct)
+        if current_user is not None:
+            self._save(current_user, rows)
+            users += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt area mastery for {users} users'))
+
+    def _save(self, user_id, rows):
+        with transaction.atomic():
+            UserAreaMastery.objects.filter(user_id=user_id).delete()
+            UserAreaMastery.objects.bulk_create(rows.values())
@@ -0,0 +1,32 @@
+"""
+Django management command to rebuild topic quiz leaderboards from the DB.
+Boards are also reconciled lazily when their cache entry expires; run this
+after bulk changes to profiles or attempts.
+"""
+from django.core.management.base import BaseCommand
+from quiz import leaderboard
+from quiz.topic_models import TopicQuizAttempt
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the global, weekly and per-topic leaderboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--topic',
+            help='Rebuild the board for a specific topic slug only',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('topic'):
+            names = [leaderboard.board_name(leaderboard.BOARD_TOPIC, options['topic'])]
+        else:
+            topics = TopicQuizAttempt.objects.filter(status='completed').order_by().values_list('topic', flat=True).distinct()
+            names = [leaderboard.board_name(leaderboard.BOARD_GLOBAL), leaderboard.board_name(leaderboard.BOARD_WEEKLY)]
+            names += [leaderboard.board_name(leaderboard.BOARD_TOPIC, topic) for topic in topics]
+
+        for name in names:
+            count = leaderboard.rebuild(name)
+            self.stdout.write(f'  {name}: {count} entries')
+
+        self.stdout.write(self.style.SUCCESS('Done!'))
@@ -0,0 +1,30 @@
+"""
+Django management command to rebuild exam score histograms from completed
+attempts. Run once to backfill; afterwards histograms are maintained as
+attempts complete.
+"""
+from django.core.management.base import BaseCommand
+from quiz.models import Exam
+from quiz.score_percentiles import rebuild_histogram
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-exam score histograms used for percentile lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exam-id',
+            type=int,
+            help='Rebuild the histogram for a specific exam ID only',
+        )
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.all()
+        if options.get('exam_id'):
+            exams = exams.filter(id=options['exam_id'])
+
+        for exam in exams:
+            histogram = rebuild_histogram(exam.id)
+            self.stdout.write(f'  {exam.title}: {histogram.total} completed attempts')
+
+        self.stdout.write(self.style.SUCCESS('Done!'))
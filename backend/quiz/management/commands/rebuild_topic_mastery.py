@@ -0,0 +1,27 @@
+"""
+Django management command to rebuild per-topic mastery (UserTopicMastery)
+from topic quiz attempts and answers. Run once to backfill; afterwards
+rows are updated as quizzes start, answers are submitted and quizzes
+finish. Rows for the selected users are replaced, so run it when those
+users are idle.
+"""
+from django.core.management.base import BaseCommand
+
+from quiz.mastery import rebuild_topics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild UserTopicMastery rows from topic quiz attempts and answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            help='Rebuild topic mastery for a specific user ID only (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_topics(options.get('user_id'))
+        self.stdout.write(f'Wrote {rows} topic mastery rows')
+        self.stdout.write(self.style.SUCCESS('Done!'))
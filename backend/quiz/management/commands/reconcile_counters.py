@@ -0,0 +1,19 @@
+"""
+Django management command to recompute denormalized content counters
+(course video totals, deck card counts, chapter counts, practice question
+counts) and invalidate cached catalog data, answer keys and question pools.
+Signals keep these current for normal edits; run this after bulk imports or
+raw SQL changes.
+"""
+from django.core.management.base import BaseCommand
+from quiz.counters import reconcile_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized content counters from the database'
+
+    def handle(self, *args, **options):
+        for name, rows in reconcile_all().items():
+            self.stdout.write(f'  {name}: {rows} rows')
+
+        self.stdout.write(self.style.SUCCESS('Done!'))
@@ -0,0 +1,62 @@
+"""
+Django management command to rescore exam attempts after answer-key fixes.
+Recomputes QuestionAnswer.is_correct and ExamAttempt.score with set-based
+UPDATEs instead of per-row saves.
+"""
+from django.core.management.base import BaseCommand
+from quiz.models import Exam
+from quiz.rescoring import rescore_exam, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recompute answer correctness and scores for exam attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exam-id',
+            type=int,
+            help='Rescore a specific exam ID only',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report stale answers without updating anything',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of attempts updated per statement',
+        )
+
+    def handle(self, *args, **options):
+        exam_id = options.get('exam_id')
+        dry_run = options['dry_run']
+
+        if exam_id:
+            exam_ids = list(Exam.objects.filter(id=exam_id).values_list('id', flat=True))
+            if not exam_ids:
+                self.stderr.write(self.style.ERROR(f'Exam {exam_id} not found'))
+                return
+        else:
+            exam_ids = list(Exam.objects.values_list('id', flat=True))
+
+        self.stdout.write(f'Rescoring {len(exam_ids)} exams{" (dry run)" if dry_run else ""}...')
+
+        total_attempts = 0
+        for exam_id in exam_ids:
+            result = rescore_exam(exam_id, dry_run=dry_run, chunk_size=options['chunk_size'])
+            changed = result['changed_attempts']
+            total_attempts += len(changed)
+            if not changed:
+                continue
+            self.stdout.write(
+                f'  Exam {exam_id}: {result["stale_answers"]} stale answers, {len(changed)} attempts'
+            )
+            for row in changed:
+                self.stdout.write(
+                    f'    attempt {row["attempt_id"]} (user {row["user_id"]}): '
+                    f'{row["answers_changed"]} answers, score {row["old_score"]} -> {row["new_score"]}'
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Done! {total_attempts} attempts affected.'))
@@ -0,0 +1,202 @@
+"""
+Per-area mastery for topic quizzes.
+
+Every answer updates the user's UserAreaMastery row for the question's
+area (answer counts, an EWMA of correctness and the set of questions
+seen), behind the response on the quiz write queue. Starting a quiz reads
+the user's rows for the topic's areas in one query and samples questions
+weighted toward weak areas, preferring questions the user hasn't seen.
+
+Each user also has a UserTopicMastery row per practice topic, keyed by
+the PracticeQuestionTopic ID: record_topic() adds to its counters when a
+quiz starts, on every answer and when a quiz is completed. My Courses
+and the progress page read those rows (get_topic_mastery) instead of
+aggregating attempts. rebuild_topic_mastery rebuilds them.
+
+Slugs are unique per course only, so a slug's question pool can span
+several topics. An attempt counts toward one topic, resolved at start by
+topic_id_for_slug() and stored on TopicQuizAttempt.practice_topic; its
+start, answers and completion all go to that topic, live and on rebuild.
+"""
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .topic_models import UserAreaMastery, UserTopicMastery
+
+# Weight of the newest answer in the mastery average
+MASTERY_ALPHA = 0.3
+# Mastery assumed for areas the user hasn't answered yet
+MASTERY_PRIOR = 0.5
+# Keeps mastered areas in rotation
+MIN_AREA_WEIGHT = 0.15
+# Chance of redrawing when the drawn question was already seen
+SEEN_REJECTION = 0.8
+MAX_DRAWS_PER_QUESTION = 8
+
+
+def record_answer(user_id, area_id, question_id, is_correct):
+    """Fold one answer into the user's mastery row for the area."""
+    with transaction.atomic():
+        row, _ = UserAreaMastery.objects.select_for_update().get_or_create(user_id=user_id, area_id=area_id)
+        apply_answer(row, question_id, is_correct)
+        row.save()
+
+
+def topic_id_for_slug(topic_slug):
+    """The topic an attempt on this slug counts toward: the oldest topic with the slug."""
+    from .practice_question_models import PracticeQuestionTopic
+    return PracticeQuestionTopic.objects.filter(slug=topic_slug).order_by('id').values_list('id', flat=True).first()
+
+
+def quiz_score(correct, total_questions):
+    """Percentage of a quiz's questions answered correctly (stored as best_score)."""
+    return correct * 100 // total_questions if total_questions else 0
+
+
+def record_topic(user_id, topic_id, when=None, best_score=None, **increments):
+    """Add increments to the user's row for the topic, raising best_score to `best_score` if given."""
+    when = when or timezone.now()
+    updates = {field: F(field) + value for field, value in increments.items() if value}
+    updates['last_activity_at'] = Greatest('last_activity_at', Value(when))
+    if best_score is not None:
+        updates['best_score'] = Greatest('best_score', Value(best_score))
+    rows = UserTopicMastery.objects.filter(user_id=user_id, topic_id=topic_id)
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            UserTopicMastery.objects.create(
+                user_id=user_id, topic_id=topic_id, last_activity_at=when, best_score=best_score or 0, **increments
+            )
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(**updates)
+
+
+def get_topic_mastery(user_id):
+    """Return {topic_id: {field: value}} for every topic the user has practised."""
+    rows = UserTopicMastery.objects.filter(user_id=user_id).values(
+        'topic_id', 'quizzes_started', 'quizzes_completed', 'answered', 'correct', 'best_score', 'last_activity_at'
+    )
+    return {row.pop('topic_id'): row for row in rows}
+
+
+def compute_topic_rows(user_ids=None):
+    """Build {(user_id, topic_id): UserTopicMastery} from topic quiz attempts and answers."""
+    from .topic_models import TopicQuizAnswer, TopicQuizAttempt
+
+    attempts = TopicQuizAttempt.objects.all()
+    answers = TopicQuizAnswer.objects.all()
+    if user_ids is not None:
+        attempts = attempts.filter(user_id__in=user_ids)
+        answers = answers.filter(attempt__user_id__in=user_ids)
+
+    rows = {}
+
+    def row_for(user_id, topic_id, when):
+        row = rows.get((user_id, topic_id))
+        if row is None:
+            row = rows[(user_id, topic_id)] = UserTopicMastery(user_id=user_id, topic_id=topic_id, last_activity_at=when)
+        row.last_activity_at = max(row.last_activity_at, when)
+        return row
+
+    # Same attribution as the live path: everything goes to the attempt's practice_topic
+    for values in attempts.exclude(practice_topic=None).order_by().values('user_id', 'practice_topic_id').annotate(
+        started=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        best=Max(
+            F('correct_count') * 100 / F('total_questions'),
+            filter=Q(status='completed', total_questions__gt=0),
+        ),
+        last=Max(Coalesce('completed_at', 'started_at')),
+    ):
+        row = row_for(values['user_id'], values['practice_topic_id'], values['last'])
+        row.quizzes_started += values['started']
+        row.quizzes_completed += values['completed']
+        row.best_score = max(row.best_score, values['best'] or 0)
+
+    for values in answers.exclude(attempt__practice_topic=None).order_by().values(
+        'attempt__user_id', 'attempt__practice_topic_id'
+    ).annotate(
+        answered=Count('id'), correct=Count('id', filter=Q(is_correct=True)), last=Max('answered_at'),
+    ):
+        row = row_for(values['attempt__user_id'], values['attempt__practice_topic_id'], values['last'])
+        row.answered += values['answered']
+        row.correct += values['correct']
+    return rows
+
+
+def rebuild_topics(user_ids=None):
+    """Replace topic mastery rows (for some users, or everyone) with rows computed from attempts and answers."""
+    rows = compute_topic_rows(user_ids)
+    with transaction.atomic():
+        existing = UserTopicMastery.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        existing.delete()
+        UserTopicMastery.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
+
+
+def apply_answer(row, question_id, is_correct):
+    row.answered += 1
+    if is_correct:
+        row.correct += 1
+    row.mastery = (1 - MASTERY_ALPHA) * row.mastery + MASTERY_ALPHA * (1.0 if is_correct else 0.0)
+    if question_id not in row.seen_question_ids:
+        row.seen_question_ids.append(question_id)
+
+
+def load_mastery(user_id, area_ids):
+    """Return {area_id: (mastery, set of seen question IDs)} for the user."""
+    rows = UserAreaMastery.objects.filter(user_id=user_id, area_id__in=list(area_ids)).values_list(
+        'area_id', 'mastery', 'seen_question_ids'
+    )
+    return {area_id: (mastery, set(seen)) for area_id, mastery, seen in rows}
+
+
+def weighted_sample(pool_by_area, mastery, k, rng=random):
+    """
+    Draw k distinct questions from {area_id: [payload, ...]}.
+
+    Areas are weighted by size * (MIN_AREA_WEIGHT + weakness), so a new
+    user gets a uniform sample; within an area, already-seen questions are
+    usually redrawn. Expected O(areas + k).
+    """
+    areas = [area_id for area_id, questions in pool_by_area.items() if questions]
+    weights = [
+        len(pool_by_area[area_id]) * (MIN_AREA_WEIGHT + 1 - mastery.get(area_id, (MASTERY_PRIOR,))[0])
+        for area_id in areas
+    ]
+    remaining = {area_id: len(pool_by_area[area_id]) for area_id in areas}
+    k = min(k, sum(remaining.values()))
+    chosen, chosen_ids = [], set()
+
+    while len(chosen) < k:
+        index = rng.choices(range(len(areas)), weights=weights)[0]
+        area_id = areas[index]
+        questions = pool_by_area[area_id]
+        seen = mastery.get(area_id, (None, ()))[1]
+
+        pick = None
+        for _ in range(MAX_DRAWS_PER_QUESTION):
+            candidate = questions[rng.randrange(len(questions))]
+            if candidate['id'] in chosen_ids:
+                continue
+            pick = candidate
+            if candidate['id'] not in seen or rng.random() >= SEEN_REJECTION:
+                break
+        if pick is None:
+            # Area nearly exhausted - take the first question not chosen yet
+            pick = next(q for q in questions if q['id'] not in chosen_ids)
+
+        chosen.append(pick)
+        chosen_ids.add(pick['id'])
+        remaining[area_id] -= 1
+        if not remaining[area_id]:
+            weights[index] = 0
+    return chosen
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0029_topicquizattempt_correct_answers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='snapshot_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
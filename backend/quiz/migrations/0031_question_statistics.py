@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0030_exam_snapshot_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responses', models.IntegerField(default=0)),
+                ('correct_responses', models.IntegerField(default=0)),
+                ('score_sum_correct', models.FloatField(default=0)),
+                ('score_sum_incorrect', models.FloatField(default=0)),
+                ('score_sum_squares', models.FloatField(default=0)),
+                ('option_counts', models.JSONField(blank=True, default=dict, help_text='Selections per option label')),
+                ('p_value', models.FloatField(blank=True, help_text='Proportion of responses that were correct', null=True)),
+                ('discrimination', models.FloatField(blank=True, help_text='Point-biserial correlation with attempt score', null=True)),
+                ('flag', models.CharField(blank=True, choices=[('', 'OK'), ('too_easy', 'Too easy'), ('too_hard', 'Too hard'), ('low_discrimination', 'Low discrimination'), ('possible_miskey', 'Possible mis-key')], db_index=True, default='', max_length=30)),
+                ('last_attempt_ended_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statistics', to='quiz.exam')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='quiz.question')),
+            ],
+            options={
+                'verbose_name': 'Question Statistics',
+                'verbose_name_plural': 'Question Statistics',
+                'indexes': [models.Index(fields=['exam', 'flag'], name='quiz_questi_exam_id_2e09b7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0031_question_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamScoreHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counts', models.JSONField(blank=True, default=list)),
+                ('total', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_histogram', to='quiz.exam')),
+            ],
+            options={
+                'verbose_name': 'Exam Score Histogram',
+                'verbose_name_plural': 'Exam Score Histograms',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0032_exam_score_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topicquizattempt',
+            name='question_versions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='PracticeQuestionVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_pk', models.IntegerField(db_index=True, help_text='PracticeQuestion primary key')),
+                ('version', models.PositiveIntegerField()),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('payload', models.JSONField(help_text='{id, question_id, text, difficulty, options, correct_answer, explanation}')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Practice Question Version',
+                'verbose_name_plural': 'Practice Question Versions',
+                'unique_together': {('question_pk', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Migration to collapse per-attempt question snapshots into PracticeQuestionVersion rows
+
+import hashlib
+import json
+
+from django.db import migrations
+
+PAYLOAD_FIELDS = ('id', 'question_id', 'text', 'difficulty', 'options', 'correct_answer', 'explanation')
+CHUNK_SIZE = 500
+
+
+def _content_hash(payload):
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def collapse_snapshots(apps, schema_editor):
+    TopicQuizAttempt = apps.get_model('quiz', 'TopicQuizAttempt')
+    PracticeQuestionVersion = apps.get_model('quiz', 'PracticeQuestionVersion')
+
+    # content_hash -> version, and the latest version number per question
+    known = dict(PracticeQuestionVersion.objects.values_list('content_hash', 'version'))
+    latest = {}
+    for question_pk, version in PracticeQuestionVersion.objects.values_list('question_pk', 'version'):
+        latest[question_pk] = max(version, latest.get(question_pk, 0))
+
+    attempts = TopicQuizAttempt.objects.filter(questions_snapshot__isnull=False).order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(attempts.filter(id__gt=last_id).only('id', 'questions_snapshot')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        new_versions = []
+        for attempt in chunk:
+            pairs = []
+            for question in attempt.questions_snapshot or []:
+                payload = {field: question.get(field) for field in PAYLOAD_FIELDS}
+                content_hash = _content_hash(payload)
+                if content_hash not in known:
+                    version = latest.get(payload['id'], 0) + 1
+                    latest[payload['id']] = version
+                    known[content_hash] = version
+                    new_versions.append(PracticeQuestionVersion(
+                        question_pk=payload['id'],
+                        version=version,
+                        content_hash=content_hash,
+                        payload=payload,
+                    ))
+                pairs.append([payload['id'], known[content_hash]])
+            attempt.question_versions = pairs
+            attempt.questions_snapshot = None
+
+        PracticeQuestionVersion.objects.bulk_create(new_versions)
+        TopicQuizAttempt.objects.bulk_update(chunk, ['question_versions', 'questions_snapshot'])
+
+
+def restore_snapshots(apps, schema_editor):
+    TopicQuizAttempt = apps.get_model('quiz', 'TopicQuizAttempt')
+    PracticeQuestionVersion = apps.get_model('quiz', 'PracticeQuestionVersion')
+
+    payloads = {
+        (question_pk, version): payload
+        for question_pk, version, payload in PracticeQuestionVersion.objects.values_list('question_pk', 'version', 'payload')
+    }
+    attempts = TopicQuizAttempt.objects.exclude(question_versions=[]).order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(attempts.filter(id__gt=last_id).only('id', 'question_versions')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for attempt in chunk:
+            attempt.questions_snapshot = [
+                payloads[(pk, version)] for pk, version in attempt.question_versions if (pk, version) in payloads
+            ]
+        TopicQuizAttempt.objects.bulk_update(chunk, ['questions_snapshot'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0033_practice_question_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(collapse_snapshots, restore_snapshots),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0034_collapse_topic_quiz_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAreaMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answered', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('mastery', models.FloatField(default=0.5)),
+                ('seen_question_ids', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_mastery', to='quiz.practicequestionarea')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='area_mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Area Mastery',
+                'verbose_name_plural': 'User Area Mastery',
+                'unique_together': {('user', 'area')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0035_user_area_mastery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlashcardReviewState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repetitions', models.PositiveSmallIntegerField(default=0)),
+                ('lapses', models.PositiveSmallIntegerField(default=0)),
+                ('interval_days', models.PositiveIntegerField(default=0)),
+                ('ease', models.FloatField(default=2.5)),
+                ('due_at', models.DateTimeField()),
+                ('last_reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to='quiz.flashcard')),
+                ('deck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_states', to='quiz.flashcarddeck')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flashcard_reviews', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Flashcard Review State',
+                'verbose_name_plural': 'Flashcard Review States',
+                'indexes': [models.Index(fields=['user', 'due_at'], name='quiz_flashc_user_id_0dfa53_idx'), models.Index(fields=['user', 'deck', 'due_at'], name='quiz_flashc_user_id_972686_idx')],
+                'unique_together': {('user', 'card')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _child_aggregate(queryset, parent_field, aggregate=None):
+    rows = (
+        queryset.filter(**{parent_field: OuterRef('pk')})
+        .order_by()
+        .values(parent_field)
+        .annotate(value=aggregate or Count('pk'))
+        .values('value')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Video = apps.get_model('quiz', 'Video')
+    Flashcard = apps.get_model('quiz', 'Flashcard')
+    SummaryNotesChapter = apps.get_model('quiz', 'SummaryNotesChapter')
+    PracticeQuestion = apps.get_model('quiz', 'PracticeQuestion')
+    PracticeQuestionArea = apps.get_model('quiz', 'PracticeQuestionArea')
+
+    videos = Video.objects.filter(is_active=True)
+    apps.get_model('quiz', 'VideoCourse').objects.update(
+        total_videos=_child_aggregate(videos, 'course'),
+        total_duration_seconds=_child_aggregate(videos, 'course', Sum('duration_seconds')),
+    )
+    apps.get_model('quiz', 'FlashcardDeck').objects.update(
+        total_cards=_child_aggregate(Flashcard.objects.filter(is_active=True), 'deck'),
+    )
+    apps.get_model('quiz', 'SummaryNotes').objects.update(
+        total_chapters=_child_aggregate(SummaryNotesChapter.objects.filter(is_active=True), 'summary_notes'),
+    )
+    # Imported question counts may be stale; recount them from the questions
+    PracticeQuestionArea.objects.update(
+        question_count=_child_aggregate(PracticeQuestion.objects.all(), 'area'),
+    )
+    apps.get_model('quiz', 'PracticeQuestionTopic').objects.update(
+        area_count=_child_aggregate(PracticeQuestionArea.objects.all(), 'topic'),
+        question_count=_child_aggregate(PracticeQuestion.objects.all(), 'area__topic'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0036_flashcard_review_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcarddeck',
+            name='total_cards',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='summarynotes',
+            name='total_chapters',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='videocourse',
+            name='total_duration_seconds',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='videocourse',
+            name='total_videos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
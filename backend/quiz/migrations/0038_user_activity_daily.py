@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0037_content_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivityDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quizzes_started', models.IntegerField(default=0)),
+                ('quizzes_completed', models.IntegerField(default=0)),
+                ('questions_correct', models.IntegerField(default=0)),
+                ('questions_wrong', models.IntegerField(default=0)),
+                ('points_earned', models.IntegerField(default=0)),
+                ('quiz_seconds', models.IntegerField(default=0)),
+                ('exams_started', models.IntegerField(default=0)),
+                ('exams_completed', models.IntegerField(default=0)),
+                ('exams_passed', models.IntegerField(default=0)),
+                ('exam_score_sum', models.IntegerField(default=0, help_text='Sum of completed exam scores (for averages)')),
+                ('exam_seconds', models.IntegerField(default=0)),
+                ('video_seconds', models.IntegerField(default=0)),
+                ('videos_completed', models.IntegerField(default=0)),
+                ('textbooks_read', models.IntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Activity (Daily)',
+                'verbose_name_plural': 'User Activity (Daily)',
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0039_user_activity_bitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserResumePointer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('textbook_page', models.IntegerField(default=1)),
+                ('textbook_total_pages', models.IntegerField(default=1)),
+                ('reading_at', models.DateTimeField(blank=True, null=True)),
+                ('video_position', models.IntegerField(default=1)),
+                ('video_total', models.IntegerField(default=0)),
+                ('video_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz_index', models.IntegerField(default=0)),
+                ('quiz_total', models.IntegerField(default=0)),
+                ('quiz_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz_attempt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quiz.topicquizattempt')),
+                ('textbook', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quiz.textbook')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resume_pointer', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quiz.video')),
+            ],
+            options={
+                'verbose_name': 'User Resume Pointer',
+                'verbose_name_plural': 'User Resume Pointers',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0040_user_resume_pointer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='topicquizattempt',
+            index=models.Index(fields=['user', '-started_at'], include=('topic', 'status', 'points_earned'), name='topic_attempt_user_started'),
+        ),
+        migrations.RemoveIndex(
+            model_name='topicquizattempt',
+            name='quiz_topicq_user_id_e40c55_idx',
+        ),
+    ]
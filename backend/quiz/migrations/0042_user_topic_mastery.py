@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0041_topic_attempt_covering_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTopicMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quizzes_started', models.IntegerField(default=0)),
+                ('quizzes_completed', models.IntegerField(default=0)),
+                ('answered', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('best_score', models.IntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField()),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_mastery', to='quiz.practicequestiontopic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Topic Mastery',
+                'verbose_name_plural': 'User Topic Mastery',
+                'unique_together': {('user', 'topic')},
+            },
+        ),
+    ]
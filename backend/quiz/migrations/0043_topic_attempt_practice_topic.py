@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_practice_topic(apps, schema_editor):
+    """Point existing attempts at the oldest topic with their slug."""
+    PracticeQuestionTopic = apps.get_model('quiz', 'PracticeQuestionTopic')
+    TopicQuizAttempt = apps.get_model('quiz', 'TopicQuizAttempt')
+    topic_of_slug = {}
+    for topic_id, slug in PracticeQuestionTopic.objects.order_by('id').values_list('id', 'slug'):
+        topic_of_slug.setdefault(slug, topic_id)
+    for slug, topic_id in topic_of_slug.items():
+        TopicQuizAttempt.objects.filter(topic=slug, practice_topic__isnull=True).update(practice_topic_id=topic_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0042_user_topic_mastery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topicquizattempt',
+            name='practice_topic',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quiz.practicequestiontopic'),
+        ),
+        migrations.RunPython(backfill_practice_topic, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_exams_completed(apps, schema_editor):
+    # Nearly every completed exam has a score; backfill_user_activity makes it exact
+    UserActivityDaily = apps.get_model('quiz', 'UserActivityDaily')
+    UserActivityDaily.objects.update(exams_scored=F('exams_completed'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0043_topic_attempt_practice_topic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useractivitydaily',
+            name='exams_scored',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(copy_exams_completed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0044_activity_exams_scored'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionstatistics',
+            name='recent_attempt_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
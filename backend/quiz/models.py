@@ -28,6 +28,8 @@ class Exam(models.Model):
     passing_score_percentage = models.IntegerField(default=70, validators=[MinValueValidator(0), MaxValueValidator(100)])
     # Pre-serialized question data for fast results page loading
     questions_snapshot = models.JSONField(null=True, blank=True, help_text='Pre-serialized question data for fast loading')
+    # Bumped whenever questions_snapshot changes; keys the pre-encoded snapshot cache
+    snapshot_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
@@ -42,6 +44,18 @@ class Exam(models.Model):
         """Update total_questions count before saving"""
         if self.pk:
             self.total_questions = self.questions.count()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Full save: only a changed snapshot invalidates the encoded copies
+            snapshot_changed = self.pk is not None and self.questions_snapshot != (
+                Exam.objects.filter(pk=self.pk).values_list('questions_snapshot', flat=True).first()
+            )
+        else:
+            snapshot_changed = 'questions_snapshot' in update_fields
+        if snapshot_changed:
+            self.snapshot_version += 1
+            if update_fields is not None:
+                kwargs['update_fields'] = list(update_fields) + ['snapshot_version']
         super().save(*args, **kwargs)
 
 
@@ -168,8 +182,12 @@ class QuestionAnswer(models.Model):
         return f"{self.exam_attempt.user.username} - Q{self.question.question_number}"
 
     def save(self, *args, **kwargs):
-        """Automatically determine if answer is correct"""
-        self.is_correct = self.selected_answer == self.question.correct_answer
+        """Automatically determine if answer is correct (graded from the cached answer key)"""
+        from .answer_keys import get_exam_answer_key
+        correct_answer = get_exam_answer_key(self.exam_attempt.exam_id).get(self.question_id)
+        if correct_answer is None:
+            correct_answer = self.question.correct_answer
+        self.is_correct = self.selected_answer == correct_answer
         super().save(*args, **kwargs)
 
 
@@ -217,13 +235,22 @@ class Review(models.Model):
 
 
 # Import flashcard models
-from .flashcard_models import FlashcardDeck, Flashcard, FlashcardProgress
+from .flashcard_models import FlashcardDeck, Flashcard, FlashcardProgress, FlashcardReviewState
 
 # Import practice question models
 from .practice_question_models import (
     PracticeQuestionCourse,
     PracticeQuestionTopic,
     PracticeQuestionArea,
-    PracticeQuestion
+    PracticeQuestion,
+    PracticeQuestionVersion
 )
 
+# Import analytics models
+from .analytics_models import QuestionStatistics, ExamScoreHistogram
+
+# Import activity rollup models
+from .activity_models import UserActivityDaily, UserActivityBitmap
+
+# Import resume pointer model
+from .resume_models import UserResumePointer
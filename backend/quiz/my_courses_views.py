@@ -5,12 +5,15 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Sum, Q
-from django.core.cache import cache
+from django.db.models import Count, F, Sum
 import logging
 
-from .models import Exam, ExamAttempt, Question
-from .topic_models import TopicQuizAttempt
+from .cache_tags import (
+    CATALOG_FLASHCARDS, CATALOG_PRACTICE, CATALOG_SUMMARY_NOTES, CATALOG_TEXTBOOKS, CATALOG_VIDEOS,
+    get_or_set, user_tag,
+)
+from .models import ExamAttempt
+from . import mastery
 from .textbook_models import Textbook
 from .video_models import VideoCourse, VideoProgress
 from .flashcard_models import FlashcardDeck, FlashcardProgress
@@ -25,7 +28,6 @@ SUBJECT_MAP = {
         'display_name': 'Business Law',
         'category': 'FLK1',
         'video_titles': ['Business Law'],
-        'quiz_topics': [],
         'textbook_subjects': ['Business Law'],
         'flashcard_subjects': ['Business Law'],
         'practice_course': 'flk-1',
@@ -35,7 +37,6 @@ SUBJECT_MAP = {
         'display_name': 'Constitutional Law',
         'category': 'FLK1',
         'video_titles': ['Constitutional Law'],
-        'quiz_topics': [],
         'textbook_subjects': ['Constitutional Law'],
         'flashcard_subjects': ['Constitutional Law'],
         'practice_course': 'flk-1',
@@ -45,7 +46,6 @@ SUBJECT_MAP = {
         'display_name': 'Contract Law',
         'category': 'FLK1',
         'video_titles': ['Contract Law'],
-        'quiz_topics': [],
         'textbook_subjects': ['Contract Law'],
         'flashcard_subjects': ['Contract Law'],
         'practice_course': 'flk-1',
@@ -55,7 +55,6 @@ SUBJECT_MAP = {
         'display_name': 'Dispute Resolution',
         'category': 'FLK1',
         'video_titles': ['Dispute Resolution'],
-        'quiz_topics': [],
         'textbook_subjects': ['Dispute Resolution'],
         'flashcard_subjects': ['Dispute Resolution'],
         'practice_course': 'flk-1',
@@ -65,7 +64,6 @@ SUBJECT_MAP = {
         'display_name': 'Legal Service',
         'category': 'FLK1',
         'video_titles': ['Legal Service'],
-        'quiz_topics': [],
         'textbook_subjects': ['Legal Services'],
         'flashcard_subjects': ['Legal Services'],
         'practice_course': 'flk-1',
@@ -75,7 +73,6 @@ SUBJECT_MAP = {
         'display_name': 'Torts',
         'category': 'FLK1',
         'video_titles': ['Torts'],
-        'quiz_topics': [],
         'textbook_subjects': ['Tort Law'],
         'flashcard_subjects': ['Tort Law', 'Torts'],
         'practice_course': 'flk-1',
@@ -85,7 +82,6 @@ SUBJECT_MAP = {
         'display_name': 'Criminal Practice',
         'category': 'FLK2',
         'video_titles': ['Criminal Practice'],
-        'quiz_topics': ['criminal_law', 'criminal_practice'],
         'textbook_subjects': ['Criminal Law', 'Criminal Practice'],
         'flashcard_subjects': ['Criminal Law', 'Criminal Practice'],
         'practice_course': 'flk-2',
@@ -95,7 +91,6 @@ SUBJECT_MAP = {
         'display_name': 'Land Law',
         'category': 'FLK2',
         'video_titles': ['Land Law'],
-        'quiz_topics': ['land_law'],
         'textbook_subjects': ['Land Law'],
         'flashcard_subjects': ['Land Law'],
         'practice_course': 'flk-2',
@@ -105,7 +100,6 @@ SUBJECT_MAP = {
         'display_name': 'Property Practice',
         'category': 'FLK2',
         'video_titles': ['Property Practice'],
-        'quiz_topics': [],
         'textbook_subjects': ['Property Practice'],
         'flashcard_subjects': ['Property Practice'],
         'practice_course': 'flk-2',
@@ -115,7 +109,6 @@ SUBJECT_MAP = {
         'display_name': 'Professional Ethics',
         'category': 'FLK2',
         'video_titles': ['Professional Ethics'],
-        'quiz_topics': ['professional_ethics'],
         'textbook_subjects': ['Professional Ethics'],
         'flashcard_subjects': ['Professional Ethics'],
         'practice_course': 'flk-1',
@@ -125,7 +118,6 @@ SUBJECT_MAP = {
         'display_name': 'Solicitors Account',
         'category': 'FLK2',
         'video_titles': ['Solicitors Account'],
-        'quiz_topics': ['solicitors_accounts'],
         'textbook_subjects': ['Solicitors Accounts'],
         'flashcard_subjects': ['Solicitors Accounts'],
         'practice_course': 'flk-2',
@@ -135,7 +127,6 @@ SUBJECT_MAP = {
         'display_name': 'Tax Law',
         'category': 'FLK2',
         'video_titles': ['Tax Law'],
-        'quiz_topics': ['taxation'],
         'textbook_subjects': ['Tax Law', 'Taxation'],
         'flashcard_subjects': ['Tax Law', 'Taxation'],
         'practice_course': 'flk-2',
@@ -145,7 +136,6 @@ SUBJECT_MAP = {
         'display_name': 'Trusts',
         'category': 'FLK2',
         'video_titles': ['Trusts'],
-        'quiz_topics': ['trusts', 'wills'],
         'textbook_subjects': ['Trusts', 'Trusts Law'],
         'flashcard_subjects': ['Trusts', 'Trusts Law'],
         'practice_course': 'flk-2',
@@ -154,6 +144,135 @@ SUBJECT_MAP = {
 }
 
 
+# Catalog data the cached parts of my-courses are built from
+STATIC_TAGS = [CATALOG_VIDEOS, CATALOG_TEXTBOOKS, CATALOG_FLASHCARDS, CATALOG_PRACTICE]
+USER_CATALOG_TAGS = [CATALOG_FLASHCARDS, CATALOG_SUMMARY_NOTES]
+
+
+def _build_static_data():
+    """Course data shared by all users (counts come from the stored counters)."""
+    # OPTIMIZED: Fetch all static data in minimal queries
+    # Query 1: Get video courses with their stored video counts (single query)
+    video_courses = list(VideoCourse.objects.filter(is_active=True).values(
+        'id', 'title', active_video_count=F('total_videos')
+    ))
+
+    # Build lookup map for courses
+    course_map = {vc['title']: vc for vc in video_courses}
+
+    # Query 2: Get textbooks (single query)
+    textbooks = list(Textbook.objects.values('id', 'title', 'subject'))
+    textbook_by_subject = {}
+    for tb in textbooks:
+        if tb['subject'] not in textbook_by_subject:
+            textbook_by_subject[tb['subject']] = tb
+
+    # Query 3: Get flashcard decks by subject (single query)
+    flashcard_decks = list(FlashcardDeck.objects.filter(is_active=True).values(
+        'id', 'subject', card_count=F('total_cards')
+    ))
+    flashcard_by_subject = {}
+    for fd in flashcard_decks:
+        subj = fd['subject']
+        if subj not in flashcard_by_subject:
+            flashcard_by_subject[subj] = {'total_decks': 0, 'total_cards': 0}
+        flashcard_by_subject[subj]['total_decks'] += 1
+        flashcard_by_subject[subj]['total_cards'] += fd['card_count']
+
+    # Query 4: Get practice question courses (single query)
+    practice_courses = list(PracticeQuestionCourse.objects.annotate(
+        q_count=Sum('topics__question_count')
+    ).values('slug', 'q_count'))
+    practice_by_slug = {pc['slug']: pc['q_count'] or 0 for pc in practice_courses}
+
+    # Query 5: Practice topic IDs by course and topic slug (quiz progress is keyed by topic ID)
+    practice_topic_ids = {}
+    for topic_id, course_slug, topic_slug in PracticeQuestionTopic.objects.values_list('id', 'course__slug', 'slug'):
+        practice_topic_ids.setdefault(course_slug, {})[topic_slug] = topic_id
+
+    return {
+        'course_map': course_map,
+        'textbook_by_subject': textbook_by_subject,
+        'flashcard_by_subject': flashcard_by_subject,
+        'practice_by_slug': practice_by_slug,
+        'practice_topic_ids': practice_topic_ids,
+    }
+
+
+def _build_user_data(user):
+    """Per-user progress counts across content types."""
+    video_progress = {}
+    quiz_progress = {}
+    flashcard_progress = {}
+    summary_notes_progress = {}
+    exam_progress = 0
+
+    if user.is_authenticated:
+        # Query: Get video progress for user
+        progress_data = VideoProgress.objects.filter(
+            user=user,
+            is_completed=True
+        ).values('video__course_id').annotate(
+            completed_count=Count('id')
+        )
+        for p in progress_data:
+            video_progress[p['video__course_id']] = p['completed_count']
+
+        # Query: Get quiz progress by practice topic ID (topic mastery rollup)
+        quiz_progress = mastery.get_topic_mastery(user.id)
+
+        # Query: Get mock exam progress
+        exam_progress = ExamAttempt.objects.filter(
+            user=user,
+            status='completed'
+        ).count()
+
+        # Query: Get flashcard progress by deck
+        fp_data = FlashcardProgress.objects.filter(user=user).values('deck__subject').annotate(
+            studied=Sum('cards_studied'),
+            correct=Sum('correct_answers')
+        )
+        for fp in fp_data:
+            if fp['deck__subject']:
+                flashcard_progress[fp['deck__subject']] = {
+                    'studied': fp['studied'] or 0,
+                    'correct': fp['correct'] or 0
+                }
+
+        # Query: Get summary notes progress by subject
+        summary_notes_progress_list = SummaryNotesProgress.objects.filter(
+            user=user
+        ).values(
+            'summary_notes__subject',
+            'summary_notes__id',
+            total_chapters=F('summary_notes__total_chapters'),
+        )
+        for snp in summary_notes_progress_list:
+            subject = snp['summary_notes__subject']
+            if subject:
+                # Get completed chapters from JSONField
+                progress_obj = SummaryNotesProgress.objects.filter(
+                    user=user,
+                    summary_notes_id=snp['summary_notes__id']
+                ).first()
+                if progress_obj:
+                    completed = len(progress_obj.completed_chapters) if progress_obj.completed_chapters else 0
+                    total = snp['total_chapters']
+                    summary_notes_progress[subject] = {
+                        'completed': completed,
+                        'total': total,
+                        'percentage': round((completed / total) * 100) if total > 0 else 0
+                    }
+
+    return {
+        'video_progress': video_progress,
+        'quiz_progress': quiz_progress,
+        'flashcard_progress': flashcard_progress,
+        'exam_progress': exam_progress,
+        'summary_notes_progress': summary_notes_progress,
+    }
+
+
 class MyCoursesViewSet(viewsets.ViewSet):
     """
     Unified My Courses ViewSet - Aggregates progress across all content types.
@@ -169,152 +288,20 @@ class MyCoursesViewSet(viewsets.ViewSet):
         user = request.user
         
         try:
-            # CACHE KEY for static course data (shared across all users)
-            static_cache_key = 'my_courses_static_data_v2'
-            
-            # Try to get static data from cache first
-            static_data = cache.get(static_cache_key)
-            
-            if static_data is None:
-                # OPTIMIZED: Fetch all static data in minimal queries
-                # Query 1: Get video courses with video counts (single query)
-                video_courses = list(VideoCourse.objects.filter(is_active=True).annotate(
-                    active_video_count=Count('videos', filter=Q(videos__is_active=True))
-                ).values('id', 'title', 'active_video_count'))
-                
-                # Build lookup map for courses
-                course_map = {vc['title']: vc for vc in video_courses}
-                
-                # Query 2: Get textbooks (single query)
-                textbooks = list(Textbook.objects.values('id', 'title', 'subject'))
-                textbook_by_subject = {}
-                for tb in textbooks:
-                    if tb['subject'] not in textbook_by_subject:
-                        textbook_by_subject[tb['subject']] = tb
-                
-                # Query 3: Get flashcard decks by subject (single query)
-                flashcard_decks = list(FlashcardDeck.objects.filter(is_active=True).annotate(
-                    card_count=Count('cards', filter=Q(cards__is_active=True))
-                ).values('id', 'subject', 'card_count'))
-                flashcard_by_subject = {}
-                for fd in flashcard_decks:
-                    subj = fd['subject']
-                    if subj not in flashcard_by_subject:
-                        flashcard_by_subject[subj] = {'total_decks': 0, 'total_cards': 0}
-                    flashcard_by_subject[subj]['total_decks'] += 1
-                    flashcard_by_subject[subj]['total_cards'] += fd['card_count']
-                
-                # Query 4: Get practice question courses (single query)
-                practice_courses = list(PracticeQuestionCourse.objects.annotate(
-                    q_count=Count('topics__areas__questions')
-                ).values('slug', 'q_count'))
-                practice_by_slug = {pc['slug']: pc['q_count'] for pc in practice_courses}
-                
-                # Store static data in cache for 30 minutes
-                static_data = {
-                    'course_map': course_map,
-                    'textbook_by_subject': textbook_by_subject,
-                    'flashcard_by_subject': flashcard_by_subject,
-                    'practice_by_slug': practice_by_slug,
-                }
-                cache.set(static_cache_key, static_data, 1800)  # 30 min
+            # Static course data (shared across all users), invalidated by catalog changes
+            static_data = get_or_set('my_courses_static', STATIC_TAGS, _build_static_data, local=True)
             
             # Unpack static data
             course_map = static_data['course_map']
             textbook_by_subject = static_data['textbook_by_subject']
             flashcard_by_subject = static_data['flashcard_by_subject']
             practice_by_slug = static_data['practice_by_slug']
+            practice_topic_ids = static_data.get('practice_topic_ids', {})
             
-            # USER-SPECIFIC DATA (not cached as long, or use user-specific cache key)
-            user_cache_key = f'my_courses_user_{user.id}' if user.is_authenticated else None
-            user_data = cache.get(user_cache_key) if user_cache_key else None
-            
-            if user_data is None:
-                video_progress = {}
-                quiz_progress = {}
-                flashcard_progress = {}
-                summary_notes_progress = {}
-                exam_progress = 0
-                
-                if user.is_authenticated:
-                    # Query: Get video progress for user
-                    progress_data = VideoProgress.objects.filter(
-                        user=user,
-                        is_completed=True
-                    ).values('video__course_id').annotate(
-                        completed_count=Count('id')
-                    )
-                    for p in progress_data:
-                        video_progress[p['video__course_id']] = p['completed_count']
-                    
-                    # Query: Get quiz progress by topic
-                    quiz_data = TopicQuizAttempt.objects.filter(
-                        user=user,
-                        status='completed'
-                    ).values('topic').annotate(
-                        completed_count=Count('id'),
-                        total_correct=Sum('correct_count')
-                    )
-                    for q in quiz_data:
-                        quiz_progress[q['topic']] = {
-                            'completed': q['completed_count'],
-                            'correct': q['total_correct'] or 0
-                        }
-                    
-                    # Query: Get mock exam progress
-                    exam_progress = ExamAttempt.objects.filter(
-                        user=user,
-                        status='completed'
-                    ).count()
-                    
-                    # Query: Get flashcard progress by deck
-                    fp_data = FlashcardProgress.objects.filter(user=user).values('deck__subject').annotate(
-                        studied=Sum('cards_studied'),
-                        correct=Sum('correct_answers')
-                    )
-                    for fp in fp_data:
-                        if fp['deck__subject']:
-                            flashcard_progress[fp['deck__subject']] = {
-                                'studied': fp['studied'] or 0,
-                                'correct': fp['correct'] or 0
-                            }
-                    
-                    # Query: Get summary notes progress by subject
-                    summary_notes_progress_list = SummaryNotesProgress.objects.filter(
-                        user=user
-                    ).select_related('summary_notes').values(
-                        'summary_notes__subject',
-                        'summary_notes__id'
-                    ).annotate(
-                        total_chapters=Count('summary_notes__chapters', filter=Q(summary_notes__chapters__is_active=True))
-                    )
-                    for snp in summary_notes_progress_list:
-                        subject = snp['summary_notes__subject']
-                        if subject:
-                            # Get completed chapters from JSONField
-                            progress_obj = SummaryNotesProgress.objects.filter(
-                                user=user,
-                                summary_notes_id=snp['summary_notes__id']
-                            ).first()
-                            if progress_obj:
-                                completed = len(progress_obj.completed_chapters) if progress_obj.completed_chapters else 0
-                                total = snp['total_chapters']
-                                summary_notes_progress[subject] = {
-                                    'completed': completed,
-                                    'total': total,
-                                    'percentage': round((completed / total) * 100) if total > 0 else 0
-                                }
-                
-                user_data = {
-                    'video_progress': video_progress,
-                    'quiz_progress': quiz_progress,
-                    'flashcard_progress': flashcard_progress,
-                    'exam_progress': exam_progress,
-                    'summary_notes_progress': summary_notes_progress,
-                }
-                # Cache user data for 2 minutes
-                if user_cache_key:
-                    cache.set(user_cache_key, user_data, 120)
+            # User progress, invalidated when any of the user's progress changes
+            user_data = get_or_set(
+                'my_courses_user', [user_tag(user.id)] + USER_CATALOG_TAGS, lambda: _build_user_data(user)
+            )
             
             # Unpack user data
             video_progress = user_data['video_progress']
@@ -345,11 +332,10 @@ class MyCoursesViewSet(viewsets.ViewSet):
                         break
                 
                 # Quiz progress (cap at 100%)
-                for quiz_topic in subject_info['quiz_topics']:
-                    if quiz_topic in quiz_progress:
-                        quiz_prog = min(100, quiz_progress[quiz_topic]['completed'] * 10)
-                        has_activity = True
-                        break
+                topic_id = practice_topic_ids.get(subject_info['practice_course'], {}).get(subject_info['practice_topic'])
+                if topic_id in quiz_progress:
+                    quiz_prog = min(100, quiz_progress[topic_id]['quizzes_completed'] * 10)
+                    has_activity = True
                 
                 # Flashcard progress
                 fc_total = 0
@@ -390,7 +376,7 @@ class MyCoursesViewSet(viewsets.ViewSet):
                 modes_with_data = []
                 if video_prog > 0 or any(v in course_map for v in subject_info['video_titles']):
                     modes_with_data.append(video_prog)
-                if quiz_prog > 0 or subject_info['quiz_topics']:
+                if quiz_prog > 0 or topic_id is not None:
                     modes_with_data.append(quiz_prog)
                 if flashcard_prog > 0 or fc_total > 0:
                     modes_with_data.append(flashcard_prog)
@@ -120,3 +120,25 @@ class PracticeQuestion(models.Model):
 
     def __str__(self):
         return f"{self.area.topic.name} - Q{self.question_id}"
+
+
+class PracticeQuestionVersion(models.Model):
+    """
+    Immutable copy of a practice question's content, keyed by content hash.
+    Quiz attempts reference (question pk, version) pairs instead of copying
+    the question text, options and explanation into every attempt row.
+    """
+    # Plain integer so versions outlive deleted questions
+    question_pk = models.IntegerField(db_index=True, help_text="PracticeQuestion primary key")
+    version = models.PositiveIntegerField()
+    content_hash = models.CharField(max_length=64, unique=True)
+    payload = models.JSONField(help_text="{id, question_id, text, difficulty, options, correct_answer, explanation}")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['question_pk', 'version']
+        verbose_name = "Practice Question Version"
+        verbose_name_plural = "Practice Question Versions"
+
+    def __str__(self):
+        return f"Q{self.question_pk} v{self.version}"
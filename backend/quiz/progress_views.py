@@ -3,15 +3,29 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.db.models import Count, Sum
 from datetime import timedelta
 import logging
 
-from .models import Exam, ExamAttempt, Question
+from .cache_tags import CATALOG_PRACTICE, get_or_set
+from .models import ExamAttempt
+from .practice_question_models import PracticeQuestionTopic
 from .topic_models import UserGameProfile, TopicQuizAttempt
+from . import activity, mastery
 
 logger = logging.getLogger(__name__)
 
+TREND_WEEKS = 6
+RECENT_ACTIVITY_LIMIT = 10
+
+
+def _practice_topics():
+    """Practice topics with questions, cached until practice content changes."""
+    return get_or_set('progress_practice_topics', [CATALOG_PRACTICE], lambda: list(
+        PracticeQuestionTopic.objects.filter(question_count__gt=0).order_by('name').values(
+            'id', 'name', 'slug', 'question_count'
+        )
+    ), local=True)
+
 
 class UserProgressViewSet(viewsets.ViewSet):
     """
@@ -28,38 +42,46 @@ class UserProgressViewSet(viewsets.ViewSet):
         """
         Get comprehensive user progress data for the Progress Tracker page.
         
-        OPTIMIZED: Only 5-6 database queries total instead of 20+
+        OPTIMIZED: Daily stats come from the activity rollup (quiz/activity.py);
+        no query loads a user's full attempt history
         """
         user = request.user
         
         try:
+            today = timezone.localdate()
+            
             # Query 1: Get or create game profile
             profile, _ = UserGameProfile.objects.get_or_create(user=user)
             
-            # Query 2: Get ALL topic quiz attempts at once (for weekly, trend, and progress)
-            topic_attempts = list(TopicQuizAttempt.objects.filter(user=user).values(
-                'id', 'topic', 'status', 'correct_count', 'wrong_count', 
-                'total_questions', 'points_earned', 'started_at'
-            ))
+            # Queries 2-4: Lifetime totals, the last 7 days and the last TREND_WEEKS
+            # calendar weeks of activity (weeks summed in the DB)
+            totals = activity.get_totals(user.id)
+            active_days = activity.get_days(user.id, today - timedelta(days=6), today)
+            first_week = today - timedelta(days=today.weekday(), weeks=TREND_WEEKS - 1)
+            active_weeks = activity.get_weeks(user.id, first_week, today)
             
-            # Query 3: Get ALL exam attempts at once
-            exam_attempts = list(ExamAttempt.objects.filter(user=user).select_related('exam').values(
-                'id', 'exam_id', 'exam__title', 'status', 'score', 'started_at'
-            ))
+            # Query 5: Per-topic mastery rows (practice topics come from the cache)
+            topic_mastery = mastery.get_topic_mastery(user.id)
             
-            # Query 4: Get question counts per topic (single query)
-            topic_question_counts = {
-                tc['topic']: tc['total'] 
-                for tc in Question.objects.values('topic').annotate(total=Count('id'))
-            }
+            # Queries 6-7: Latest attempts for the activity feed
+            topic_attempts = list(TopicQuizAttempt.objects.filter(user=user).order_by('-started_at').values(
+                'topic', 'status', 'points_earned', 'started_at'
+            )[:RECENT_ACTIVITY_LIMIT])
+            exam_attempts = list(ExamAttempt.objects.filter(user=user).order_by('-started_at').values(
+                'exam_id', 'exam__title', 'status', 'score', 'started_at'
+            )[:RECENT_ACTIVITY_LIMIT])
             
-            # Now calculate everything from the pre-fetched data (NO more DB queries)
-            overall_progress = self._calculate_overall_progress(profile, topic_attempts, exam_attempts)
-            weekly_activity = self._calculate_weekly_activity(topic_attempts, exam_attempts)
-            performance_trend = self._calculate_performance_trend(topic_attempts, exam_attempts)
-            course_progress = self._calculate_course_progress(topic_attempts, topic_question_counts)
-            learning_distribution = self._calculate_learning_distribution(len(topic_attempts), len(exam_attempts))
-            recent_activity = self._calculate_recent_activity(topic_attempts, exam_attempts)
+            # Query 8: Study streak from the activity bitmap
+            streak_days, _ = activity.get_streaks(user.id, today)
+            
+            topics = _practice_topics()
+            
+            overall_progress = self._calculate_overall_progress(profile, totals, streak_days)
+            weekly_activity = self._calculate_weekly_activity(active_days, today)
+            performance_trend = self._calculate_performance_trend(active_weeks, first_week)
+            course_progress = self._calculate_course_progress(topics, topic_mastery)
+            learning_distribution = self._calculate_learning_distribution(totals['quizzes_started'], totals['exams_started'])
+            recent_activity = self._calculate_recent_activity(topics, topic_attempts, exam_attempts)
             
             return Response({
                 'overall_progress': overall_progress,
@@ -76,26 +98,17 @@ class UserProgressViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def _calculate_overall_progress(self, profile, topic_attempts, exam_attempts):
-        """Calculate overall progress from pre-fetched data"""
-        # Filter completed topic attempts
-        completed_topics = [t for t in topic_attempts if t['status'] in ['completed', 'failed']]
-        
-        total_correct = sum(t['correct_count'] or 0 for t in completed_topics)
-        total_wrong = sum(t['wrong_count'] or 0 for t in completed_topics)
+    def _calculate_overall_progress(self, profile, totals, streak_days):
+        """Calculate overall progress from the rollup totals"""
+        total_correct = totals['questions_correct']
+        total_wrong = totals['questions_wrong']
         
         quiz_accuracy = 0
         if (total_correct + total_wrong) > 0:
             quiz_accuracy = round((total_correct / (total_correct + total_wrong)) * 100)
         
         # Exam accuracy
-        completed_exams = [e for e in exam_attempts if e['status'] == 'completed' and e['score'] is not None]
-        avg_exam_score = 0
-        if completed_exams:
-            avg_exam_score = round(sum(e['score'] for e in completed_exams) / len(completed_exams))
-        
-        # Calculate streak from pre-fetched data
-        streak_days = self._calculate_streak_from_data(topic_attempts, exam_attempts)
+        avg_exam_score = activity.average_exam_score(totals)
         
         # Overall progress
         max_expected_quizzes = 50
@@ -117,156 +130,76 @@ class UserProgressViewSet(viewsets.ViewSet):
             'longest_streak': profile.longest_streak,
         }
 
-    def _calculate_streak_from_data(self, topic_attempts, exam_attempts):
-        """Calculate streak from pre-fetched data"""
-        # Get all unique dates
-        all_dates = set()
-        for t in topic_attempts:
-            if t['started_at']:
-                all_dates.add(t['started_at'].date())
-        for e in exam_attempts:
-            if e['started_at']:
-                all_dates.add(e['started_at'].date())
-        
-        if not all_dates:
-            return 0
-        
-        today = timezone.now().date()
-        streak = 0
-        current_date = today
-        
-        # Check starting from today or yesterday
-        if today not in all_dates:
-            yesterday = today - timedelta(days=1)
-            if yesterday in all_dates:
-                current_date = yesterday
-            else:
-                return 0
-        
-        while current_date in all_dates:
-            streak += 1
-            current_date -= timedelta(days=1)
-        
-        return streak
-
-    def _calculate_weekly_activity(self, topic_attempts, exam_attempts):
-        """Calculate weekly activity from pre-fetched data"""
-        today = timezone.now().date()
+    def _calculate_weekly_activity(self, active_days, today):
+        """Calculate the last 7 days of activity from the rollup"""
         days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
         
-        # Group attempts by date for quick lookup
-        topic_by_date = {}
-        for t in topic_attempts:
-            if t['started_at']:
-                date = t['started_at'].date()
-                if date not in topic_by_date:
-                    topic_by_date[date] = []
-                topic_by_date[date].append(t)
-        
-        exam_by_date = {}
-        for e in exam_attempts:
-            if e['started_at']:
-                date = e['started_at'].date()
-                if date not in exam_by_date:
-                    exam_by_date[date] = []
-                exam_by_date[date].append(e)
-        
         weekly_data = []
         for i in range(6, -1, -1):
             date = today - timedelta(days=i)
-            day_name = days[date.weekday()]
-            
-            day_topics = topic_by_date.get(date, [])
-            day_exams = [e for e in exam_by_date.get(date, []) if e['status'] == 'completed']
-            
-            total_quizzes = len(day_topics) + len(day_exams)
-            correct = sum(t['correct_count'] or 0 for t in day_topics)
-            wrong = sum(t['wrong_count'] or 0 for t in day_topics)
-            
-            hours = round(total_quizzes * 0.17, 1)
+            day = active_days.get(date)
+            if day is None:
+                weekly_data.append({'day': days[date.weekday()], 'hours': 0, 'quizzes': 0, 'correct': 0, 'total': 0})
+                continue
             
+            seconds = day['quiz_seconds'] + day['exam_seconds'] + day['video_seconds']
             weekly_data.append({
-                'day': day_name,
-                'hours': hours,
-                'quizzes': total_quizzes,
-                'correct': correct,
-                'total': correct + wrong
+                'day': days[date.weekday()],
+                'hours': round(seconds / 3600, 1),
+                'quizzes': day['quizzes_started'] + day['exams_completed'],
+                'correct': day['questions_correct'],
+                'total': day['questions_correct'] + day['questions_wrong'],
             })
         
         return weekly_data
 
-    def _calculate_performance_trend(self, topic_attempts, exam_attempts):
-        """Calculate performance trend from pre-fetched data"""
-        today = timezone.now().date()
+    def _calculate_performance_trend(self, active_weeks, first_week):
+        """Weekly quiz accuracy (or average exam score) over the last TREND_WEEKS calendar weeks"""
         trend_data = []
         
-        for week in range(6, 0, -1):
-            week_start = today - timedelta(weeks=week)
-            week_end = week_start + timedelta(days=7)
-            
-            # Filter topic attempts for this week
-            week_topics = [
-                t for t in topic_attempts 
-                if t['status'] == 'completed' 
-                and t['started_at'] 
-                and week_start <= t['started_at'].date() < week_end
-            ]
+        for index in range(TREND_WEEKS):
+            week = active_weeks.get(first_week + timedelta(weeks=index))
+            if week is None:
+                continue
             
-            if week_topics:
-                total_correct = sum(t['correct_count'] or 0 for t in week_topics)
-                total_questions = sum(t['total_questions'] or 1 for t in week_topics)
-                score = round((total_correct / total_questions) * 100) if total_questions > 0 else 0
+            correct = week['questions_correct']
+            answered = correct + week['questions_wrong']
+            if answered:
+                score = round((correct / answered) * 100)
+            elif week['exams_scored']:
+                score = activity.average_exam_score(week)
             else:
-                # Check exam scores
-                week_exams = [
-                    e for e in exam_attempts
-                    if e['status'] == 'completed' and e['score'] is not None
-                    and e['started_at']
-                    and week_start <= e['started_at'].date() < week_end
-                ]
-                if week_exams:
-                    score = round(sum(e['score'] for e in week_exams) / len(week_exams))
-                else:
-                    score = None
+                continue
             
-            if score is not None:
-                trend_data.append({'week': str(7 - week), 'score': score})
+            trend_data.append({'week': str(index + 1), 'score': score})
         
         return trend_data if trend_data else [{'week': '1', 'score': 0}]
 
-    def _calculate_course_progress(self, topic_attempts, topic_question_counts):
-        """Calculate course progress from pre-fetched data"""
-        topic_choices = dict(TopicQuizAttempt.TOPIC_CHOICES)
-        
-        # Aggregate user progress by topic
-        progress_map = {}
-        completed_attempts = [t for t in topic_attempts if t['status'] in ['completed', 'failed']]
-        for t in completed_attempts:
-            topic = t['topic']
-            if topic not in progress_map:
-                progress_map[topic] = {'correct': 0, 'completed': 0}
-            progress_map[topic]['correct'] += t['correct_count'] or 0
-            progress_map[topic]['completed'] += 1
-        
+    def _calculate_course_progress(self, topics, topic_mastery):
+        """Calculate course progress per practice topic from the topic mastery rows"""
         colors = ['bg-blue-500', 'bg-green-500', 'bg-purple-500', 'bg-red-500', 
                   'bg-yellow-500', 'bg-indigo-500', 'bg-pink-500', 'bg-orange-500']
         
         course_data = []
-        for idx, (topic_key, topic_display) in enumerate(topic_choices.items()):
-            total_questions = topic_question_counts.get(topic_key, 0)
-            user_data = progress_map.get(topic_key, {'correct': 0, 'completed': 0})
+        for idx, topic in enumerate(topics):
+            total_questions = topic['question_count']
+            row = topic_mastery.get(topic['id'])
+            correct = row['correct'] if row else 0
+            answered = row['answered'] if row else 0
             
             progress = 0
             if total_questions > 0:
-                progress = min(100, round((user_data['correct'] / total_questions) * 100))
+                progress = min(100, round((correct / total_questions) * 100))
             
             course_data.append({
-                'name': topic_display,
-                'topic': topic_key,
+                'name': topic['name'],
+                'topic': topic['slug'],
                 'progress': progress,
-                'completed_quizzes': user_data['completed'],
-                'correct_answers': user_data['correct'],
+                'completed_quizzes': row['quizzes_completed'] if row else 0,
+                'correct_answers': correct,
                 'total_questions': total_questions,
+                'accuracy': round((correct / answered) * 100) if answered else 0,
+                'best_score': row['best_score'] if row else 0,
                 'color': colors[idx % len(colors)]
             })
         
@@ -295,9 +228,10 @@ class UserProgressViewSet(viewsets.ViewSet):
             {'name': 'Videos (0%)', 'value': 0, 'color': '#F59E0B'},
         ]
 
-    def _calculate_recent_activity(self, topic_attempts, exam_attempts, limit=10):
+    def _calculate_recent_activity(self, topics, topic_attempts, exam_attempts, limit=RECENT_ACTIVITY_LIMIT):
         """Calculate recent activity from pre-fetched data"""
-        topic_display_map = dict(TopicQuizAttempt.TOPIC_CHOICES)
+        # Attempts store the practice topic slug
+        topic_display_map = {topic['slug']: topic['name'] for topic in topics}
         now = timezone.now()
         
         activities = []
@@ -359,40 +293,16 @@ class UserProgressViewSet(viewsets.ViewSet):
         user = request.user
         profile, _ = UserGameProfile.objects.get_or_create(user=user)
         
-        # Single aggregation query
-        stats = TopicQuizAttempt.objects.filter(
-            user=user,
-            status__in=['completed', 'failed']
-        ).aggregate(
-            total_correct=Sum('correct_count'),
-            total_wrong=Sum('wrong_count')
-        )
-        
-        total_correct = stats['total_correct'] or 0
-        total_wrong = stats['total_wrong'] or 0
+        # Totals from the daily activity rollup, streak from the activity bitmap
+        totals = activity.get_totals(user.id)
+        total_correct = totals['questions_correct']
+        total_wrong = totals['questions_wrong']
         
         accuracy = 0
         if (total_correct + total_wrong) > 0:
             accuracy = round((total_correct / (total_correct + total_wrong)) * 100)
         
-        # Get dates for streak calculation (minimal query)
-        topic_dates = set(
-            TopicQuizAttempt.objects.filter(user=user)
-            .values_list('started_at__date', flat=True)
-        )
-        exam_dates = set(
-            ExamAttempt.objects.filter(user=user)
-            .values_list('started_at__date', flat=True)
-        )
-        all_dates = topic_dates | exam_dates
-        
-        streak = 0
-        if all_dates:
-            today = timezone.now().date()
-            current = today if today in all_dates else today - timedelta(days=1)
-            while current in all_dates:
-                streak += 1
-                current -= timedelta(days=1)
+        streak, _ = activity.get_streaks(user.id)
         
         return Response({
             'quizzes_completed': profile.total_quizzes_completed,
@@ -0,0 +1,175 @@
+"""
+Per-request DB query instrumentation that works with DEBUG=False.
+
+connection.queries is only filled when DEBUG=True, so in production the
+request log always showed queries:0. Instead, the request logging
+middleware (logging_utils.py) installs a QueryRecorder with
+connection.execute_wrapper() for the duration of each request. The
+recorder counts queries, sums their DB time and counts each distinct SQL
+string. It does not keep params or tracebacks, so the overhead is a
+perf_counter() pair and a dict increment per query.
+
+When the request ends, summary() normalizes the distinct statements
+(literals and IN lists collapsed) and reports statements that ran at least
+QUERY_REPEAT_THRESHOLD times. These repeats are the usual sign of an N+1.
+
+Summaries are aggregated per route pattern (e.g. ``GET exams/<pk>/``) in
+this worker. stats() returns them for GET /api/health/queries/.
+
+The bootstrap endpoint runs its sections on pool threads with their own
+connections. It passes the request's recorder to those threads with
+recording() so their queries count towards the request.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+
+# Repeated statements listed per request / kept per route
+MAX_REPEATED = 5
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_IN_LISTS = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+
+
+def _repeat_threshold():
+    return getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """SQL with literals and placeholders replaced by ? and IN lists collapsed."""
+    return _IN_LISTS.sub('IN (...)', _LITERALS.sub('?', sql))
+
+
+class QueryRecorder:
+    """execute_wrapper that counts queries, DB time and repeated SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._statements = Counter()
+        # Bootstrap sections record into the same recorder from several threads
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.seconds += elapsed
+                self._statements[sql] += 1
+
+    def summary(self):
+        """Query count, DB time and statements repeated QUERY_REPEAT_THRESHOLD+ times."""
+        with self._lock:
+            statements = list(self._statements.items())
+            count, seconds = self.count, self.seconds
+
+        normalized = Counter()
+        for sql, runs in statements:
+            normalized[normalize_sql(sql)] += runs
+        threshold = _repeat_threshold()
+        repeated = [
+            {'sql': sql, 'count': runs}
+            for sql, runs in normalized.most_common(MAX_REPEATED)
+            if runs >= threshold
+        ]
+        return {
+            'queries': count,
+            'db_ms': round(seconds * 1000, 2),
+            'duplicates': count - len(normalized),
+            'repeated': repeated,
+        }
+
+
+@contextmanager
+def recording(recorder):
+    """Record this thread's queries into recorder (no-op when recorder is None)."""
+    if recorder is None:
+        yield
+        return
+    with connection.execute_wrapper(recorder):
+        yield
+
+
+# route -> aggregated summaries for this worker
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def route_name(request):
+    """Method and URL pattern of the resolved view, so ids don't split routes."""
+    match = getattr(request, 'resolver_match', None)
+    route = match.route if match is not None else 'unresolved'
+    return f'{request.method} {route}'
+
+
+def record_request(route, summary, duration_ms):
+    """Add one request's summary to its route's totals."""
+    with _routes_lock:
+        totals = _routes.get(route)
+        if totals is None:
+            totals = _routes[route] = {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_ms': 0.0,
+                'duration_ms': 0.0,
+                'n_plus_one_requests': 0,
+                'repeated': {},
+            }
+        totals['requests'] += 1
+        totals['queries'] += summary['queries']
+        totals['max_queries'] = max(totals['max_queries'], summary['queries'])
+        totals['db_ms'] += summary['db_ms']
+        totals['duration_ms'] += duration_ms
+        if summary['repeated']:
+            totals['n_plus_one_requests'] += 1
+            worst = totals['repeated']
+            for statement in summary['repeated']:
+                worst[statement['sql']] = max(worst.get(statement['sql'], 0), statement['count'])
+            if len(worst) > MAX_REPEATED:
+                totals['repeated'] = dict(
+                    sorted(worst.items(), key=lambda item: item[1], reverse=True)[:MAX_REPEATED]
+                )
+
+
+def stats():
+    """This worker's per-route totals, most DB time first."""
+    with _routes_lock:
+        routes = [(route, dict(totals, repeated=dict(totals['repeated']))) for route, totals in _routes.items()]
+    routes.sort(key=lambda item: item[1]['db_ms'], reverse=True)
+    return {
+        'routes': [
+            {
+                'route': route,
+                'requests': totals['requests'],
+                'avg_queries': round(totals['queries'] / totals['requests'], 1),
+                'max_queries': totals['max_queries'],
+                'avg_db_ms': round(totals['db_ms'] / totals['requests'], 2),
+                'avg_duration_ms': round(totals['duration_ms'] / totals['requests'], 2),
+                'total_db_ms': round(totals['db_ms'], 2),
+                'n_plus_one_requests': totals['n_plus_one_requests'],
+                'repeated': [
+                    {'sql': sql, 'max_count': runs}
+                    for sql, runs in sorted(totals['repeated'].items(), key=lambda item: item[1], reverse=True)
+                ],
+            }
+            for route, totals in routes
+        ],
+    }
+
+
+def reset():
+    """Drop this worker's per-route totals."""
+    with _routes_lock:
+        _routes.clear()
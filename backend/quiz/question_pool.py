@@ -0,0 +1,107 @@
+"""
+Per-topic pools of pre-serialized practice questions.
+
+Starting a topic quiz samples from the topic's pool in memory instead of
+querying question IDs and then each sampled question. Pools are held in a
+small worker-local LRU, backed by the Django cache, and keyed by the same
+topic version as the answer keys, so editing a PracticeQuestion
+invalidates both (see quiz/signals.py).
+
+Like the local tier in quiz/cache_tags.py, a worker re-checks a local
+pool's version at most every CACHE_LOCAL_TTL seconds. Topic versions
+expire after ANSWER_KEY_VERSION_TIMEOUT, so a worker whose cache never
+saw a bump (LocMemCache) reloads the pool within that time.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .answer_keys import current_version, version_timeout
+from .local_cache import LocalLRU
+from .question_versions import ensure_versions
+
+logger = logging.getLogger(__name__)
+
+LOCAL_POOL_MAX_TOPICS = 64
+
+POOL_FIELDS = ('id', 'question_id', 'area_id', 'text', 'difficulty', 'options', 'correct_answer', 'explanation')
+
+
+# topic slug -> (version, recheck_at, pool, index, by_area)
+_local_pools = LocalLRU(LOCAL_POOL_MAX_TOPICS)
+
+
+def _local_ttl():
+    return getattr(settings, 'CACHE_LOCAL_TTL', 5)
+
+
+def _load_pool(topic_slug):
+    from .practice_question_models import PracticeQuestion
+    pool = list(
+        PracticeQuestion.objects.filter(area__topic__slug=topic_slug)
+        .order_by('id')
+        .values(*POOL_FIELDS, topic_id=F('area__topic_id'))
+    )
+    # Tag each payload with its immutable content version
+    return ensure_versions(pool)
+
+
+def get_topic_pool(topic_slug):
+    """
+    Return the list of question payloads for a topic
+    ({id, question_id, area_id, text, difficulty, options, correct_answer, explanation, version}).
+    Payloads are shared; callers must not mutate them.
+    """
+    return _get_local_entry(topic_slug)[0]
+
+
+def get_pool_question(topic_slug, question_pk):
+    """Return a single question payload from the topic pool, or None."""
+    return _get_local_entry(topic_slug)[1].get(question_pk)
+
+
+def get_topic_pool_by_area(topic_slug):
+    """Return {area_id: [payload, ...]} for a topic."""
+    return _get_local_entry(topic_slug)[2]
+
+
+def _get_local_entry(topic_slug):
+    """Return (pool, {id: payload}, {area_id: [payload]}) for the topic's current version."""
+    now = time.monotonic()
+    local = _local_pools.get(topic_slug)
+    if local is not None and now < local[1]:
+        return local[2:]
+
+    version = current_version('topic', topic_slug)
+    if local is not None and local[0] == version:
+        _local_pools.set(topic_slug, (version, now + _local_ttl()) + local[2:])
+        return local[2:]
+
+    key = f'topic_question_pool_{topic_slug}_v{version}'
+    pool = cache.get(key)
+    if pool is None:
+        pool = _load_pool(topic_slug)
+        # Not needed once the version token expires
+        cache.set(key, pool, version_timeout())
+        logger.debug(f"[QUESTION_POOL] Loaded {topic_slug}: {len(pool)} questions")
+
+    index = {q['id']: q for q in pool}
+    by_area = {}
+    for q in pool:
+        by_area.setdefault(q.get('area_id'), []).append(q)
+    _local_pools.set(topic_slug, (version, now + _local_ttl(), pool, index, by_area))
+    return pool, index, by_area
+
+
+def client_payload(question):
+    """Strip answer data from a pool/snapshot payload before sending it to the client."""
+    return {
+        'id': question['id'],
+        'question_id': question['question_id'],
+        'text': question['text'],
+        'difficulty': question['difficulty'],
+        'options': question['options'],
+    }
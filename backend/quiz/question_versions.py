@@ -0,0 +1,141 @@
+"""
+Content-addressed practice question versions.
+
+Each distinct content of a PracticeQuestion is stored once in
+PracticeQuestionVersion (keyed by a SHA-256 of the payload). Topic quiz
+attempts keep only [[question_pk, version], ...] and resolve payloads
+through a worker-local LRU backed by the Django cache; versions are
+immutable, so cached entries never need invalidating.
+"""
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from .local_cache import LocalLRU
+from .practice_question_models import PracticeQuestionVersion
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELDS = ('id', 'question_id', 'text', 'difficulty', 'options', 'correct_answer', 'explanation')
+VERSION_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+LOCAL_VERSION_MAX_ENTRIES = 4096
+# Retries when a concurrent writer takes the version number we picked
+VERSION_INSERT_ATTEMPTS = 3
+
+
+_local_versions = LocalLRU(LOCAL_VERSION_MAX_ENTRIES)
+
+
+def normalize_payload(question):
+    """Keep only the versioned fields of a question payload."""
+    return {field: question.get(field) for field in PAYLOAD_FIELDS}
+
+
+def content_hash(payload):
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _cache_key(question_pk, version):
+    return f'pq_version_{question_pk}_{version}'
+
+
+def ensure_versions(payloads):
+    """
+    Make sure every payload has a stored version and set payload['version'].
+    One SELECT for known hashes; unknown content gets the next version number.
+    """
+    hashes = {}
+    for payload in payloads:
+        hashes[content_hash(normalize_payload(payload))] = payload
+
+    known = dict(
+        PracticeQuestionVersion.objects.filter(content_hash__in=list(hashes)).values_list('content_hash', 'version')
+    )
+    for _ in range(VERSION_INSERT_ATTEMPTS):
+        missing = [h for h in hashes if h not in known]
+        if not missing:
+            break
+        _insert_versions([hashes[h] for h in missing], missing)
+        # Re-read: a concurrent writer may have stored the same content, or
+        # taken the version number we picked (our row was then skipped)
+        known.update(
+            PracticeQuestionVersion.objects.filter(content_hash__in=missing).values_list('content_hash', 'version')
+        )
+    else:
+        missing = [h for h in hashes if h not in known]
+        if missing:
+            logger.warning(f"[QUESTION_VERSIONS] Could not store {len(missing)} question versions")
+
+    for h, payload in hashes.items():
+        payload['version'] = known.get(h)
+    return payloads
+
+
+def _insert_versions(payloads, content_hashes):
+    pks = {payload['id'] for payload in payloads}
+    latest = dict(
+        PracticeQuestionVersion.objects.filter(question_pk__in=pks)
+        .order_by().values('question_pk').annotate(v=Max('version')).values_list('question_pk', 'v')
+    )
+    new_versions = []
+    for payload, h in zip(payloads, content_hashes):
+        version = latest.get(payload['id'], 0) + 1
+        latest[payload['id']] = version
+        new_versions.append(PracticeQuestionVersion(
+            question_pk=payload['id'],
+            version=version,
+            content_hash=h,
+            payload=normalize_payload(payload),
+        ))
+    PracticeQuestionVersion.objects.bulk_create(new_versions, ignore_conflicts=True)
+    logger.info(f"[QUESTION_VERSIONS] Stored up to {len(new_versions)} new question versions")
+
+
+def resolve_versions(pairs):
+    """
+    Resolve [(question_pk, version), ...] to {(question_pk, version): payload}.
+    Worker LRU first, then one cache get_many, then one DB query for the rest.
+    """
+    result = {}
+    pending = []
+    for pk, version in pairs:
+        payload = _local_versions.get((pk, version))
+        if payload is not None:
+            result[(pk, version)] = payload
+        else:
+            pending.append((pk, version))
+    if not pending:
+        return result
+
+    cached = cache.get_many([_cache_key(pk, v) for pk, v in pending])
+    missing = []
+    for pk, version in pending:
+        payload = cached.get(_cache_key(pk, version))
+        if payload is None:
+            missing.append((pk, version))
+        else:
+            result[(pk, version)] = payload
+            _local_versions.set((pk, version), payload)
+
+    if missing:
+        condition = Q()
+        for pk, version in missing:
+            condition |= Q(question_pk=pk, version=version)
+        rows = PracticeQuestionVersion.objects.filter(condition).values_list('question_pk', 'version', 'payload')
+        to_cache = {}
+        for pk, version, payload in rows:
+            result[(pk, version)] = payload
+            _local_versions.set((pk, version), payload)
+            to_cache[_cache_key(pk, version)] = payload
+        cache.set_many(to_cache, VERSION_CACHE_TIMEOUT)
+
+    return result
+
+
+def resolve_version(question_pk, version):
+    """Resolve a single (question_pk, version) pair, or None."""
+    return resolve_versions([(question_pk, version)]).get((question_pk, version))
@@ -0,0 +1,361 @@
+"""
+Live state for in-progress topic quizzes.
+
+While a quiz is running its state lives in the cache as a compact dict
+(ordered question IDs and versions, answer key, lives, streak, index,
+counters), so current_question / submit_answer cost a cache read and write
+instead of loading and locking the TopicQuizAttempt row with its JSON blobs.
+
+Writes go behind: each answer is appended to the DB (TopicQuizAnswer, the
+attempt's counters, the user's area and topic mastery and daily activity) on a
+background thread.
+The attempt is flushed synchronously when the quiz ends, and
+flush_topic_quiz_states persists counters of long-running attempts. On a cache miss the state is rebuilt
+from the attempt row and its recorded answers.
+
+Live state requires a cache shared by every worker; with
+TOPIC_QUIZ_LIVE_STATE = False the attempt row stays the source of truth and
+every write is synchronous.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import mastery, resume
+from .activity import record_activity
+from .cache_tags import bump, user_tag
+from .leaderboard import record_quiz_completion
+from .practice_question_models import PracticeQuestion
+from .question_pool import get_pool_question
+from .topic_models import TopicQuizAttempt, TopicQuizAnswer, UserGameProfile
+
+logger = logging.getLogger(__name__)
+
+STATE_CACHE_TIMEOUT = 60 * 60 * 6
+LOCK_TIMEOUT = 5
+LOCK_WAIT_SECONDS = 2
+
+COUNTER_FIELDS = {
+    'lives': 'lives_remaining',
+    'streak': 'current_streak',
+    'index': 'current_question_index',
+    'points': 'points_earned',
+    'correct': 'correct_count',
+    'wrong': 'wrong_count',
+    'status': 'status',
+    'fifty_fifty_used': 'fifty_fifty_used',
+    'time_freeze_used': 'time_freeze_used',
+}
+
+
+class AttemptBusy(Exception):
+    """Another request is currently updating this attempt."""
+
+
+def live_state_enabled():
+    return getattr(settings, 'TOPIC_QUIZ_LIVE_STATE', True)
+
+
+def _async_writes_enabled():
+    return live_state_enabled() and getattr(settings, 'TOPIC_QUIZ_ASYNC_WRITES', True)
+
+
+def _state_key(attempt_id):
+    return f'topic_quiz_state_{attempt_id}'
+
+
+# ---------------------------------------------------------------------------
+# Game rules
+# ---------------------------------------------------------------------------
+
+def apply_answer(state, is_correct):
+    """
+    Apply an answer to the state (same rules as TopicQuizAttempt.record_answer).
+    Returns points earned for this answer.
+    """
+    points = 0
+    if is_correct:
+        state['correct'] += 1
+        state['streak'] += 1
+        # Base points plus streak bonus (10 extra points per streak level, max +50)
+        points = 100 + min(state['streak'] - 1, 5) * 10
+        state['points'] += points
+    else:
+        state['wrong'] += 1
+        state['streak'] = 0
+        state['lives'] -= 1
+        if state['lives'] <= 0:
+            state['status'] = 'failed'
+
+    state['index'] += 1
+    if state['index'] >= state['total'] and state['status'] != 'failed':
+        state['status'] = 'completed'
+    return points
+
+
+# ---------------------------------------------------------------------------
+# Loading / saving
+# ---------------------------------------------------------------------------
+
+def build_state(attempt, answers=()):
+    """
+    Build live state from an attempt row and its recorded answers.
+    Game state is replayed from the answers so a lagging row cannot
+    produce a state that disagrees with what was actually answered.
+    """
+    state = {
+        'attempt_id': attempt.id,
+        'user_id': attempt.user_id,
+        'topic': attempt.topic,
+        'topic_id': attempt.practice_topic_id,
+        'ids': attempt.get_question_id_list(),
+        'key': {int(k): v for k, v in (attempt.correct_answers or {}).items()},
+        'versions': {pk: version for pk, version in (attempt.question_versions or [])},
+        'total': attempt.total_questions,
+        'status': 'in_progress',
+        # Lives only go down on wrong answers
+        'lives': attempt.lives_remaining + attempt.wrong_count,
+        'streak': 0,
+        'index': 0,
+        'points': 0,
+        'correct': 0,
+        'wrong': 0,
+        'fifty_fifty_used': attempt.fifty_fifty_used,
+        'time_freeze_used': attempt.time_freeze_used,
+        'answered': [],
+    }
+    for question_id, is_correct in answers:
+        apply_answer(state, is_correct)
+        state['answered'].append(question_id)
+    if attempt.status != 'in_progress':
+        state['status'] = attempt.status
+    return state
+
+
+def init_state(attempt):
+    """Store the initial state of a freshly created attempt."""
+    state = build_state(attempt)
+    save_state(state)
+    return state
+
+
+def get_state(attempt_id, user_id):
+    """Return live state for a user's attempt, or None if it doesn't exist."""
+    if live_state_enabled():
+        state = cache.get(_state_key(attempt_id))
+        if state is not None:
+            return state if state['user_id'] == user_id else None
+
+    attempt = TopicQuizAttempt.objects.filter(pk=attempt_id, user_id=user_id).defer('questions_snapshot').first()
+    if attempt is None:
+        return None
+    answers = TopicQuizAnswer.objects.filter(attempt_id=attempt_id).order_by('id').values_list('question_id', 'is_correct')
+    state = build_state(attempt, answers)
+    save_state(state)
+    return state
+
+
+def peek_state(attempt_id):
+    """Return cached live state without rebuilding it (None on a miss)."""
+    if not live_state_enabled():
+        return None
+    return cache.get(_state_key(attempt_id))
+
+
+def save_state(state):
+    if live_state_enabled():
+        cache.set(_state_key(state['attempt_id']), state, STATE_CACHE_TIMEOUT)
+
+
+def discard_state(attempt_id):
+    if live_state_enabled():
+        cache.delete(_state_key(attempt_id))
+
+
+@contextmanager
+def attempt_lock(attempt_id):
+    """Serialize updates to one attempt (cache mutex, or a row lock without live state)."""
+    if not live_state_enabled():
+        with transaction.atomic():
+            list(TopicQuizAttempt.objects.select_for_update().filter(pk=attempt_id).values_list('pk'))
+            yield
+        return
+
+    key = f'topic_quiz_lock_{attempt_id}'
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while not cache.add(key, 1, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise AttemptBusy(attempt_id)
+        time.sleep(0.02)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+# ---------------------------------------------------------------------------
+# Write-behind
+# ---------------------------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # One thread keeps writes for an attempt in submission order
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='topic-quiz-writes')
+    return _executor
+
+
+def _run_job(fn, *args, **kwargs):
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        logger.exception(f"[QUIZ_STATE] Write-behind job {fn.__name__} failed")
+    finally:
+        # Worker threads own their DB connection
+        connection.close()
+
+
+def _submit(fn, *args, **kwargs):
+    if _async_writes_enabled():
+        _get_executor().submit(_run_job, fn, *args, **kwargs)
+    else:
+        fn(*args, **kwargs)
+
+
+def _drain():
+    """Wait until previously queued writes have been applied."""
+    if _async_writes_enabled():
+        _get_executor().submit(lambda: None).result(timeout=10)
+
+
+def counter_values(state):
+    return {field: state[key] for key, field in COUNTER_FIELDS.items()}
+
+
+def _write_answer(attempt_id, answer, counters):
+    TopicQuizAnswer.objects.create(attempt_id=attempt_id, **answer)
+    _write_counters(attempt_id, counters)
+
+
+def _write_counters(attempt_id, counters):
+    # Write-behind can arrive late (another worker's queue, a flush that
+    # peeked at an older state): never reopen a finished attempt or move
+    # the index backwards
+    TopicQuizAttempt.objects.filter(
+        pk=attempt_id,
+        status='in_progress',
+        current_question_index__lte=counters['current_question_index'],
+    ).update(**counters)
+
+
+def _question_area(topic, question_id):
+    """Area of a practice question, from the topic pool when possible."""
+    question = get_pool_question(topic, question_id)
+    if question is not None and question.get('area_id') is not None:
+        return question['area_id']
+    return PracticeQuestion.objects.filter(pk=question_id).values_list('area_id', flat=True).first()
+
+
+def _update_mastery(user_id, topic, topic_id, question_id, is_correct, completed=False, score=None):
+    """Area mastery goes to the question's area; topic counters to the attempt's topic."""
+    area_id = _question_area(topic, question_id)
+    if area_id is not None:
+        mastery.record_answer(user_id, area_id, question_id, is_correct)
+    if topic_id is None:
+        # State built before attempts stored their topic
+        topic_id = mastery.topic_id_for_slug(topic)
+    if topic_id is None:
+        return
+    mastery.record_topic(
+        user_id, topic_id,
+        best_score=score if completed else None,
+        answered=1,
+        correct=1 if is_correct else 0,
+        quizzes_completed=1 if completed else 0,
+    )
+    if completed:
+        # My Courses reads completed quizzes from the topic rollup
+        bump(user_tag(user_id))
+
+
+def _answer_activity(answer):
+    return {
+        'questions_correct': 1 if answer['is_correct'] else 0,
+        'questions_wrong': 0 if answer['is_correct'] else 1,
+        'quiz_seconds': answer['time_spent_seconds'],
+    }
+
+
+def record_answer(state, answer):
+    """Persist an in-progress answer behind the response."""
+    save_state(state)
+    _submit(_write_answer, state['attempt_id'], answer, counter_values(state))
+    _submit(
+        _update_mastery, state['user_id'], state['topic'], state.get('topic_id'),
+        answer['question_id'], answer['is_correct'],
+    )
+    _submit(record_activity, state['user_id'], timezone.now(), **_answer_activity(answer))
+    _submit(resume.record_quiz, state['user_id'], state['attempt_id'], state['index'], len(state['ids']))
+
+
+def update_flags(state):
+    """Persist power-up flags behind the response."""
+    save_state(state)
+    _submit(_write_counters, state['attempt_id'], counter_values(state))
+
+
+def flush_state(state):
+    """Synchronously persist the counters of a live attempt."""
+    _drain()
+    _write_counters(state['attempt_id'], counter_values(state))
+
+
+def complete_attempt(state, answer):
+    """Durably write the final answer, the finished attempt and the game profile."""
+    _drain()
+    attempt_id = state['attempt_id']
+    with transaction.atomic():
+        TopicQuizAnswer.objects.create(attempt_id=attempt_id, **answer)
+        TopicQuizAttempt.objects.filter(pk=attempt_id).update(
+            completed_at=timezone.now(), **counter_values(state)
+        )
+
+        completed = state['status'] == 'completed'
+        # The queryset update skips signals; completed-quiz counts are cached per user
+        bump(user_tag(state['user_id']))
+        resume.clear_quiz(state['user_id'], attempt_id)
+        UserGameProfile.record_quiz(
+            state['user_id'],
+            points=state['points'] if completed else 0,
+            correct=state['correct'],
+            wrong=state['wrong'],
+            completed=completed,
+            streak=state['streak'],
+        )
+    discard_state(attempt_id)
+    _submit(
+        _update_mastery, state['user_id'], state['topic'], state.get('topic_id'),
+        answer['question_id'], answer['is_correct'],
+        completed=completed, score=mastery.quiz_score(state['correct'], state['total']),
+    )
+    _submit(
+        record_activity, state['user_id'], timezone.now(),
+        quizzes_completed=1 if completed else 0,
+        points_earned=state['points'] if completed else 0,
+        **_answer_activity(answer),
+    )
+    if completed:
+        _submit(record_quiz_completion, state['user_id'], state['topic'])
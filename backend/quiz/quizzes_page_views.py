@@ -2,10 +2,10 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Max
-from django.core.cache import cache
+from django.db.models import Count, F, Max
 import logging
 
+from .cache_tags import CATALOG_PRACTICE, get_or_set
 from .practice_question_models import PracticeQuestion, PracticeQuestionTopic
 from .topic_models import UserGameProfile, TopicQuizAttempt
 from .topic_serializers import (
@@ -57,21 +57,11 @@ class QuizzesPageViewSet(viewsets.ViewSet):
         user = request.user
         
 
-        # Check cache for topic counts (static data - cache for 30 minutes)
-        # For PracticeQuestion, we need to count questions per TOPIC slug.
-        topic_count_map = cache.get('quiz_topic_counts')
-        if not topic_count_map:
-            # Group by topic slug and count unique questions
-            # PracticeQuestion -> Area -> Topic
-            # unique question IDs per topic slug
-            
-            # Efficient way:
-            topic_counts = PracticeQuestionTopic.objects.annotate(
-                total_qn_count=Count('areas__questions')
-            ).values('slug', 'total_qn_count')
-            
-            topic_count_map = {tc['slug']: tc['total_qn_count'] for tc in topic_counts}
-            cache.set('quiz_topic_counts', topic_count_map, 1800)  # 30 min cache
+        # Question counts per topic slug (stored counters), cached until practice content changes
+        topic_count_map = get_or_set('quiz_topic_counts', [CATALOG_PRACTICE], lambda: {
+            tc['slug']: tc['total_qn_count']
+            for tc in PracticeQuestionTopic.objects.values('slug', total_qn_count=F('question_count'))
+        }, local=True)
         
         # Query 1: Get or create user's game profile
         profile, _ = UserGameProfile.objects.get_or_create(user=user)
@@ -97,9 +87,7 @@ class QuizzesPageViewSet(viewsets.ViewSet):
         
         # Build topics list
         # Fetch all topics that have questions
-        all_topics = PracticeQuestionTopic.objects.annotate(
-            total_questions=Count('areas__questions')
-        ).filter(total_questions__gt=0).order_by('name')
+        all_topics = PracticeQuestionTopic.objects.filter(question_count__gt=0).order_by('name')
 
         topics = []
         for topic_obj in all_topics:
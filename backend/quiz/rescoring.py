@@ -0,0 +1,116 @@
+"""
+Set-based rescoring of mock exam attempts.
+
+Correcting Question.correct_answer leaves stored QuestionAnswer.is_correct
+and ExamAttempt.score stale. Rather than looping over .save(), rescoring
+runs a handful of UPDATE statements per exam (chunked by attempt IDs) and
+reports which attempts changed.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from .models import ExamAttempt, Question, QuestionAnswer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _expected_correct():
+    """EXISTS expression: does the answer match the question's current key?"""
+    return Exists(Question.objects.filter(
+        pk=OuterRef('question_id'),
+        correct_answer=OuterRef('selected_answer'),
+    ))
+
+
+def _score_expression():
+    """Same formula as ExamAttempt.calculate_score, evaluated in SQL."""
+    correct = QuestionAnswer.objects.filter(
+        exam_attempt=OuterRef('pk'), is_correct=True
+    ).order_by().values('exam_attempt').annotate(c=Count('pk')).values('c')
+    selected = ExamAttempt.selected_questions.through.objects.filter(
+        examattempt_id=OuterRef('pk')
+    ).order_by().values('examattempt_id').annotate(c=Count('pk')).values('c')
+    return Coalesce(
+        Coalesce(Subquery(correct, output_field=IntegerField()), Value(0)) * 100
+        / NullIf(Subquery(selected, output_field=IntegerField()), Value(0)),
+        Value(0),
+    )
+
+
+def rescore_exam(exam_id, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Recompute is_correct and scores for every attempt of an exam.
+
+    Returns a dict with the number of stale answers found and a list of
+    changed attempts: {attempt_id, user_id, answers_changed, old_score, new_score}.
+    """
+    expected = _expected_correct()
+    stale = QuestionAnswer.objects.filter(exam_attempt__exam_id=exam_id).filter(
+        (Q(is_correct=True) & ~expected) | (Q(is_correct=False) & expected)
+    )
+    stale_counts = dict(
+        stale.order_by().values('exam_attempt_id').annotate(n=Count('pk')).values_list('exam_attempt_id', 'n')
+    )
+    attempt_ids = sorted(stale_counts)
+
+    old_scores = dict(
+        ExamAttempt.objects.filter(pk__in=attempt_ids).values_list('pk', 'score')
+    ) if attempt_ids else {}
+
+    if not dry_run:
+        for i in range(0, len(attempt_ids), chunk_size):
+            chunk = attempt_ids[i:i + chunk_size]
+            with transaction.atomic():
+                QuestionAnswer.objects.filter(exam_attempt_id__in=chunk).update(
+                    is_correct=_expected_correct()
+                )
+                ExamAttempt.objects.filter(pk__in=chunk, status='completed').update(
+                    score=_score_expression()
+                )
+
+    if not dry_run and attempt_ids:
+        # Item statistics and score histograms were built from the old values.
+        # Reset first: if the rebuild fails, the next refresh starts from scratch.
+        from .item_statistics import refresh_item_statistics, reset_item_statistics
+        from .score_percentiles import rebuild_histogram
+        reset_item_statistics(exam_id)
+        refresh_item_statistics(exam_id)
+        rebuild_histogram(exam_id)
+
+    if dry_run or not attempt_ids:
+        new_scores = {}
+    else:
+        new_scores = dict(ExamAttempt.objects.filter(pk__in=attempt_ids).values_list('pk', 'score'))
+    users = dict(ExamAttempt.objects.filter(pk__in=attempt_ids).values_list('pk', 'user_id')) if attempt_ids else {}
+
+    changed = [
+        {
+            'attempt_id': attempt_id,
+            'user_id': users.get(attempt_id),
+            'answers_changed': stale_counts[attempt_id],
+            'old_score': old_scores.get(attempt_id),
+            'new_score': None if dry_run else new_scores.get(attempt_id),
+        }
+        for attempt_id in attempt_ids
+    ]
+
+    logger.info(
+        f"[RESCORE] Exam {exam_id}{' (dry run)' if dry_run else ''} - "
+        f"{sum(stale_counts.values())} stale answers across {len(changed)} attempts"
+    )
+    return {
+        'exam_id': exam_id,
+        'dry_run': dry_run,
+        'stale_answers': sum(stale_counts.values()),
+        'changed_attempts': changed,
+    }
+
+
+def rescore_exams(exam_ids, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Rescore several exams, one exam at a time."""
+    return [rescore_exam(exam_id, dry_run=dry_run, chunk_size=chunk_size) for exam_id in exam_ids]
@@ -0,0 +1,268 @@
+"""
+Resume pointers (UserResumePointer) behind the dashboard's continue-learning cards.
+
+Progress write paths record where the user is as they go:
+- topic quizzes: record_quiz() when an attempt starts and after each
+  answer (on the quiz write-behind queue), clear_quiz() when it finishes
+- videos: record_videos() with each user's latest video on every heartbeat
+  flush, and the next video in the course when one is marked complete
+- textbooks: record_reading() from the textbook progress endpoint
+
+Each call is one upsert of its own columns, so writes for different
+content types never overwrite each other. get_cards() renders the three
+cards from the pointer row in one query and caches them under the user's
+resume tag and the video and textbook catalog tags (quiz/cache_tags.py),
+so the endpoint is a cache read until the user's next progress write or
+a catalog edit.
+
+backfill_resume_pointers builds pointers for existing users from the
+attempt and progress tables; a user still without one when the cards are
+first read gets theirs built then.
+"""
+import logging
+
+from django.utils import timezone
+
+from .cache_tags import CATALOG_TEXTBOOKS, CATALOG_VIDEOS, bump, get_or_set, resume_tag
+from .resume_models import UserResumePointer
+from .video_navigation import get_course_video_ids_many, get_neighbours
+
+logger = logging.getLogger(__name__)
+
+TOPIC_NAMES = {
+    'land_law': 'Land Law',
+    'trusts': 'Trusts',
+    'criminal_law': 'Criminal Law',
+    'criminal_practice': 'Criminal Practice',
+    'professional_ethics': 'Professional Ethics',
+    'solicitors_accounts': 'Solicitors Accounts',
+    'taxation': 'Tax Law',
+}
+
+
+def _upsert(rows, fields):
+    """Insert or update `fields` of the given pointers, leaving their other columns alone."""
+    UserResumePointer.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=[*fields, 'updated_at'],
+        batch_size=500,
+    )
+    bump(*(resume_tag(row.user_id) for row in rows))
+
+
+# ---------------------------------------------------------------------------
+# Write paths
+# ---------------------------------------------------------------------------
+
+def record_reading(user_id, textbook_id, page, total_pages, when=None):
+    _upsert(
+        [UserResumePointer(
+            user_id=user_id, textbook_id=textbook_id, textbook_page=page,
+            textbook_total_pages=total_pages, reading_at=when or timezone.now(),
+        )],
+        ['textbook', 'textbook_page', 'textbook_total_pages', 'reading_at'],
+    )
+
+
+def record_quiz(user_id, attempt_id, index, total, when=None):
+    _upsert(
+        [UserResumePointer(
+            user_id=user_id, quiz_attempt_id=attempt_id, quiz_index=index,
+            quiz_total=total, quiz_at=when or timezone.now(),
+        )],
+        ['quiz_attempt', 'quiz_index', 'quiz_total', 'quiz_at'],
+    )
+
+
+def clear_quiz(user_id, attempt_id):
+    """Drop the practice card if it points at this (now finished) attempt."""
+    if UserResumePointer.objects.filter(user_id=user_id, quiz_attempt_id=attempt_id).update(
+        quiz_attempt=None, updated_at=timezone.now()
+    ):
+        bump(resume_tag(user_id))
+
+
+def resume_video(video_ids, video_id, completed):
+    """
+    Return (video to resume, 1-based position) in a course's ordered
+    `video_ids`: the video itself, or the one after it once it's completed.
+    The video is None when the course is finished or the video isn't in it.
+    """
+    position, _, next_id = get_neighbours(video_ids, video_id)
+    if position is None:
+        return None, 1
+    if completed:
+        return next_id, position + 1
+    return video_id, position
+
+
+def record_videos(latest, when=None):
+    """Record {user_id: (course_id, video_id, completed)}: each user's most recently watched video."""
+    if not latest:
+        return
+    when = when or timezone.now()
+    courses = get_course_video_ids_many({course_id for course_id, _, _ in latest.values()})
+    rows = []
+    for user_id, (course_id, video_id, completed) in latest.items():
+        video_ids = courses.get(course_id, ())
+        resume_id, position = resume_video(video_ids, video_id, completed)
+        rows.append(UserResumePointer(
+            user_id=user_id, video_id=resume_id, video_position=position,
+            video_total=len(video_ids), video_at=when,
+        ))
+    _upsert(rows, ['video', 'video_position', 'video_total', 'video_at'])
+
+
+# ---------------------------------------------------------------------------
+# Read path
+# ---------------------------------------------------------------------------
+
+def get_cards(user_id):
+    """Return {'reading', 'video', 'practice'} cards for the user (each may be None)."""
+    return get_or_set(
+        'resume_cards',
+        [resume_tag(user_id), CATALOG_VIDEOS, CATALOG_TEXTBOOKS],
+        lambda: _build_cards(user_id),
+    )
+
+
+def _load_pointer(user_id):
+    return UserResumePointer.objects.select_related('textbook', 'video__course', 'quiz_attempt').filter(
+        user_id=user_id
+    ).first()
+
+
+def _build_cards(user_id):
+    pointer = _load_pointer(user_id)
+    if pointer is None:
+        build_pointer(user_id)
+        pointer = _load_pointer(user_id)
+    return {
+        'reading': _reading_card(pointer),
+        'video': _video_card(pointer),
+        'practice': _practice_card(pointer),
+    }
+
+
+def _reading_card(pointer):
+    from .textbook_models import Textbook
+
+    textbook = pointer.textbook
+    if textbook is not None:
+        total = max(pointer.textbook_total_pages, 1)
+        return {
+            'subject': textbook.subject,
+            'title': textbook.title,
+            'current': pointer.textbook_page,
+            'total': total,
+            'progress': min(round(pointer.textbook_page / total * 100), 100),
+            'href': f'/textbook/{textbook.id}',
+        }
+
+    # Nothing read yet: suggest the first textbook
+    first_textbook = Textbook.objects.first()
+    if first_textbook is None:
+        return None
+    return {
+        'subject': first_textbook.subject,
+        'title': first_textbook.title,
+        'current': 1,
+        'total': len(first_textbook.chapters) if first_textbook.chapters else 1,
+        'progress': 0,
+        'href': f'/textbook/{first_textbook.id}',
+    }
+
+
+def _video_card(pointer):
+    video = pointer.video
+    if video is None or not video.is_active:
+        return None
+    total = pointer.video_total
+    return {
+        'subject': video.course.title if video.course else 'Video',
+        'title': video.title,
+        'current': pointer.video_position,
+        'total': total,
+        'progress': round((pointer.video_position - 1) / total * 100) if total else 0,
+        'href': f'/video-tutorials/watch/{video.id}',
+    }
+
+
+def _practice_card(pointer):
+    attempt = pointer.quiz_attempt
+    if attempt is None or attempt.status != 'in_progress':
+        return None
+    topic = attempt.topic
+    total = pointer.quiz_total
+    return {
+        'subject': TOPIC_NAMES.get(topic, topic.replace('_', ' ').title()),
+        'title': f'{topic.replace("_", " ").title()} Quiz',
+        'current': pointer.quiz_index + 1,
+        'total': total,
+        'progress': round(pointer.quiz_index / total * 100) if total else 0,
+        'href': f'/quiz/play/{topic}/{attempt.id}',
+    }
+
+
+# ---------------------------------------------------------------------------
+# Initial pointer from the raw tables
+# ---------------------------------------------------------------------------
+
+def build_pointer(user_id):
+    """Create the user's pointer from their latest quiz attempt, video and textbook progress."""
+    from .textbook_models import TextbookProgress
+    from .topic_models import TopicQuizAttempt
+    from .video_models import VideoProgress
+
+    pointer = UserResumePointer(user_id=user_id)
+
+    last_quiz = TopicQuizAttempt.objects.filter(user_id=user_id, status='in_progress').order_by('-started_at').values(
+        'id', 'current_question_index', 'total_questions', 'started_at'
+    ).first()
+    if last_quiz:
+        pointer.quiz_attempt_id = last_quiz['id']
+        pointer.quiz_index = last_quiz['current_question_index']
+        pointer.quiz_total = last_quiz['total_questions']
+        pointer.quiz_at = last_quiz['started_at']
+
+    last_video = VideoProgress.objects.filter(user_id=user_id, video__is_active=True).order_by('-last_watched_at').values(
+        'video_id', 'video__course_id', 'is_completed', 'last_watched_at'
+    ).first()
+    if last_video:
+        video_ids = get_course_video_ids_many([last_video['video__course_id']])[last_video['video__course_id']]
+        pointer.video_id, pointer.video_position = resume_video(
+            video_ids, last_video['video_id'], last_video['is_completed']
+        )
+        pointer.video_total = len(video_ids)
+        pointer.video_at = last_video['last_watched_at']
+
+    last_reading = TextbookProgress.objects.filter(user_id=user_id).order_by('-last_read_at').values(
+        'textbook_id', 'current_page', 'total_pages', 'last_read_at'
+    ).first()
+    if last_reading:
+        pointer.textbook_id = last_reading['textbook_id']
+        pointer.textbook_page = last_reading['current_page']
+        pointer.textbook_total_pages = last_reading['total_pages']
+        pointer.reading_at = last_reading['last_read_at']
+
+    # A concurrent progress write may have created the row first; keep it
+    UserResumePointer.objects.bulk_create([pointer], ignore_conflicts=True)
+    logger.debug(f"[RESUME] Built resume pointer for user {user_id}")
+
+
+def backfill(user_ids=None):
+    """Build pointers for users (some, or everyone) who don't have one yet. Returns the number built."""
+    from django.contrib.auth.models import User
+
+    users = User.objects.filter(resume_pointer__isnull=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    built = 0
+    for user_id in users.values_list('pk', flat=True).iterator():
+        build_pointer(user_id)
+        bump(resume_tag(user_id))
+        built += 1
+    logger.info(f"[RESUME] Built {built} resume pointers")
+    return built
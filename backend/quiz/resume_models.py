@@ -0,0 +1,42 @@
+"""
+Per-user resume pointer for the dashboard's "Pick Up Where You Left Off"
+cards. Each progress write path updates its own columns (see
+quiz/resume.py), so the cards are read from one row instead of being
+derived from the attempt and progress tables.
+"""
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class UserResumePointer(models.Model):
+    """Where the user left off in their last textbook, video and topic quiz."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='resume_pointer')
+
+    # Reading
+    textbook = models.ForeignKey('quiz.Textbook', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    textbook_page = models.IntegerField(default=1)
+    textbook_total_pages = models.IntegerField(default=1)
+    reading_at = models.DateTimeField(null=True, blank=True)
+
+    # Videos: the video to resume and its 1-based position in the course
+    video = models.ForeignKey('quiz.Video', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    video_position = models.IntegerField(default=1)
+    video_total = models.IntegerField(default=0)
+    video_at = models.DateTimeField(null=True, blank=True)
+
+    # Practice: the in-progress topic quiz and its current question index
+    quiz_attempt = models.ForeignKey(
+        'quiz.TopicQuizAttempt', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    quiz_index = models.IntegerField(default=0)
+    quiz_total = models.IntegerField(default=0)
+    quiz_at = models.DateTimeField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "User Resume Pointer"
+        verbose_name_plural = "User Resume Pointers"
+
+    def __str__(self):
+        return f"Resume pointer for {self.user_id}"
@@ -0,0 +1,121 @@
+"""
+Score percentiles for mock exams.
+
+Each exam keeps a score histogram (ExamScoreHistogram) that is bumped as
+attempts complete. Lookups read a cached cumulative distribution
+(sorted distinct scores + running counts) and bisect into it, so a
+percentile costs one cache read and an O(log n) search.
+
+Writers don't store the CDF themselves: concurrent writers could store
+them out of order and leave an older one cached. They delete it once
+their histogram update commits, and the next lookup rebuilds it from the
+row.
+"""
+import logging
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ExamAttempt
+from .analytics_models import ExamScoreHistogram
+
+logger = logging.getLogger(__name__)
+
+MAX_SCORE = 100
+CDF_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _cdf_key(exam_id):
+    return f'exam_score_cdf_{exam_id}'
+
+
+def _build_cdf(counts):
+    """Return (scores, cumulative) where cumulative[i] = attempts scoring <= scores[i]."""
+    scores, cumulative = [], []
+    running = 0
+    for score, count in enumerate(counts):
+        if count:
+            running += count
+            scores.append(score)
+            cumulative.append(running)
+    return scores, cumulative
+
+
+def _load_cdf(exam_id):
+    counts = ExamScoreHistogram.objects.filter(exam_id=exam_id).values_list('counts', flat=True).first()
+    cdf = _build_cdf(counts or [])
+    cache.set(_cdf_key(exam_id), cdf, CDF_CACHE_TIMEOUT)
+    return cdf
+
+
+def _invalidate_cdf(exam_id):
+    transaction.on_commit(lambda: cache.delete(_cdf_key(exam_id)))
+
+
+def record_score(exam_id, score):
+    """Add a newly completed attempt's score to the exam histogram."""
+    if score is None:
+        return
+    score = max(0, min(MAX_SCORE, int(score)))
+    with transaction.atomic():
+        histogram, _ = ExamScoreHistogram.objects.select_for_update().get_or_create(exam_id=exam_id)
+        counts = list(histogram.counts) or [0] * (MAX_SCORE + 1)
+        counts[score] += 1
+        histogram.counts = counts
+        histogram.total += 1
+        histogram.save()
+        _invalidate_cdf(exam_id)
+
+
+def rebuild_histogram(exam_id):
+    """Recompute an exam's histogram from its completed attempts."""
+    counts = [0] * (MAX_SCORE + 1)
+    rows = ExamAttempt.objects.filter(
+        exam_id=exam_id, status='completed', score__isnull=False
+    ).order_by().values('score').annotate(n=Count('id')).values_list('score', 'n')
+    for score, n in rows:
+        counts[max(0, min(MAX_SCORE, score))] += n
+    with transaction.atomic():
+        histogram, _ = ExamScoreHistogram.objects.select_for_update().get_or_create(exam_id=exam_id)
+        histogram.counts = counts
+        histogram.total = sum(counts)
+        histogram.save()
+        _invalidate_cdf(exam_id)
+    return histogram
+
+
+def _percentile_from_cdf(cdf, score):
+    scores, cumulative = cdf
+    if not scores or score is None:
+        return None
+    total = cumulative[-1]
+    idx = bisect_left(scores, score)
+    below = cumulative[idx - 1] if idx > 0 else 0
+    equal = cumulative[idx] - below if idx < len(scores) and scores[idx] == score else 0
+    # Mid-rank percentile: ties count half
+    return round((below + 0.5 * equal) / total * 100)
+
+
+def get_percentile(exam_id, score):
+    """Percentile rank (0-100) of a score among completed attempts of an exam."""
+    cdf = cache.get(_cdf_key(exam_id))
+    if cdf is None:
+        cdf = _load_cdf(exam_id)
+    return _percentile_from_cdf(cdf, score)
+
+
+def get_percentiles(scores_by_exam):
+    """Batch lookup: {exam_id: score} -> {exam_id: percentile} with one cache round trip."""
+    if not scores_by_exam:
+        return {}
+    keys = {_cdf_key(exam_id): exam_id for exam_id in scores_by_exam}
+    cached = cache.get_many(list(keys))
+    result = {}
+    for key, exam_id in keys.items():
+        cdf = cached.get(key)
+        if cdf is None:
+            cdf = _load_cdf(exam_id)
+        result[exam_id] = _percentile_from_cdf(cdf, scores_by_exam[exam_id])
+    return result
@@ -0,0 +1,160 @@
+"""
+Model signal handlers for cache invalidation, denormalized counters and
+cache tags. Connected in QuizConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Exam, ExamAttempt, Question
+from .flashcard_models import Flashcard, FlashcardDeck, FlashcardProgress
+from .practice_question_models import (
+    PracticeQuestion, PracticeQuestionArea, PracticeQuestionCourse, PracticeQuestionTopic,
+)
+from .summary_notes_models import SummaryNotes, SummaryNotesChapter, SummaryNotesProgress
+from .textbook_models import Textbook
+from .topic_models import TopicQuizAttempt
+from .video_models import Video, VideoCourse, VideoProgress
+from .answer_keys import invalidate_exam_answer_key, invalidate_topic_answer_key
+from .cache_tags import (
+    CATALOG_EXAMS, CATALOG_FLASHCARDS, CATALOG_PRACTICE, CATALOG_SUMMARY_NOTES,
+    CATALOG_TEXTBOOKS, CATALOG_VIDEOS, bump, deck_tag, summary_notes_tag, user_tag,
+)
+from .video_navigation import invalidate_course_videos
+from .counters import (
+    recount_flashcard_decks, recount_practice_areas, recount_practice_topics,
+    recount_summary_notes, recount_video_courses, schedule_recount,
+)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    if instance.exam_id:
+        invalidate_exam_answer_key(instance.exam_id)
+
+
+@receiver([post_save, post_delete], sender=PracticeQuestion)
+def practice_question_changed(sender, instance, **kwargs):
+    topic_slug = PracticeQuestionTopic.objects.filter(
+        areas__id=instance.area_id
+    ).values_list('slug', flat=True).first()
+    if topic_slug:
+        invalidate_topic_answer_key(topic_slug)
+
+
+@receiver([post_save, post_delete], sender=Video)
+def video_changed(sender, instance, **kwargs):
+    # _counter_state holds the course stored before this save (read in
+    # pre_save below), in case the video was moved
+    old_state = getattr(instance, '_counter_state', None)
+    course_ids = {instance.course_id, old_state[0] if old_state else None}
+    invalidate_course_videos(course_ids)
+    # Again after commit, in case a reader cached the old order meanwhile
+    transaction.on_commit(lambda: invalidate_course_videos(course_ids))
+
+
+# ---------------------------------------------------------------------------
+# Denormalized counters (see quiz/counters.py)
+# ---------------------------------------------------------------------------
+
+# child model -> (parent FK attribute, fields that affect the count, recount)
+COUNTED_CHILDREN = {
+    Video: ('course_id', ('is_active', 'duration_seconds'), recount_video_courses),
+    Flashcard: ('deck_id', ('is_active',), recount_flashcard_decks),
+    SummaryNotesChapter: ('summary_notes_id', ('is_active',), recount_summary_notes),
+    PracticeQuestion: ('area_id', (), recount_practice_areas),
+    PracticeQuestionArea: ('topic_id', (), recount_practice_topics),
+}
+
+
+def _stored_counter_state(instance):
+    """The counted fields as stored in the DB, or None for a new row."""
+    if instance._state.adding or instance.pk is None:
+        return None
+    parent_field, fields, _ = COUNTED_CHILDREN[type(instance)]
+    return type(instance)._default_manager.filter(pk=instance.pk).values_list(
+        parent_field, *fields
+    ).first()
+
+
+def _counter_state(instance, stored_state):
+    # Deferred fields are not saved, so they still hold the stored value;
+    # reading them from the instance would cost a query each
+    parent_field, fields, _ = COUNTED_CHILDREN[type(instance)]
+    return tuple(
+        instance.__dict__[field] if field in instance.__dict__ else stored_state[index]
+        for index, field in enumerate((parent_field,) + fields)
+    )
+
+
+def remember_counter_state(sender, instance, **kwargs):
+    # Read on save rather than on load, so loading rows costs nothing extra
+    instance._counter_state = _stored_counter_state(instance)
+
+
+def counted_child_saved(sender, instance, created, **kwargs):
+    parent_field, _, recount = COUNTED_CHILDREN[sender]
+    old_state = getattr(instance, '_counter_state', None)
+    if created or old_state is None:
+        schedule_recount(recount, {getattr(instance, parent_field)})
+    elif old_state != _counter_state(instance, old_state):
+        schedule_recount(recount, {old_state[0], getattr(instance, parent_field)})
+
+
+def counted_child_deleted(sender, instance, **kwargs):
+    parent_field, _, recount = COUNTED_CHILDREN[sender]
+    schedule_recount(recount, {getattr(instance, parent_field)})
+
+
+for _model in COUNTED_CHILDREN:
+    pre_save.connect(remember_counter_state, sender=_model)
+    post_save.connect(counted_child_saved, sender=_model)
+    post_delete.connect(counted_child_deleted, sender=_model)
+
+
+# ---------------------------------------------------------------------------
+# Cache tags (see quiz/cache_tags.py). Connected after the counter handlers,
+# so the on-commit bump runs after the recount it depends on.
+# ---------------------------------------------------------------------------
+
+# model -> function(instance) returning the tags its rows feed
+TAGGED_MODELS = {
+    VideoCourse: lambda instance: {CATALOG_VIDEOS},
+    Video: lambda instance: {CATALOG_VIDEOS},
+    FlashcardDeck: lambda instance: {CATALOG_FLASHCARDS, deck_tag(instance.pk)},
+    Flashcard: lambda instance: {CATALOG_FLASHCARDS, deck_tag(instance.deck_id)},
+    SummaryNotes: lambda instance: {CATALOG_SUMMARY_NOTES, summary_notes_tag(instance.pk)},
+    SummaryNotesChapter: lambda instance: {CATALOG_SUMMARY_NOTES, summary_notes_tag(instance.summary_notes_id)},
+    PracticeQuestionCourse: lambda instance: {CATALOG_PRACTICE},
+    PracticeQuestionTopic: lambda instance: {CATALOG_PRACTICE},
+    PracticeQuestionArea: lambda instance: {CATALOG_PRACTICE},
+    PracticeQuestion: lambda instance: {CATALOG_PRACTICE},
+    Exam: lambda instance: {CATALOG_EXAMS},
+    Textbook: lambda instance: {CATALOG_TEXTBOOKS},
+    # Per-user progress
+    VideoProgress: lambda instance: {user_tag(instance.user_id)},
+    FlashcardProgress: lambda instance: {user_tag(instance.user_id)},
+    SummaryNotesProgress: lambda instance: {user_tag(instance.user_id)},
+    TopicQuizAttempt: lambda instance: {user_tag(instance.user_id)},
+    ExamAttempt: lambda instance: {user_tag(instance.user_id)},
+}
+
+# Children that can move to another parent -> tag of a parent id. Their
+# stored parent comes from _counter_state (read in pre_save above).
+MOVABLE_TAGGED_MODELS = {
+    Flashcard: deck_tag,
+    SummaryNotesChapter: summary_notes_tag,
+}
+
+
+def tagged_model_changed(sender, instance, **kwargs):
+    tags = TAGGED_MODELS[sender](instance)
+    old_state = getattr(instance, '_counter_state', None)
+    if sender in MOVABLE_TAGGED_MODELS and old_state:
+        tags.add(MOVABLE_TAGGED_MODELS[sender](old_state[0]))
+    bump(*tags)
+
+
+for _model in TAGGED_MODELS:
+    post_save.connect(tagged_model_changed, sender=_model)
+    post_delete.connect(tagged_model_changed, sender=_model)
@@ -0,0 +1,98 @@
+"""
+Pre-encoded exam snapshot cache.
+
+Exam.questions_snapshot is a JSONField, so reading it decodes the whole blob
+into Python dicts and DRF then encodes it straight back to JSON. Snapshots
+only change when they are regenerated, so we keep them in the cache as
+ready-to-send UTF-8 bytes (plain and gzip-compressed), keyed by
+Exam.snapshot_version, and write those bytes directly into the response.
+"""
+import gzip
+import json
+import logging
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .models import Exam
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24  # versioned keys, so a long TTL is safe
+
+
+def _cache_key(exam_id, version):
+    return f'exam_snapshot_bytes_{exam_id}_v{version}'
+
+
+def get_snapshot_bytes(exam_id, version):
+    """
+    Return the encoded snapshot for an exam as a dict with keys
+    ``raw`` (UTF-8 JSON bytes), ``gzip`` (compressed bytes) and ``count``,
+    or None if the exam has no snapshot.
+    """
+    key = _cache_key(exam_id, version)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    snapshot = Exam.objects.filter(id=exam_id).values_list('questions_snapshot', flat=True).first()
+    if not snapshot:
+        return None
+
+    raw = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    entry = {
+        'raw': raw,
+        'gzip': gzip.compress(raw, compresslevel=6),
+        'count': len(snapshot),
+    }
+    cache.set(key, entry, SNAPSHOT_CACHE_TIMEOUT)
+    logger.debug(
+        f"[SNAPSHOT_CACHE] Encoded exam {exam_id} v{version} - "
+        f"{len(raw) / 1024:.1f}KB raw, {len(entry['gzip']) / 1024:.1f}KB gzip"
+    )
+    return entry
+
+
+def accepts_gzip(request):
+    return 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+
+def json_bytes_response(body, request=None, compressed=None):
+    """
+    Build an HttpResponse from already-encoded JSON bytes.
+
+    If ``compressed`` (the gzip form of ``body``) is given and the client
+    accepts gzip, the compressed bytes are sent as-is.
+    """
+    if compressed is not None and request is not None and accepts_gzip(request):
+        response = HttpResponse(compressed, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def snapshot_response(entry, request):
+    """Serve a cached snapshot entry without decoding it."""
+    return json_bytes_response(entry['raw'], request, compressed=entry['gzip'])
+
+
+def review_response(entry, request, attempt_data, answers):
+    """
+    Serve the review payload by splicing the pre-encoded questions bytes
+    between the small per-attempt JSON fragments. The body differs per
+    attempt, so it is compressed per request (only if the client accepts gzip).
+    """
+    body = b''.join([
+        b'{"attempt":',
+        json.dumps(attempt_data, separators=(',', ':')).encode('utf-8'),
+        b',"answers":',
+        json.dumps(answers, separators=(',', ':')).encode('utf-8'),
+        b',"questions":',
+        entry['raw'],
+        b'}',
+    ])
+    compressed = gzip.compress(body, compresslevel=6) if accepts_gzip(request) else None
+    return json_bytes_response(body, request, compressed=compressed)
@@ -22,6 +22,8 @@ class SummaryNotes(models.Model):
     order = models.IntegerField(default=0)
     source_file = models.CharField(max_length=255, blank=True)  # Original .docx filename
     is_active = models.BooleanField(default=True)
+    # Denormalized count of active chapters (maintained by quiz/counters.py)
+    total_chapters = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -32,10 +34,6 @@ class SummaryNotes(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.category})"
-    
-    @property
-    def total_chapters(self):
-        return self.chapters.filter(is_active=True).count()
 
 
 class SummaryNotesChapter(models.Model):
@@ -8,10 +8,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import serializers
-from django.db.models import Count, Prefetch
-from django.db import models
-from django.core.cache import cache
+from django.db.models import Prefetch
 
+from .cache_tags import CATALOG_SUMMARY_NOTES, get_or_set, summary_notes_tag, user_tag
 from .summary_notes_models import SummaryNotes, SummaryNotesChapter, SummaryNotesProgress
 
 
@@ -45,9 +44,7 @@ class SummaryNotesChapterDetailSerializer(serializers.ModelSerializer):
 
 
 class SummaryNotesListSerializer(serializers.ModelSerializer):
-    """Serializer for summary notes list - uses annotated fields."""
-    # Use annotated field from queryset instead of property
-    total_chapters = serializers.IntegerField(source='chapter_count', read_only=True)
+    """Serializer for summary notes list - uses denormalized counters."""
     chapters_completed = serializers.SerializerMethodField()
     progress_percentage = serializers.SerializerMethodField()
     category_display = serializers.CharField(source='get_category_display', read_only=True)
@@ -69,19 +66,18 @@ class SummaryNotesListSerializer(serializers.ModelSerializer):
         return 0
     
     def get_progress_percentage(self, obj):
-        # Use prefetched data and annotated count
-        if hasattr(obj, '_prefetched_progress') and hasattr(obj, 'chapter_count'):
+        # Use prefetched data and the stored chapter count
+        if hasattr(obj, '_prefetched_progress'):
             progress = obj._prefetched_progress
-            if progress and obj.chapter_count > 0:
+            if progress and obj.total_chapters > 0:
                 completed = len(progress.completed_chapters or [])
-                return round((completed / obj.chapter_count) * 100)
+                return round((completed / obj.total_chapters) * 100)
         return 0
 
 
 class SummaryNotesDetailSerializer(serializers.ModelSerializer):
     """Full serializer for summary notes with chapters."""
     chapters = serializers.SerializerMethodField()
-    total_chapters = serializers.IntegerField(source='chapter_count', read_only=True)
     chapters_completed = serializers.SerializerMethodField()
     progress_percentage = serializers.SerializerMethodField()
     current_chapter_id = serializers.SerializerMethodField()
@@ -117,7 +113,7 @@ class SummaryNotesDetailSerializer(serializers.ModelSerializer):
     
     def get_progress_percentage(self, obj):
         completed_chapters = self.context.get('completed_chapters', [])
-        total = getattr(obj, 'chapter_count', 0)
+        total = obj.total_chapters
         if total > 0:
             return round((len(completed_chapters) / total) * 100)
         return 0
@@ -135,6 +131,23 @@ def add_cache_headers(response, max_age=3600, public=True):
     return response
 
 
+def get_user_progress(user):
+    """{summary_notes_id: {'completed': [...], 'current': chapter_id}}, cached until the user's progress changes."""
+    def build():
+        progress_list = SummaryNotesProgress.objects.filter(
+            user=user
+        ).values('summary_notes_id', 'completed_chapters', 'current_chapter_id')
+        return {
+            p['summary_notes_id']: {
+                'completed': p['completed_chapters'] or [],
+                'current': p['current_chapter_id']
+            }
+            for p in progress_list
+        }
+    
+    return get_or_set('summary_notes_progress', [user_tag(user.id)], build)
+
+
 class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Summary Notes - OPTIMIZED for performance.
@@ -154,26 +167,16 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
         return SummaryNotesListSerializer
     
     def get_queryset(self):
-        # Annotate chapter count to avoid N+1 queries
-        return SummaryNotes.objects.filter(is_active=True).annotate(
-            chapter_count=Count('chapters', filter=models.Q(chapters__is_active=True))
-        ).order_by('category', 'order', 'title')
+        # total_chapters is a stored counter, no annotation needed
+        return SummaryNotes.objects.filter(is_active=True).order_by('category', 'order', 'title')
     
     def list(self, request, *args, **kwargs):
-        # CACHE KEY STRATEGY:
-        # - Static data (course list): cached for 30 minutes
-        # - User progress: cached for 2 minutes
-        
-        # Try to get cached static data
-        static_cache_key = 'summary_notes_list_static'
-        cached_static = cache.get(static_cache_key)
-        
-        if cached_static is None:
-            # Fetch and cache static data
-            queryset = self.get_queryset()
-            notes_data = []
-            for notes in queryset:
-                notes_data.append({
+        # CACHE TAGS:
+        # - Static data (course list): invalidated when any summary notes change
+        # - User progress: invalidated when the user's progress changes
+        def build_static():
+            return [
+                {
                     'id': notes.id,
                     'title': notes.title,
                     'subject': notes.subject,
@@ -182,28 +185,15 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
                     'description': notes.description,
                     'icon': notes.icon,
                     'order': notes.order,
-                    'total_chapters': notes.chapter_count,
-                })
-            cached_static = notes_data
-            cache.set(static_cache_key, cached_static, 1800)  # 30 minutes
+                    'total_chapters': notes.total_chapters,
+                }
+                for notes in self.get_queryset()
+            ]
+        
+        cached_static = get_or_set('summary_notes_list', [CATALOG_SUMMARY_NOTES], build_static, local=True)
         
-        # Get user progress (cached separately for 2 minutes)
         if request.user.is_authenticated:
-            user_cache_key = f'summary_notes_progress_{request.user.id}'
-            user_progress = cache.get(user_cache_key)
-            
-            # Handle stale cache with wrong format or missing cache
-            if user_progress is None or not isinstance(user_progress, dict):
-                progress_list = SummaryNotesProgress.objects.filter(
-                    user=request.user
-                ).values('summary_notes_id', 'completed_chapters', 'current_chapter_id')
-                user_progress = {}
-                for p in progress_list:
-                    user_progress[p['summary_notes_id']] = {
-                        'completed': p['completed_chapters'] or [],
-                        'current': p['current_chapter_id']
-                    }
-                cache.set(user_cache_key, user_progress, 120)  # 2 minutes
+            user_progress = get_user_progress(request.user)
         else:
             user_progress = {}
         
@@ -229,11 +219,8 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         pk = kwargs.get('pk')
         
-        # Try to get cached static data for this notes
-        static_cache_key = f'summary_notes_detail_{pk}'
-        cached_static = cache.get(static_cache_key)
-        
-        if cached_static is None:
+        # Static data for these notes, invalidated when the notes or their chapters change
+        def build_static():
             instance = self.get_object()
             
             # Batch fetch chapters (only id, title, order - NO content)
@@ -243,7 +230,7 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
                 .values('id', 'title', 'order')
             )
             
-            cached_static = {
+            return {
                 'id': instance.id,
                 'title': instance.title,
                 'subject': instance.subject,
@@ -255,28 +242,14 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
                 'total_chapters': len(chapters),
                 'chapters': chapters,
             }
-            cache.set(static_cache_key, cached_static, 1800)  # 30 minutes
         
-        # Get user progress (cached for 2 minutes)
+        cached_static = get_or_set(f'summary_notes_detail_{pk}', [summary_notes_tag(pk)], build_static)
+        
         completed_chapters = []
         current_chapter_id = cached_static['chapters'][0]['id'] if cached_static['chapters'] else None
         
         if request.user.is_authenticated:
-            user_cache_key = f'summary_notes_progress_{request.user.id}'
-            user_progress = cache.get(user_cache_key)
-            
-            # Handle stale cache with wrong format or missing cache
-            if user_progress is None or not isinstance(user_progress, dict):
-                progress_list = SummaryNotesProgress.objects.filter(
-                    user=request.user
-                ).values('summary_notes_id', 'completed_chapters', 'current_chapter_id')
-                user_progress = {}
-                for p in progress_list:
-                    user_progress[p['summary_notes_id']] = {
-                        'completed': p['completed_chapters'] or [],
-                        'current': p['current_chapter_id']
-                    }
-                cache.set(user_cache_key, user_progress, 120)  # 2 minutes
+            user_progress = get_user_progress(request.user)
             
             notes_progress = user_progress.get(int(pk), {})
             if isinstance(notes_progress, dict):
@@ -307,11 +280,8 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
     def chapter(self, request, pk=None, chapter_id=None):
         """Get specific chapter content."""
         
-        # Try to get cached chapter content (rarely changes)
-        chapter_cache_key = f'summary_notes_chapter_{pk}_{chapter_id}'
-        cached_chapter = cache.get(chapter_cache_key)
-        
-        if cached_chapter is None:
+        # Chapter content, invalidated when these notes or their chapters change
+        def build_chapter():
             summary_notes = self.get_object()
             
             try:
@@ -319,10 +289,7 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
                     'id', 'title', 'order', 'content', 'summary_notes_id'
                 ).get(id=chapter_id, is_active=True)
             except SummaryNotesChapter.DoesNotExist:
-                return Response(
-                    {'error': 'Chapter not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+                return None
             
             # Get chapter navigation info efficiently
             chapter_nav = list(
@@ -340,7 +307,7 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
                 prev_chapter_id = None
                 next_chapter_id = None
             
-            cached_chapter = {
+            return {
                 'id': chapter.id,
                 'title': chapter.title,
                 'order': chapter.order,
@@ -350,26 +317,20 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
                 'chapter_number': current_index + 1,
                 'total_chapters': len(chapter_nav)
             }
-            cache.set(chapter_cache_key, cached_chapter, 1800)  # 30 minutes
+        
+        cached_chapter = get_or_set(
+            f'summary_notes_chapter_{pk}_{chapter_id}', [summary_notes_tag(pk)], build_chapter
+        )
+        if cached_chapter is None:
+            return Response(
+                {'error': 'Chapter not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
         # Get user's completed chapters from cached progress
         is_completed = False
         if request.user.is_authenticated:
-            user_cache_key = f'summary_notes_progress_{request.user.id}'
-            user_progress = cache.get(user_cache_key)
-            
-            # Handle stale cache with wrong format or missing cache
-            if user_progress is None or not isinstance(user_progress, dict):
-                progress_list = SummaryNotesProgress.objects.filter(
-                    user=request.user
-                ).values('summary_notes_id', 'completed_chapters', 'current_chapter_id')
-                user_progress = {}
-                for p in progress_list:
-                    user_progress[p['summary_notes_id']] = {
-                        'completed': p['completed_chapters'] or [],
-                        'current': p['current_chapter_id']
-                    }
-                cache.set(user_cache_key, user_progress, 120)  # 2 minutes
+            user_progress = get_user_progress(request.user)
             
             notes_progress = user_progress.get(int(pk), {})
             if isinstance(notes_progress, dict):
@@ -411,12 +372,9 @@ class SummaryNotesViewSet(viewsets.ReadOnlyModelViewSet):
                         completed.append(chapter.id)
                         progress.completed_chapters = completed
                 
+                # Saving bumps the user's cache tag (quiz/signals.py)
                 progress.save()
                 
-                # Invalidate user's progress cache so next request gets fresh data
-                user_cache_key = f'summary_notes_progress_{request.user.id}'
-                cache.delete(user_cache_key)
-                
             except SummaryNotesChapter.DoesNotExist:
                 return Response(
                     {'error': 'Chapter not found'},
@@ -0,0 +1,355 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import cache_tags, leaderboard, query_metrics
+from .activity_models import UserActivityBitmap, _run_length
+from .flashcard_models import FlashcardReviewState
+from .flashcard_scheduling import MIN_EASE, apply_review
+from .models import Exam, ExamAttempt, Question, QuestionAnswer
+from .rescoring import rescore_exam
+from .topic_models import LEVEL_STEPS, LEVEL_THRESHOLDS, UserGameProfile, level_for_points, rank_for_level
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cache-tags-tests',
+    }
+})
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _run_concurrently(self, workers, target):
+        barrier = threading.Barrier(workers)
+        results = [None] * workers
+
+        def run(index):
+            barrier.wait()
+            results[index] = target()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'exams': [1, 2, 3]}
+
+        results = self._run_concurrently(
+            16, lambda: cache_tags.get_or_compute('stampede_test', compute, 60)
+        )
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'exams': [1, 2, 3]}] * 16)
+
+    def test_bumped_tag_serves_stale_while_one_worker_recomputes(self):
+        tags = [cache_tags.CATALOG_EXAMS]
+        self.assertEqual(cache_tags.get_or_set('stale_test', tags, lambda: 'old', local=True), 'old')
+        cache_tags.bump(*tags)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'new'
+
+        results = self._run_concurrently(
+            8, lambda: cache_tags.get_or_set('stale_test', tags, compute, local=True)
+        )
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results.count('new'), 1)
+        self.assertEqual(results.count('old'), 7)
+        self.assertEqual(cache_tags.get_or_set('stale_test', tags, compute, local=True), 'new')
+
+    def test_entry_near_expiry_is_refreshed_early(self):
+        # Five seconds left and took ten seconds to compute: refreshed unless
+        # the draw lands in the lowest ~40%
+        cache.set('early_test', ('old', time.time() + 5, 10), 60)
+
+        with mock.patch.object(cache_tags.random, 'random', return_value=0.1):
+            self.assertEqual(cache_tags.get_or_compute('early_test', lambda: 'new', 60), 'old')
+        with mock.patch.object(cache_tags.random, 'random', return_value=0.9):
+            self.assertEqual(cache_tags.get_or_compute('early_test', lambda: 'new', 60), 'new')
+        self.assertEqual(cache.get('early_test')[0], 'new')
+
+    def test_fresh_entry_is_not_recomputed(self):
+        cache.set('fresh_test', ('cached', time.time() + 3600, 0.01), 3600)
+
+        self.assertEqual(cache_tags.get_or_compute('fresh_test', lambda: 'new', 3600), 'cached')
+
+
+@override_settings(QUERY_REPEAT_THRESHOLD=3)
+class QueryRecorderTests(SimpleTestCase):
+    def setUp(self):
+        query_metrics.reset()
+
+    def _run(self, recorder, *statements):
+        for sql in statements:
+            recorder(lambda sql, params, many, context: None, sql, (), False, {})
+
+    def test_repeated_statements_are_reported_after_normalizing(self):
+        recorder = query_metrics.QueryRecorder()
+        self._run(
+            recorder,
+            'SELECT * FROM "quiz_exam"',
+            'SELECT * FROM "quiz_question" WHERE "exam_id" = %s',
+            'SELECT * FROM "quiz_question" WHERE "exam_id" = %s',
+            'SELECT * FROM "quiz_question" WHERE "exam_id" = 7',
+            'SELECT * FROM "quiz_option" WHERE "question_id" IN (%s, %s)',
+        )
+
+        summary = recorder.summary()
+
+        self.assertEqual(summary['queries'], 5)
+        self.assertEqual(summary['duplicates'], 2)
+        self.assertEqual(summary['repeated'], [
+            {'sql': 'SELECT * FROM "quiz_question" WHERE "exam_id" = ?', 'count': 3},
+        ])
+
+    def test_in_lists_of_any_length_normalize_alike(self):
+        self.assertEqual(
+            query_metrics.normalize_sql('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+            query_metrics.normalize_sql("SELECT 1 FROM t WHERE id IN ('a')"),
+        )
+
+    def test_requests_are_aggregated_per_route(self):
+        first = {'queries': 4, 'db_ms': 2.0, 'duplicates': 0, 'repeated': []}
+        second = {'queries': 10, 'db_ms': 6.0, 'duplicates': 8, 'repeated': [{'sql': 'SELECT ?', 'count': 9}]}
+        query_metrics.record_request('GET exams/', first, 20.0)
+        query_metrics.record_request('GET exams/', second, 40.0)
+
+        [route] = query_metrics.stats()['routes']
+
+        self.assertEqual(route['requests'], 2)
+        self.assertEqual(route['avg_queries'], 7)
+        self.assertEqual(route['max_queries'], 10)
+        self.assertEqual(route['avg_db_ms'], 4.0)
+        self.assertEqual(route['n_plus_one_requests'], 1)
+        self.assertEqual(route['repeated'], [{'sql': 'SELECT ?', 'max_count': 9}])
+
+
+class ActivityBitmapTests(SimpleTestCase):
+    start = date(2026, 3, 1)
+
+    def _bitmap(self, *offsets):
+        bitmap = UserActivityBitmap(user_id=1, start_date=self.start)
+        for offset in offsets:
+            bitmap.set_day(self.start + timedelta(days=offset))
+        return bitmap
+
+    def test_empty_map_has_no_streak(self):
+        bitmap = self._bitmap()
+
+        self.assertEqual(bitmap.current_streak(self.start + timedelta(days=3)), 0)
+        self.assertEqual(bitmap.longest_streak, 0)
+        self.assertFalse(bitmap.is_active(self.start))
+
+    def test_gap_ends_the_current_streak(self):
+        bitmap = self._bitmap(0, 1, 3, 4, 5)
+
+        self.assertEqual(bitmap.current_streak(self.start + timedelta(days=5)), 3)
+        self.assertEqual(bitmap.longest_streak, 3)
+        self.assertEqual(bitmap.current_streak(self.start + timedelta(days=7)), 0)
+
+    def test_filling_a_gap_joins_the_runs(self):
+        bitmap = self._bitmap(0, 1, 3, 4)
+        bitmap.set_day(self.start + timedelta(days=2))
+
+        self.assertEqual(bitmap.longest_streak, 5)
+        self.assertEqual(_run_length(bitmap._int(), 2), 5)
+
+    def test_streak_ending_yesterday_still_counts(self):
+        bitmap = self._bitmap(2, 3, 4)
+
+        self.assertEqual(bitmap.current_streak(self.start + timedelta(days=5)), 3)
+
+    def test_day_before_start_date_extends_the_map(self):
+        bitmap = self._bitmap(0)
+        bitmap.set_day(self.start - timedelta(days=2))
+
+        self.assertEqual(bitmap.start_date, self.start - timedelta(days=2))
+        self.assertTrue(bitmap.is_active(self.start))
+        self.assertTrue(bitmap.is_active(self.start - timedelta(days=2)))
+        self.assertFalse(bitmap.is_active(self.start - timedelta(days=1)))
+        self.assertEqual(bitmap.longest_streak, 1)
+
+        bitmap.set_day(self.start - timedelta(days=1))
+
+        self.assertEqual(bitmap.longest_streak, 3)
+        self.assertEqual(bitmap.current_streak(self.start), 3)
+
+
+class LeaderboardStoreTests(SimpleTestCase):
+    def test_redis_backend_uses_sorted_sets(self):
+        backend = mock.Mock(spec=RedisCache)
+        backend.make_and_validate_key.side_effect = lambda key: f':1:{key}'
+
+        with mock.patch.object(leaderboard, 'caches', {'default': backend}):
+            store = leaderboard._store()
+
+        self.assertIsInstance(store, leaderboard._SortedSetStore)
+        self.assertIs(store.client, backend._cache.get_client.return_value)
+        backend._cache.get_client.assert_called_once_with(write=True)
+        self.assertEqual(store._keys('global'), (':1:leaderboard_global_built', ':1:leaderboard_global'))
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'leaderboard-tests',
+        }
+    })
+    def test_other_backends_use_the_list_store(self):
+        self.assertIsInstance(leaderboard._store(), leaderboard._ListStore)
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'leaderboard-tests',
+        }
+    })
+    def test_list_store_ranks_ties_equally(self):
+        store = leaderboard._ListStore()
+        self.assertEqual(store.store('ties_test', {1: 50, 2: 80, 3: 50, 4: 10, 5: 0}), 4)
+
+        self.assertEqual(store.page('ties_test', 0, 10), (4, [(1, 2, 80), (2, 1, 50), (2, 3, 50), (4, 4, 10)]))
+        self.assertEqual(store.rank('ties_test', 3), (2, 50, 4))
+        self.assertEqual(store.rank('ties_test', 5), (None, 0, 4))
+
+        store.update('ties_test', 4, 80)
+
+        self.assertEqual(store.page('ties_test', 0, 2), (4, [(1, 2, 80), (1, 4, 80)]))
+        self.assertEqual(store.rank('ties_test', 1), (3, 50, 4))
+
+
+class ApplyReviewTests(SimpleTestCase):
+    reviewed_at = timezone.make_aware(datetime(2026, 3, 1, 9, 0))
+
+    def _state(self, **fields):
+        return FlashcardReviewState(user_id=1, card_id=1, deck_id=1, due_at=self.reviewed_at, **fields)
+
+    def test_passing_reviews_grow_the_interval(self):
+        state = self._state()
+        intervals = [apply_review(state, 4, self.reviewed_at).interval_days for _ in range(3)]
+
+        self.assertEqual(intervals, [1, 6, 15])
+        self.assertEqual(state.repetitions, 3)
+        self.assertAlmostEqual(state.ease, 2.5)
+        self.assertEqual(state.due_at, self.reviewed_at + timedelta(days=15))
+
+    def test_grade_moves_the_ease(self):
+        self.assertAlmostEqual(apply_review(self._state(), 5, self.reviewed_at).ease, 2.6)
+        self.assertAlmostEqual(apply_review(self._state(), 3, self.reviewed_at).ease, 2.36)
+
+    def test_failed_review_resets_the_card(self):
+        state = self._state(repetitions=4, interval_days=40)
+        apply_review(state, 2, self.reviewed_at)
+
+        self.assertEqual(state.repetitions, 0)
+        self.assertEqual(state.lapses, 1)
+        self.assertEqual(state.interval_days, 1)
+        self.assertEqual(state.due_at, self.reviewed_at + timedelta(days=1))
+
+    def test_ease_never_drops_below_the_floor(self):
+        state = self._state()
+        for _ in range(10):
+            apply_review(state, 0, self.reviewed_at)
+
+        self.assertEqual(state.ease, MIN_EASE)
+
+
+class LevelTableTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('level-test')
+
+    def _profile(self):
+        return UserGameProfile.objects.get(user=self.user)
+
+    def test_level_table_steps_grow(self):
+        self.assertEqual(LEVEL_THRESHOLDS[:4], [0, 500, 1100, 1820])
+        self.assertEqual(LEVEL_STEPS[:3], [500, 600, 720])
+        self.assertEqual(level_for_points(1099), (2, 599, 600))
+        self.assertEqual(level_for_points(1100), (3, 0, 720))
+
+    def test_record_quiz_matches_the_python_level_table(self):
+        total = 0
+        for points in (499, 1, 599, 1, 5000, 40000):
+            UserGameProfile.record_quiz(self.user.id, points=points, correct=1, completed=True)
+            total += points
+            profile = self._profile()
+            level, xp, xp_to_next = level_for_points(total)
+
+            self.assertEqual(profile.total_points, total)
+            self.assertEqual(
+                (profile.current_level, profile.xp, profile.xp_to_next_level, profile.rank),
+                (level, xp, xp_to_next, rank_for_level(level)),
+            )
+        self.assertEqual(self._profile().total_quizzes_completed, 6)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rescoring-tests',
+    }
+})
+class RescoreExamTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('rescore-test')
+        self.exam = Exam.objects.create(title='Rescore test')
+        self.q1 = Question.objects.create(
+            exam=self.exam, question_number=1, text='Q1', explanation='', correct_answer='A'
+        )
+        self.q2 = Question.objects.create(
+            exam=self.exam, question_number=2, text='Q2', explanation='', correct_answer='B'
+        )
+        self.attempt = ExamAttempt.objects.create(
+            user=user, exam=self.exam, status='completed', score=50, ended_at=timezone.now()
+        )
+        self.attempt.selected_questions.set([self.q1, self.q2])
+        QuestionAnswer.objects.create(exam_attempt=self.attempt, question=self.q1, selected_answer='A', is_correct=True)
+        QuestionAnswer.objects.create(exam_attempt=self.attempt, question=self.q2, selected_answer='C', is_correct=False)
+
+    def test_corrected_key_rescores_the_attempt(self):
+        Question.objects.filter(pk=self.q2.pk).update(correct_answer='C')
+
+        result = rescore_exam(self.exam.id)
+
+        self.assertEqual(result['stale_answers'], 1)
+        self.assertEqual(result['changed_attempts'], [{
+            'attempt_id': self.attempt.id,
+            'user_id': self.attempt.user_id,
+            'answers_changed': 1,
+            'old_score': 50,
+            'new_score': 100,
+        }])
+        self.assertTrue(QuestionAnswer.objects.get(exam_attempt=self.attempt, question=self.q2).is_correct)
+
+    def test_dry_run_changes_nothing(self):
+        Question.objects.filter(pk=self.q1.pk).update(correct_answer='D')
+
+        result = rescore_exam(self.exam.id, dry_run=True)
+
+        self.assertEqual(result['changed_attempts'][0]['new_score'], None)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 50)
+        self.assertTrue(QuestionAnswer.objects.get(exam_attempt=self.attempt, question=self.q1).is_correct)
+
+    def test_unchanged_keys_report_no_attempts(self):
+        self.assertEqual(rescore_exam(self.exam.id)['changed_attempts'], [])
@@ -7,8 +7,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.http import FileResponse, StreamingHttpResponse, Http404
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 
-from .textbook_models import Textbook
+from .activity import record_activity
+from .resume import record_reading
+from .textbook_models import Textbook, TextbookProgress
 from .textbook_serializers import TextbookSerializer, TextbookListSerializer
 
 logger = logging.getLogger(__name__)
@@ -104,6 +108,7 @@ class TextbookViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /textbooks/ - List all textbooks
     - GET /textbooks/{id}/ - Get textbook details
     - GET /textbooks/{id}/pdf/ - Download/stream PDF file with range support
+    - POST /textbooks/{id}/progress/ - Save the user's reading position
     """
     queryset = Textbook.objects.all()
     permission_classes = [IsAuthenticated]
@@ -128,6 +133,50 @@ class TextbookViewSet(viewsets.ReadOnlyModelViewSet):
         # Cache textbook list for 1 hour (content rarely changes)
         return add_cache_headers(response, max_age=3600, public=False)
     
+    @action(detail=True, methods=['post'])
+    def progress(self, request, pk=None):
+        """
+        Save the user's reading position and move their resume pointer to it.
+        Body: { "current_page": 12, "total_pages": 240, "time_spent_seconds": 30 }
+        """
+        textbook = self.get_object()
+        try:
+            current_page = int(request.data.get('current_page', 1))
+            total_pages = int(request.data.get('total_pages', 1))
+            time_spent = int(request.data.get('time_spent_seconds', 0))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'current_page, total_pages and time_spent_seconds must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        total_pages = max(total_pages, 1)
+        current_page = min(max(current_page, 1), total_pages)
+        time_spent = max(time_spent, 0)
+
+        progress, created = TextbookProgress.objects.get_or_create(
+            user=request.user,
+            textbook=textbook,
+            defaults={'current_page': current_page, 'total_pages': total_pages, 'time_spent_seconds': time_spent},
+        )
+        # textbooks_read counts each textbook once per day, like the backfill
+        first_read_today = created or timezone.localdate(progress.last_read_at) != timezone.localdate()
+        if not created:
+            progress.current_page = current_page
+            progress.total_pages = total_pages
+            progress.time_spent_seconds = F('time_spent_seconds') + time_spent
+            progress.save(update_fields=['current_page', 'total_pages', 'time_spent_seconds', 'last_read_at'])
+            progress.refresh_from_db(fields=['time_spent_seconds'])
+        record_reading(request.user.id, textbook.id, current_page, total_pages, progress.last_read_at)
+        record_activity(request.user.id, progress.last_read_at, textbooks_read=1 if first_read_today else 0)
+
+        return Response({
+            'current_page': progress.current_page,
+            'total_pages': progress.total_pages,
+            'time_spent_seconds': progress.time_spent_seconds,
+            'progress_percentage': progress.progress_percentage,
+            'last_read_at': progress.last_read_at,
+        })
+
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
         """
@@ -1,6 +1,14 @@
-from django.db import models
+import bisect
+
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .leaderboard import record_total_points
+from .practice_question_models import PracticeQuestionArea, PracticeQuestionTopic
 
 
 class UserGameProfile(models.Model):
@@ -43,37 +51,99 @@ class UserGameProfile(models.Model):
         return f"{self.user.username} - Level {self.current_level} ({self.get_rank_display()})"
 
     def add_xp(self, amount):
-        """Add XP and handle level ups"""
-        self.xp += amount
-        self.total_points += amount
-        
-        # Check for level up
-        while self.xp >= self.xp_to_next_level:
-            self.xp -= self.xp_to_next_level
-            self.current_level += 1
-            # Increase XP needed for next level
-            self.xp_to_next_level = int(self.xp_to_next_level * 1.2)
-            # Update rank based on level
-            self._update_rank()
-        
-        self.save()
+        """Add XP and handle level ups (one UPDATE; the instance is refreshed)"""
+        UserGameProfile.record_quiz(self.user_id, points=amount)
+        self.refresh_from_db(fields=['total_points', 'current_level', 'xp', 'xp_to_next_level', 'rank'])
+        transaction.on_commit(lambda: record_total_points(self.user_id, self.total_points))
 
     def _update_rank(self):
         """Update rank based on current level"""
-        if self.current_level >= 50:
-            self.rank = 'legal_legend'
-        elif self.current_level >= 30:
-            self.rank = 'justice_seeker'
-        elif self.current_level >= 20:
-            self.rank = 'statute_sage'
-        elif self.current_level >= 12:
-            self.rank = 'case_analyst'
-        elif self.current_level >= 7:
-            self.rank = 'legal_explorer'
-        elif self.current_level >= 3:
-            self.rank = 'law_apprentice'
-        else:
-            self.rank = 'rookie_scholar'
+        self.rank = rank_for_level(self.current_level)
+
+    @classmethod
+    def record_quiz(cls, user_id, points=0, correct=0, wrong=0, completed=False, streak=0):
+        """
+        Apply a quiz result to a user's profile in a single UPDATE.
+        Counters use F-expressions and level/XP/rank are derived from the new
+        total_points in SQL, so concurrent completions can't lose updates.
+        """
+        total = F('total_points') + points
+        values = {
+            'total_correct_answers': F('total_correct_answers') + correct,
+            'total_wrong_answers': F('total_wrong_answers') + wrong,
+            'updated_at': timezone.now(),
+        }
+        if completed:
+            values['total_quizzes_completed'] = F('total_quizzes_completed') + 1
+            values['longest_streak'] = Greatest('longest_streak', Value(streak))
+        if points:
+            # SET expressions read the row as it was before the update, so
+            # "new total >= threshold" is "total_points >= threshold - points"
+            values.update(
+                total_points=total,
+                current_level=_by_new_level(points, range(1, len(LEVEL_THRESHOLDS) + 1)),
+                xp=total - _by_new_level(points, LEVEL_THRESHOLDS),
+                xp_to_next_level=_by_new_level(points, LEVEL_STEPS),
+                rank=Case(
+                    *[When(total_points__gte=LEVEL_THRESHOLDS[level - 1] - points, then=Value(rank))
+                      for level, rank in RANK_LEVELS],
+                    default=Value(RANK_LEVELS[-1][1]),
+                ),
+            )
+
+        updated = cls.objects.filter(user_id=user_id).update(**values)
+        if not updated:
+            cls.objects.get_or_create(user_id=user_id)
+            updated = cls.objects.filter(user_id=user_id).update(**values)
+        return updated
+
+
+def _build_level_table(first_step=500, growth=1.2, max_points=2 ** 31 - 1):
+    """
+    LEVEL_THRESHOLDS[i] is the total XP needed to reach level i + 1 and
+    LEVEL_STEPS[i] the XP from level i + 1 to the next (500, then x1.2).
+    """
+    thresholds, steps = [0], []
+    step = first_step
+    while thresholds[-1] + step <= max_points:
+        steps.append(step)
+        thresholds.append(thresholds[-1] + step)
+        step = int(step * growth)
+    steps.append(step)
+    return thresholds, steps
+
+
+LEVEL_THRESHOLDS, LEVEL_STEPS = _build_level_table()
+
+# (minimum level, rank), highest first
+RANK_LEVELS = [
+    (50, 'legal_legend'),
+    (30, 'justice_seeker'),
+    (20, 'statute_sage'),
+    (12, 'case_analyst'),
+    (7, 'legal_explorer'),
+    (3, 'law_apprentice'),
+    (1, 'rookie_scholar'),
+]
+
+
+def level_for_points(total_points):
+    """Return (level, xp, xp_to_next_level) for a total XP amount"""
+    level = bisect.bisect_right(LEVEL_THRESHOLDS, total_points)
+    return level, total_points - LEVEL_THRESHOLDS[level - 1], LEVEL_STEPS[level - 1]
+
+
+def rank_for_level(level):
+    return next(rank for min_level, rank in RANK_LEVELS if level >= min_level)
+
+
+def _by_new_level(points, table):
+    """SQL CASE picking table[level - 1] for the level reached after adding points"""
+    return Case(
+        *[When(total_points__gte=threshold - points, then=Value(table[level - 1]))
+          for level, threshold in reversed(list(enumerate(LEVEL_THRESHOLDS, start=1)))],
+        default=Value(table[0]),
+    )
 
 
 class TopicQuizAttempt(models.Model):
@@ -102,6 +172,11 @@ class TopicQuizAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_quiz_attempts')
     # Dynamic topic slugs from PracticeQuestionTopic
     topic = models.CharField(max_length=200, db_index=True)
+    # Slugs are unique per course only; the topic this attempt counts toward
+    # in UserTopicMastery, resolved once at start (see mastery.topic_id_for_slug)
+    practice_topic = models.ForeignKey(
+        PracticeQuestionTopic, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     
     # Game state
@@ -109,13 +184,16 @@ class TopicQuizAttempt(models.Model):
     points_earned = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     current_streak = models.IntegerField(default=0)  # Current correct answer streak
     
-    # Snapshot of questions for this attempt (Performance optimization)
+    # Legacy snapshot of questions for this attempt (collapsed into question_versions)
     # Stores list of dicts: [{id, text, options, correct_answer, explanation, ...}]
     questions_snapshot = models.JSONField(null=True, blank=True)
     
     # Cache of correct answers {str(id): 'A'} for instant checking
     correct_answers = models.JSONField(default=dict)
     
+    # [[question_pk, version], ...] into PracticeQuestionVersion (replaces questions_snapshot)
+    question_versions = models.JSONField(default=list, blank=True)
+    
     # Progress
     current_question_index = models.IntegerField(default=0)  # 0-indexed position
     total_questions = models.IntegerField(default=5)
@@ -136,7 +214,12 @@ class TopicQuizAttempt(models.Model):
     class Meta:
         ordering = ['-started_at']
         indexes = [
-            models.Index(fields=['user', '-started_at']),
+            # Covers the recent-activity feed (index-only scan on PostgreSQL)
+            models.Index(
+                fields=['user', '-started_at'],
+                include=['topic', 'status', 'points_earned'],
+                name='topic_attempt_user_started',
+            ),
             models.Index(fields=['topic', 'status']),
         ]
         verbose_name = "Topic Quiz Attempt"
@@ -214,3 +297,57 @@ class TopicQuizAnswer(models.Model):
     def __str__(self):
         status = "✓" if self.is_correct else "✗"
         return f"Attempt {self.attempt.id} - Q{self.question_id} {status}"
+
+
+class UserAreaMastery(models.Model):
+    """
+    Per-user, per-area mastery index for practice questions.
+    Updated incrementally on every topic quiz answer (see quiz/mastery.py)
+    and used to bias quiz sampling toward weak areas and unseen questions.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='area_mastery')
+    area = models.ForeignKey(PracticeQuestionArea, on_delete=models.CASCADE, related_name='user_mastery')
+    answered = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    # Exponentially weighted share of correct answers (recent answers count more)
+    mastery = models.FloatField(default=0.5)
+    seen_question_ids = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'area']
+        verbose_name = "User Area Mastery"
+        verbose_name_plural = "User Area Mastery"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.area} ({self.mastery:.2f})"
+
+
+class UserTopicMastery(models.Model):
+    """
+    Per-user, per-topic practice rollup: quizzes started and completed,
+    answers, best score and last activity. Updated incrementally as quizzes
+    start, answers are submitted and quizzes finish (see quiz/mastery.py),
+    so course pages read one row per topic instead of aggregating attempts.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_mastery')
+    topic = models.ForeignKey(PracticeQuestionTopic, on_delete=models.CASCADE, related_name='user_mastery')
+    quizzes_started = models.IntegerField(default=0)
+    quizzes_completed = models.IntegerField(default=0)
+    answered = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    # Highest percentage of questions answered correctly in a completed quiz
+    best_score = models.IntegerField(default=0)
+    last_activity_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['user', 'topic']
+        verbose_name = "User Topic Mastery"
+        verbose_name_plural = "User Topic Mastery"
+
+    def __str__(self):
+        return f"{self.user_id} - {self.topic_id}"
+
+    @property
+    def accuracy(self):
+        return round((self.correct / self.answered) * 100) if self.answered else 0
@@ -5,10 +5,20 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db.models import Count, Max
 from django.db import transaction
+from django.contrib.auth.models import User
 import random
 import logging
 
 from .practice_question_models import PracticeQuestion, PracticeQuestionTopic
+from . import leaderboard, mastery, resume
+from .activity import record_activity
+from .answer_keys import get_topic_answer_key
+from .question_pool import get_topic_pool, get_topic_pool_by_area, get_pool_question, client_payload
+from .question_versions import resolve_version
+from .quiz_state import (
+    AttemptBusy, attempt_lock, get_state, init_state, apply_answer,
+    record_answer, update_flags, complete_attempt,
+)
 from .topic_models import UserGameProfile, TopicQuizAttempt, TopicQuizAnswer
 from .topic_serializers import (
     UserGameProfileSerializer,
@@ -63,6 +73,66 @@ class UserGameProfileViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
+class LeaderboardViewSet(viewsets.ViewSet):
+    """
+    Topic quiz leaderboards (maintained incrementally, see quiz/leaderboard.py).
+    
+    Endpoints:
+    - GET /leaderboard/?board=global|weekly|topic&topic=<slug>&page=1&page_size=20 - Top-N page
+    - GET /leaderboard/me/?board=...&topic=<slug> - Current user's rank
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_PAGE_SIZE = 100
+
+    def _board(self, request):
+        board = request.query_params.get('board', leaderboard.BOARD_GLOBAL)
+        topic = request.query_params.get('topic')
+        if board not in (leaderboard.BOARD_GLOBAL, leaderboard.BOARD_WEEKLY, leaderboard.BOARD_TOPIC):
+            return None, Response({'error': 'Invalid board'}, status=status.HTTP_400_BAD_REQUEST)
+        if board == leaderboard.BOARD_TOPIC and not topic:
+            return None, Response({'error': 'topic is required for the topic board'}, status=status.HTTP_400_BAD_REQUEST)
+        return leaderboard.board_name(board, topic), None
+
+    def list(self, request):
+        """Get a page of a leaderboard"""
+        name, error = self._board(request)
+        if error:
+            return error
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', 20)), 1), self.MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        total, rows = leaderboard.get_page(name, page, page_size)
+        usernames = dict(User.objects.filter(id__in=[user_id for _, user_id, _ in rows]).values_list('id', 'username'))
+        return Response({
+            'board': name,
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'results': [
+                {
+                    'rank': rank,
+                    'user_id': user_id,
+                    'username': usernames.get(user_id, ''),
+                    'score': score,
+                    'is_me': user_id == request.user.id,
+                }
+                for rank, user_id, score in rows
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        """Get the current user's rank on a leaderboard"""
+        name, error = self._board(request)
+        if error:
+            return error
+        rank, score, total = leaderboard.get_user_rank(name, request.user.id)
+        return Response({'board': name, 'rank': rank, 'score': score, 'total': total})
+
+
 class TopicViewSet(viewsets.ViewSet):
     """
     ViewSet for topic listing and questions.
@@ -85,9 +155,7 @@ class TopicViewSet(viewsets.ViewSet):
         # The user view seems to be flat list of topics.
         # Let's list ALL topics found in PracticeQuestionTopic
         
-        topics_qs = PracticeQuestionTopic.objects.annotate(
-            total_questions=Count('areas__questions')
-        ).filter(total_questions__gt=0)
+        topics_qs = PracticeQuestionTopic.objects.filter(question_count__gt=0)
         
         # Get user's best scores per topic (using slug as key)
         user_best_scores = TopicQuizAttempt.objects.filter(
@@ -112,7 +180,7 @@ class TopicViewSet(viewsets.ViewSet):
             topic_display = topic_obj.name
             
             user_data = user_scores_map.get(topic_key, {'best_score': None, 'attempts': 0})
-            question_count = topic_obj.total_questions
+            question_count = topic_obj.question_count
             
             # Calculate best percentage (assuming 5 questions, 100 points each = 500 max)
             best_percentage = None
@@ -164,297 +232,200 @@ class TopicQuizAttemptViewSet(viewsets.ModelViewSet):
         except (ValueError, TypeError):
             num_questions = 5
         
-        # Validate topic exists
-        if not PracticeQuestionTopic.objects.filter(slug=topic_slug).exists():
-             return Response(
-                {'error': f'Invalid topic: {topic_slug}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Get questions for this topic
-        questions = list(PracticeQuestion.objects.filter(area__topic__slug=topic_slug).values_list('id', flat=True))
+        # Pre-serialized question pool for this topic (worker LRU / cache)
+        pool = get_topic_pool(topic_slug)
         
-        if not questions:
+        if not pool:
+            # Validate topic exists
+            if not PracticeQuestionTopic.objects.filter(slug=topic_slug).exists():
+                return Response(
+                    {'error': f'Invalid topic: {topic_slug}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response(
                 {'error': f'No questions available for topic: {topic_slug}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Limit and randomize questions
-        num_questions = min(num_questions, len(questions), 10)  # Max 10 per quiz
-        selected_questions = random.sample(questions, num_questions)
+        # Limit and sample questions (in memory), biased toward the user's
+        # weak areas and unseen questions
+        num_questions = min(num_questions, len(pool), 10)  # Max 10 per quiz
+        pool_by_area = get_topic_pool_by_area(topic_slug)
+        snapshot = mastery.weighted_sample(
+            pool_by_area, mastery.load_mastery(request.user.id, pool_by_area), num_questions
+        )
         
         # Ensure user has a game profile
         UserGameProfile.objects.get_or_create(user=request.user)
         
-        # Create the attempt
-        attempt = TopicQuizAttempt.objects.create(
+        # Create the attempt with its question versions in a single insert
+        attempt = TopicQuizAttempt(
             user=request.user,
             topic=topic_slug, # Now storing slug
-            total_questions=num_questions,
+            practice_topic_id=mastery.topic_id_for_slug(topic_slug),
+            total_questions=len(snapshot),
             lives_remaining=3,
+            question_versions=[[q['id'], q['version']] for q in snapshot],
+            correct_answers={str(q['id']): q['correct_answer'] for q in snapshot},
         )
-        
-        # Snapshot questions for performance
-        snapshot = []
-        for q_id in selected_questions:
-            try:
-                q = PracticeQuestion.objects.get(id=q_id)
-                snapshot.append({
-                    'id': q.id,
-                    'question_id': q.question_id,
-                    'text': q.text,
-                    'difficulty': q.difficulty,
-                    'options': q.options,
-                    'correct_answer': q.correct_answer,
-                    'explanation': q.explanation
-                })
-            except PracticeQuestion.DoesNotExist:
-                continue
-                
-        attempt.questions_snapshot = snapshot
-        attempt.correct_answers = {str(q['id']): q['correct_answer'] for q in snapshot} # Populate cache
         attempt.set_question_id_list([q['id'] for q in snapshot])
-        attempt.total_questions = len(snapshot) # Adjust if any missing
         attempt.save()
+        init_state(attempt)
+        record_activity(request.user.id, attempt.started_at, quizzes_started=1)
+        if attempt.practice_topic_id:
+            mastery.record_topic(request.user.id, attempt.practice_topic_id, attempt.started_at, quizzes_started=1)
+        resume.record_quiz(request.user.id, attempt.id, 0, attempt.total_questions, attempt.started_at)
         
         logger.info(f"User {request.user.username} started topic quiz: {topic_slug} with {num_questions} questions")
         
         serializer = self.get_serializer(attempt)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def _question_payload(self, state, question_pk):
+        """Full payload for a question of this attempt (topic pool, version store, then DB)"""
+        version = state.get('versions', {}).get(question_pk)
+        question_data = get_pool_question(state['topic'], question_pk)
+        if question_data and (version is None or question_data.get('version') == version):
+            return question_data
+        
+        # Question edited since the quiz started - resolve the version the attempt was given
+        if version is not None:
+            question_data = resolve_version(question_pk, version)
+            if question_data:
+                return question_data
+        
+        # Legacy attempts still carrying a snapshot
+        snapshot = TopicQuizAttempt.objects.filter(pk=state['attempt_id']).values_list(
+            'questions_snapshot', flat=True
+        ).first() or []
+        question_data = next((q for q in snapshot if q['id'] == question_pk), None)
+        if question_data:
+            return question_data
+        
+        try:
+            question = PracticeQuestion.objects.get(id=question_pk)
+        except PracticeQuestion.DoesNotExist:
+            logger.error(f"Attempt {state['attempt_id']}: Question ID {question_pk} not found in DB! indices={state['ids']}")
+            return None
+        return {
+            **TopicQuizQuestionSerializer(question).data,
+            'correct_answer': question.correct_answer,
+            'explanation': question.explanation,
+        }
+
     @action(detail=True, methods=['get'])
     def current_question(self, request, pk=None):
-        """Get the current question for an in-progress quiz"""
-        try:
-            attempt = self.get_queryset().get(pk=pk)
-        except TopicQuizAttempt.DoesNotExist:
+        """Get the current question for an in-progress quiz (served from live state)"""
+        state = get_state(int(pk), request.user.id)
+        if state is None:
             return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        if attempt.status != 'in_progress':
+        if state['status'] != 'in_progress':
             return Response(
-                {'error': 'Quiz is not in progress', 'status': attempt.status},
+                {'error': 'Quiz is not in progress', 'status': state['status']},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        question_ids = attempt.get_question_id_list()
-        if attempt.current_question_index >= len(question_ids):
+        if state['index'] >= len(state['ids']):
             return Response({'error': 'No more questions'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Try to use snapshot if available
-        if attempt.questions_snapshot:
-            try:
-                # Find question in snapshot
-                current_q_id = attempt.get_question_id_list()[attempt.current_question_index]
-                question_data = next((q for q in attempt.questions_snapshot if q['id'] == current_q_id), None)
-                
-                if question_data:
-                    # Filter out correct answer for client
-                    client_q_data = {
-                        'id': question_data['id'],
-                        'question_id': question_data['question_id'],
-                        'text': question_data['text'],
-                        'difficulty': question_data['difficulty'],
-                        'options': question_data['options']
-                    }
-                    
-                    return Response({
-                        'question': client_q_data,
-                        'question_number': attempt.current_question_index + 1,
-                        'total_questions': attempt.total_questions,
-                        'lives_remaining': attempt.lives_remaining,
-                        'points_earned': attempt.points_earned,
-                        'current_streak': attempt.current_streak,
-                    })
-            except Exception as e:
-                logger.error(f"Error using snapshot for attempt {attempt.id}: {e}")
-                # Fallback to DB query below
-        
-        current_q_id = question_ids[attempt.current_question_index]
-        logger.info(f"Attempt {attempt.id}: Fetching question {attempt.current_question_index + 1}/{len(question_ids)} (ID: {current_q_id})")
-        
-        try:
-            question = PracticeQuestion.objects.get(id=current_q_id)
-        except PracticeQuestion.DoesNotExist:
-             logger.error(f"Attempt {attempt.id}: Question ID {current_q_id} not found in DB! indices={question_ids}")
-             # Check if it exists in Question model? No, migrated.
-             return Response({'error': f'Question record missing (ID: {current_q_id})'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        current_q_id = state['ids'][state['index']]
+        question_data = self._question_payload(state, current_q_id)
+        if not question_data:
+            return Response({'error': f'Question record missing (ID: {current_q_id})'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        serializer = TopicQuizQuestionSerializer(question)
         return Response({
-            'question': serializer.data,
-            'question_number': attempt.current_question_index + 1,
-            'total_questions': attempt.total_questions,
-            'lives_remaining': attempt.lives_remaining,
-            'points_earned': attempt.points_earned,
-            'current_streak': attempt.current_streak,
+            'question': client_payload(question_data),
+            'question_number': state['index'] + 1,
+            'total_questions': state['total'],
+            'lives_remaining': state['lives'],
+            'points_earned': state['points'],
+            'current_streak': state['streak'],
         })
 
     @action(detail=True, methods=['post'])
-    @transaction.atomic
     def submit_answer(self, request, pk=None):
         """Submit an answer to the current question"""
-        try:
-            attempt = self.get_queryset().select_for_update().get(pk=pk)
-        except TopicQuizAttempt.DoesNotExist:
-            return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        if attempt.status != 'in_progress':
-            return Response(
-                {'error': 'Quiz is not in progress', 'status': attempt.status},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         # Validate request
         serializer = SubmitAnswerRequestSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        question_id = serializer.validated_data['question_id'] # This is NOT ID, it's question_id from model? Wait.
-        # Wait, PracticeQuestion has 'id' (pk) and 'question_id' (legacy field).
-        # TopicQuizAttempt stores PKs in question_ids list.
-        # The frontend sends back what it got.
-        # TopicQuizQuestionSerializer sends 'id' as 'id' and 'question_id' as 'question_id'.
-        # The frontend likely sends back 'question_id' usually referring to PK in generic terms?
-        # Let's check SubmitAnswerRequestSerializer... it expects 'question_id'.
-        # Let's assume frontend sends the PK because typically ID is used for lookup.
-        # BUT... `serializer.validated_data['question_id']` is an IntegerField.
-        # AND `TopicQuizQuestionSerializer` has `id` (pk).
-        
-        # Verify this is the current question
-        question_ids = attempt.get_question_id_list()
-        if attempt.current_question_index >= len(question_ids):
-            return Response({'error': 'No more questions'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        expected_q_pk = question_ids[attempt.current_question_index]
-        
-        # We need to trust the PK passed from client matches expected
-        if question_id != expected_q_pk: # Assuming question_id refers to PK
-             # It might be referring to the 'question_id' field.
-             # Note: logic above in current_question sends 'id' (pk) as 'id'.
-             # Frontend usually posts back ID.
-             # Let's proceed assuming PK.
-             # Check if question_id corresponds to expected PK.
-             pass
-        
         selected_answer = serializer.validated_data['selected_answer']
         time_spent = serializer.validated_data.get('time_spent_seconds', 0)
-
-        # Use snapshot if available
-        question_data = None
-        if attempt.questions_snapshot:
-            question_data = next((q for q in attempt.questions_snapshot if q['id'] == expected_q_pk), None)
-            
-        if attempt.correct_answers and str(expected_q_pk) in attempt.correct_answers:
-             correct_answer = attempt.correct_answers[str(expected_q_pk)]
-        else:
-             # Fallback to snapshot (shouldn't happen if initialized correctly)
-             if question_data:
-                correct_answer = question_data['correct_answer']
-             else:
-                # DB fallback
-                 try:
-                    q = PracticeQuestion.objects.get(id=expected_q_pk)
-                    correct_answer = q.correct_answer
-                 except PracticeQuestion.DoesNotExist:
-                     return Response({'error': 'Question broken'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Get explanation (still need textual data)
-        if question_data:
-            explanation = question_data['explanation']
-        else:
-             # Fallback
-             try:
-                question = PracticeQuestion.objects.get(id=expected_q_pk)
-                explanation = question.explanation
-             except PracticeQuestion.DoesNotExist:
-                 explanation = ""
-
-
-        # Check if already answered
-        if TopicQuizAnswer.objects.filter(attempt=attempt, question_id=expected_q_pk).exists():
-             return Response({'error': 'Question already answered'}, status=status.HTTP_400_BAD_REQUEST)
-
-        is_correct = selected_answer == correct_answer
-        
-        # Record the answer and update game state
-        points_earned = attempt.record_answer(is_correct)
-        
-        TopicQuizAnswer.objects.create(
-            attempt=attempt,
-            question_id=expected_q_pk, # Store PK
-            selected_answer=selected_answer,
-            is_correct=is_correct,
-            points_earned=points_earned,
-            time_spent_seconds=time_spent,
-        )
         
-        # If quiz completed, update user's game profile
-        if attempt.status in ['completed', 'failed']:
-            attempt.completed_at = timezone.now()
-            attempt.save()
-            
-            profile = UserGameProfile.objects.get(user=request.user)
-            profile.total_correct_answers += attempt.correct_count
-            profile.total_wrong_answers += attempt.wrong_count
-            
-            if attempt.status == 'completed':
-                profile.total_quizzes_completed += 1
-                profile.add_xp(attempt.points_earned)
+        try:
+            with attempt_lock(int(pk)):
+                state = get_state(int(pk), request.user.id)
+                if state is None:
+                    return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
                 
-                if attempt.current_streak > profile.longest_streak:
-                    profile.longest_streak = attempt.current_streak
-            
-            if attempt.status == 'completed':
-                profile.total_quizzes_completed += 1
-                profile.add_xp(attempt.points_earned)
+                if state['status'] != 'in_progress':
+                    return Response(
+                        {'error': 'Quiz is not in progress', 'status': state['status']},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
                 
-                if attempt.current_streak > profile.longest_streak:
-                    profile.longest_streak = attempt.current_streak
-            
-            profile.save()
-            
-        else:
-             # Optimize save for in-progress updates - avoid writing back huge snapshot/cache blobs
-             attempt.save(update_fields=[
-                 'points_earned', 'current_streak', 'correct_count', 'wrong_count', 
-                 'lives_remaining', 'status', 'current_question_index'
-             ])
-        
-        # Prepare next question if available
+                # The answer always applies to the current question (question_id from the
+                # client is informational; the attempt's ordered IDs are authoritative)
+                if state['index'] >= len(state['ids']):
+                    return Response({'error': 'No more questions'}, status=status.HTTP_400_BAD_REQUEST)
+                expected_q_pk = state['ids'][state['index']]
+                
+                if expected_q_pk in state['answered']:
+                    return Response({'error': 'Question already answered'}, status=status.HTTP_400_BAD_REQUEST)
+                
+                correct_answer = state['key'].get(expected_q_pk)
+                if correct_answer is None:
+                    # Shared per-topic answer key (no question query)
+                    correct_answer = get_topic_answer_key(state['topic']).get(expected_q_pk)
+                    if correct_answer is None:
+                        return Response({'error': 'Question broken'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                
+                is_correct = selected_answer == correct_answer
+                
+                # Update game state
+                points_earned = apply_answer(state, is_correct)
+                state['answered'].append(expected_q_pk)
+                answer = {
+                    'question_id': expected_q_pk, # Store PK
+                    'selected_answer': selected_answer,
+                    'is_correct': is_correct,
+                    'points_earned': points_earned,
+                    'time_spent_seconds': time_spent,
+                }
+                
+                if state['status'] in ['completed', 'failed']:
+                    # Quiz finished: flush attempt and game profile durably
+                    complete_attempt(state, answer)
+                else:
+                    # In progress: answer is written behind the response
+                    record_answer(state, answer)
+        except AttemptBusy:
+            return Response(
+                {'error': 'Another answer for this quiz is being processed'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        # Explanation and next question come from the topic pool
+        question_data = self._question_payload(state, expected_q_pk)
+        explanation = question_data['explanation'] if question_data else ""
+        
         next_question_data = None
-        if attempt.status == 'in_progress' and attempt.current_question_index < len(question_ids):
-            next_q_id = question_ids[attempt.current_question_index]
-            
-            # Use snapshot for next question
-            if attempt.questions_snapshot:
-                next_q_data = next((q for q in attempt.questions_snapshot if q['id'] == next_q_id), None)
-                if next_q_data:
-                    next_question_data = {
-                        'id': next_q_data['id'],
-                        'question_id': next_q_data['question_id'],
-                        'text': next_q_data['text'],
-                        'difficulty': next_q_data['difficulty'],
-                        'options': next_q_data['options']
-                    }
-            
-            if not next_question_data:
-                # Fallback
-                try:
-                    next_q = PracticeQuestion.objects.get(id=next_q_id)
-                    next_question_data = TopicQuizQuestionSerializer(next_q).data
-                except PracticeQuestion.DoesNotExist:
-                    pass
+        if state['status'] == 'in_progress' and state['index'] < len(state['ids']):
+            next_q_data = self._question_payload(state, state['ids'][state['index']])
+            if next_q_data:
+                next_question_data = client_payload(next_q_data)
         
         response_data = {
             'is_correct': is_correct,
             'correct_answer': correct_answer,
             'explanation': explanation,
             'points_earned': points_earned,
-            'total_points': attempt.points_earned,
-            'lives_remaining': attempt.lives_remaining,
-            'current_streak': attempt.current_streak,
-            'quiz_status': attempt.status,
+            'total_points': state['points'],
+            'lives_remaining': state['lives'],
+            'current_streak': state['streak'],
+            'quiz_status': state['status'],
             'next_question': next_question_data,
         }
         
@@ -495,46 +466,51 @@ class TopicQuizAttemptViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def use_powerup(self, request, pk=None):
         """Use a power-up (50/50 or time freeze)"""
-        try:
-            attempt = self.get_queryset().get(pk=pk)
-        except TopicQuizAttempt.DoesNotExist:
-            return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        if attempt.status != 'in_progress':
-            return Response({'error': 'Quiz is not in progress'}, status=status.HTTP_400_BAD_REQUEST)
-        
         powerup = request.data.get('powerup')
         
-        if powerup == 'fifty_fifty':
-            if attempt.fifty_fifty_used:
-                return Response({'error': '50/50 already used'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Get current question
-            question_ids = attempt.get_question_id_list()
-            current_q_id = question_ids[attempt.current_question_index]
-            try:
-                question = PracticeQuestion.objects.get(id=current_q_id)
-            except PracticeQuestion.DoesNotExist:
-                 return Response({'error': 'Question not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-            # Identify wrong options
-            wrong_options = [opt['label'] for opt in question.options if opt['label'] != question.correct_answer]
-            
-            # Pick 2 random wrong options to eliminate
-            options_to_eliminate = random.sample(wrong_options, min(2, len(wrong_options)))
-            
-            attempt.fifty_fifty_used = True
-            attempt.save()
-            
-            return Response({'eliminated_options': options_to_eliminate})
-        
-        elif powerup == 'time_freeze':
-            if attempt.time_freeze_used:
-                return Response({'error': 'Time freeze already used'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            attempt.time_freeze_used = True
-            attempt.save()
-            
-            return Response({'message': 'Time freeze activated'})
+        try:
+            with attempt_lock(int(pk)):
+                state = get_state(int(pk), request.user.id)
+                if state is None:
+                    return Response({'error': 'Attempt not found'}, status=status.HTTP_404_NOT_FOUND)
+                
+                if state['status'] != 'in_progress':
+                    return Response({'error': 'Quiz is not in progress'}, status=status.HTTP_400_BAD_REQUEST)
+                
+                if powerup == 'fifty_fifty':
+                    if state['fifty_fifty_used']:
+                        return Response({'error': '50/50 already used'}, status=status.HTTP_400_BAD_REQUEST)
+                    
+                    # Get current question
+                    current_q_id = state['ids'][state['index']]
+                    question_data = self._question_payload(state, current_q_id)
+                    if not question_data:
+                        return Response({'error': 'Question not found'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                    correct_answer = state['key'].get(current_q_id, question_data['correct_answer'])
+                    
+                    # Identify wrong options
+                    wrong_options = [opt['label'] for opt in question_data['options'] if opt['label'] != correct_answer]
+                    
+                    # Pick 2 random wrong options to eliminate
+                    options_to_eliminate = random.sample(wrong_options, min(2, len(wrong_options)))
+                    
+                    state['fifty_fifty_used'] = True
+                    update_flags(state)
+                    
+                    return Response({'eliminated_options': options_to_eliminate})
+                
+                elif powerup == 'time_freeze':
+                    if state['time_freeze_used']:
+                        return Response({'error': 'Time freeze already used'}, status=status.HTTP_400_BAD_REQUEST)
+                    
+                    state['time_freeze_used'] = True
+                    update_flags(state)
+                    
+                    return Response({'message': 'Time freeze activated'})
+        except AttemptBusy:
+            return Response(
+                {'error': 'Another request for this quiz is being processed'},
+                status=status.HTTP_409_CONFLICT
+            )
         
         return Response({'error': 'Invalid powerup'}, status=status.HTTP_400_BAD_REQUEST)
@@ -11,6 +11,7 @@ from . import video_views
 from . import my_courses_views
 from . import search_views
 from . import health_views
+from . import bootstrap_views
 from . import summary_notes_views
 from . import flashcard_views
 from . import practice_questions_views
@@ -26,6 +27,7 @@ router.register(r'reviews', views.ReviewViewSet, basename='review')
 router.register(r'topics', topic_views.TopicViewSet, basename='topic')
 router.register(r'topic-attempts', topic_views.TopicQuizAttemptViewSet, basename='topic-attempt')
 router.register(r'game-profile', topic_views.UserGameProfileViewSet, basename='game-profile')
+router.register(r'leaderboard', topic_views.LeaderboardViewSet, basename='leaderboard')
 
 # Textbook router
 router.register(r'textbooks', textbook_views.TextbookViewSet, basename='textbook')
@@ -90,6 +92,11 @@ urlpatterns = [
     
     # Health check for warm-up pings (no auth required)
     path('health/', health_views.health_check, name='health-check'),
+    path('health/cache/', health_views.cache_stats, name='health-cache-stats'),
+    path('health/queries/', health_views.query_stats, name='health-query-stats'),
+    
+    # App bootstrap: several page payloads in one round trip
+    path('bootstrap/', bootstrap_views.bootstrap, name='bootstrap'),
     
     # Billing/Subscription routes
     path('billing/status/', billing_views.SubscriptionStatusView.as_view(), name='billing-status'),
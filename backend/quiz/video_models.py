@@ -31,6 +31,9 @@ class VideoCourse(models.Model):
     thumbnail_url = models.URLField(blank=True)
     order = models.IntegerField(default=0, help_text="Display order on course listing")
     is_active = models.BooleanField(default=True)
+    # Denormalized from active videos (maintained by quiz/counters.py)
+    total_videos = models.PositiveIntegerField(default=0, editable=False)
+    total_duration_seconds = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -47,16 +50,6 @@ class VideoCourse(models.Model):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
-    @property
-    def total_videos(self):
-        return self.videos.filter(is_active=True).count()
-
-    @property
-    def total_duration_seconds(self):
-        return self.videos.filter(is_active=True).aggregate(
-            total=models.Sum('duration_seconds')
-        )['total'] or 0
-
     @property
     def total_duration_formatted(self):
         """Return duration in HH:MM format"""
@@ -153,19 +146,15 @@ class Video(models.Model):
 
     def get_next_video(self):
         """Get the next video in the course"""
-        return Video.objects.filter(
-            course=self.course,
-            order__gt=self.order,
-            is_active=True
-        ).first()
+        from .video_navigation import get_course_video_ids, get_neighbours
+        _, _, next_id = get_neighbours(get_course_video_ids(self.course_id), self.id)
+        return Video.objects.filter(pk=next_id).first() if next_id else None
 
     def get_previous_video(self):
         """Get the previous video in the course"""
-        return Video.objects.filter(
-            course=self.course,
-            order__lt=self.order,
-            is_active=True
-        ).order_by('-order').first()
+        from .video_navigation import get_course_video_ids, get_neighbours
+        _, previous_id, _ = get_neighbours(get_course_video_ids(self.course_id), self.id)
+        return Video.objects.filter(pk=previous_id).first() if previous_id else None
 
 
 class VideoProgress(models.Model):
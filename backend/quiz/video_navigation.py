@@ -0,0 +1,79 @@
+"""
+Cached per-course video ordering.
+
+Each course's active video IDs are cached as a tuple in playback order
+(order, id), so next / previous / position lookups are array operations
+instead of queries. The cache is invalidated from the Video signals in
+quiz/signals.py.
+
+"First unwatched" uses a per-user completed bitmap over that array: bit i
+is set when the i-th video is completed, and the lowest zero bit is the
+next video to watch.
+"""
+from django.core.cache import cache
+
+COURSE_VIDEOS_TIMEOUT = 60 * 60 * 24
+
+
+def _course_key(course_id):
+    return f'video_course_order_{course_id}'
+
+
+def get_course_video_ids_many(course_ids):
+    """Return {course_id: (video_id, ...)} in playback order."""
+    from .video_models import Video
+
+    course_ids = list(course_ids)
+    found = cache.get_many([_course_key(course_id) for course_id in course_ids])
+    result = {
+        course_id: found[_course_key(course_id)]
+        for course_id in course_ids if _course_key(course_id) in found
+    }
+    missing = [course_id for course_id in course_ids if course_id not in result]
+    if missing:
+        loaded = {course_id: [] for course_id in missing}
+        for video_id, course_id in Video.objects.filter(
+            course_id__in=missing, is_active=True
+        ).order_by('course_id', 'order', 'id').values_list('id', 'course_id'):
+            loaded[course_id].append(video_id)
+        loaded = {course_id: tuple(video_ids) for course_id, video_ids in loaded.items()}
+        cache.set_many({_course_key(course_id): video_ids for course_id, video_ids in loaded.items()}, COURSE_VIDEOS_TIMEOUT)
+        result.update(loaded)
+    return result
+
+
+def get_course_video_ids(course_id):
+    return get_course_video_ids_many([course_id])[course_id]
+
+
+def invalidate_course_videos(course_ids):
+    cache.delete_many([_course_key(course_id) for course_id in course_ids if course_id is not None])
+
+
+def get_neighbours(video_ids, video_id):
+    """Return (position, previous_id, next_id); position is 1-based, or None if not in the course."""
+    try:
+        index = video_ids.index(video_id)
+    except ValueError:
+        return None, None, None
+    previous_id = video_ids[index - 1] if index > 0 else None
+    next_id = video_ids[index + 1] if index + 1 < len(video_ids) else None
+    return index + 1, previous_id, next_id
+
+
+def completed_bitmap(video_ids, completed_ids):
+    """Bitmap with bit i set when video_ids[i] is in completed_ids."""
+    bitmap = 0
+    for index, video_id in enumerate(video_ids):
+        if video_id in completed_ids:
+            bitmap |= 1 << index
+    return bitmap
+
+
+def first_unwatched(video_ids, bitmap):
+    """First video whose bit is clear, or the first video if all are completed."""
+    if not video_ids:
+        return None
+    # ~bitmap & (bitmap + 1) isolates the lowest zero bit
+    index = (~bitmap & (bitmap + 1)).bit_length() - 1
+    return video_ids[index] if index < len(video_ids) else video_ids[0]
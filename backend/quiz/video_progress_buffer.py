@@ -0,0 +1,301 @@
+"""
+Coalescing buffer for video watch heartbeats.
+
+The player reports its position every few seconds. Instead of writing
+VideoProgress and CourseProgress on every heartbeat, the furthest
+position per (user, video) is kept in the cache and flushed to the DB in
+bulk upserts at most once per VIDEO_PROGRESS_FLUSH_SECONDS, so DB writes
+scale with the number of active viewers rather than playback time.
+
+The first heartbeat for a (user, video) seeds the entry from the DB, so
+positions never move backwards and completion status is known without a
+query on later heartbeats.
+
+Flushes run off the request path, on a daemon thread that each worker
+starts with its first heartbeat and that wakes every
+VIDEO_PROGRESS_FLUSH_SECONDS. Reads of VideoProgress (and the activity
+rollup and resume pointer fed by the flush) lag by at most about one
+interval. Gunicorn also flushes when a worker exits (gunicorn_config.py),
+and the flush_video_progress command flushes on demand. With a
+per-process cache (LocMemCache) each worker only sees its own buffer, and
+positions buffered since the last flush are lost if the worker is killed
+or the cache culls them. A flush writes in one transaction; if it fails,
+its pairs go back into the dirty sets for the next flush.
+
+Each flush also adds the newly watched seconds since the previous flush
+to the users' daily activity (quiz/activity.py) and moves each user's
+resume pointer to the video they watched last (quiz/resume.py).
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ENTRY_TIMEOUT = 60 * 60 * 24
+VIDEO_META_TIMEOUT = 60 * 60
+DIRTY_SHARDS = 16
+MAX_HEARTBEATS = 50
+LOCK_TIMEOUT = 5
+LOCK_WAIT_SECONDS = 2
+FLUSH_LOCK_KEY = 'video_hb_flush_lock'
+
+
+def _flush_interval():
+    return getattr(settings, 'VIDEO_PROGRESS_FLUSH_SECONDS', 30)
+
+
+def _entry_key(user_id, video_id):
+    return f'video_hb_{user_id}_{video_id}'
+
+
+def _flushed_key(user_id, video_id):
+    # Position last written to the DB (only touched by flush, under its lock)
+    return f'video_hb_flushed_{user_id}_{video_id}'
+
+
+def _dirty_key(shard):
+    return f'video_hb_dirty_{shard}'
+
+
+def _meta_key(video_id):
+    return f'video_meta_{video_id}'
+
+
+def get_video_meta(video_ids):
+    """Return {video_id: (course_id, duration_seconds)} for active videos."""
+    from .video_models import Video
+
+    found = cache.get_many([_meta_key(video_id) for video_id in video_ids])
+    meta = {video_id: found[_meta_key(video_id)] for video_id in video_ids if _meta_key(video_id) in found}
+    missing = [video_id for video_id in video_ids if video_id not in meta]
+    if missing:
+        rows = Video.objects.filter(id__in=missing, is_active=True).values_list('id', 'course_id', 'duration_seconds')
+        loaded = {video_id: (course_id, duration) for video_id, course_id, duration in rows}
+        cache.set_many({_meta_key(video_id): value for video_id, value in loaded.items()}, VIDEO_META_TIMEOUT)
+        meta.update(loaded)
+    return meta
+
+
+def _lock(key):
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while not cache.add(key, 1, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _mark_dirty(user_id, pairs):
+    shard = user_id % DIRTY_SHARDS
+    lock_key = f'{_dirty_key(shard)}_lock'
+    if not _lock(lock_key):
+        # Entries stay in the cache; they'll be picked up by the next heartbeat
+        logger.warning(f"[VIDEO_PROGRESS] Could not mark {len(pairs)} entries dirty for user {user_id}")
+        return
+    try:
+        dirty = cache.get(_dirty_key(shard)) or set()
+        dirty.update(pairs)
+        cache.set(_dirty_key(shard), dirty, ENTRY_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+
+
+def record_heartbeats(user_id, heartbeats):
+    """
+    Buffer [(video_id, watched_seconds), ...] for a user.
+    Returns {video_id: entry} with entry = {'watched', 'completed', 'course_id', 'duration', 'at'};
+    unknown videos are skipped.
+    """
+    from .video_models import VideoProgress
+
+    furthest = {}
+    for video_id, watched in heartbeats:
+        furthest[video_id] = max(watched, furthest.get(video_id, 0))
+    meta = get_video_meta(list(furthest))
+    furthest = {video_id: watched for video_id, watched in furthest.items() if video_id in meta}
+    if not furthest:
+        return {}
+
+    keys = {video_id: _entry_key(user_id, video_id) for video_id in furthest}
+    entries = cache.get_many(list(keys.values()))
+    unseeded = [video_id for video_id, key in keys.items() if key not in entries]
+    seeds = {}
+    if unseeded:
+        seeds = {
+            video_id: (watched, completed)
+            for video_id, watched, completed in VideoProgress.objects.filter(
+                user_id=user_id, video_id__in=unseeded
+            ).values_list('video_id', 'watched_seconds', 'is_completed')
+        }
+
+    now = time.time()
+    updated, result = {}, {}
+    for position, (video_id, watched) in enumerate(furthest.items()):
+        key = keys[video_id]
+        entry = entries.get(key)
+        if entry is None:
+            seeded_watched, completed = seeds.get(video_id, (0, False))
+            entry = {'watched': seeded_watched, 'completed': completed, 'seed': seeded_watched}
+        course_id, duration = meta[video_id]
+        entry = {
+            **entry,
+            'watched': max(entry['watched'], watched),
+            'course_id': course_id,
+            'duration': duration,
+            # Later heartbeats in a batch count as more recent
+            'at': now + position * 1e-6,
+        }
+        updated[key] = entry
+        result[video_id] = entry
+    cache.set_many(updated, ENTRY_TIMEOUT)
+    _mark_dirty(user_id, [(user_id, video_id) for video_id in furthest])
+
+    _ensure_flusher()
+    return result
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _ensure_flusher():
+    """Start this worker's background flush thread if it isn't running."""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name='video-progress-flush', daemon=True)
+            _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_flush_interval())
+        try:
+            flush()
+        except Exception:
+            logger.exception("[VIDEO_PROGRESS] Background flush failed")
+        finally:
+            # The thread owns its DB connection
+            connection.close()
+
+
+def mark_completed(user_id, video_id, duration):
+    """Keep a buffered entry in step with a completion written directly to the DB."""
+    key = _entry_key(user_id, video_id)
+    entry = cache.get(key)
+    if entry is not None:
+        cache.set(key, {**entry, 'watched': max(entry['watched'], duration), 'completed': True}, ENTRY_TIMEOUT)
+
+
+def flush():
+    """Write all buffered positions to the DB in bulk upserts. Returns the number of rows written."""
+    from .activity import record_activity
+    from .resume import record_videos
+    from .video_models import CourseProgress, VideoProgress
+
+    # Held for about an interval (a large flush outlives LOCK_TIMEOUT) and
+    # released only by its owner, so two workers never flush the same pairs
+    owner = uuid.uuid4().hex
+    if not cache.add(FLUSH_LOCK_KEY, owner, _flush_interval()):
+        return 0
+    try:
+        pairs = set()
+        for shard in range(DIRTY_SHARDS):
+            lock_key = f'{_dirty_key(shard)}_lock'
+            if not _lock(lock_key):
+                continue
+            try:
+                pairs.update(cache.get(_dirty_key(shard)) or ())
+                cache.delete(_dirty_key(shard))
+            finally:
+                cache.delete(lock_key)
+        if not pairs:
+            return 0
+
+        entries = cache.get_many([_entry_key(user_id, video_id) for user_id, video_id in pairs])
+        flushed = cache.get_many([_flushed_key(user_id, video_id) for user_id, video_id in pairs])
+        now = timezone.now()
+        video_rows = []
+        # (user_id, course_id) -> (heartbeat time, video_id) of the latest heartbeat
+        last_videos = {}
+        # user_id -> (heartbeat time, course_id, video_id, completed) of the user's latest heartbeat
+        resume_videos = {}
+        # user_id -> seconds watched since the previous flush
+        watched_by_user = {}
+        watermarks = {}
+        for user_id, video_id in pairs:
+            entry = entries.get(_entry_key(user_id, video_id))
+            if entry is None:
+                continue
+            previous = flushed.get(_flushed_key(user_id, video_id), entry.get('seed', entry['watched']))
+            watched_by_user[user_id] = watched_by_user.get(user_id, 0) + max(0, entry['watched'] - previous)
+            watermarks[_flushed_key(user_id, video_id)] = entry['watched']
+            video_rows.append(VideoProgress(
+                user_id=user_id,
+                video_id=video_id,
+                watched_seconds=entry['watched'],
+                is_completed=entry['completed'],
+                last_watched_at=now,
+            ))
+            course_key = (user_id, entry['course_id'])
+            if course_key not in last_videos or entry['at'] > last_videos[course_key][0]:
+                last_videos[course_key] = (entry['at'], video_id)
+            if user_id not in resume_videos or entry['at'] > resume_videos[user_id][0]:
+                resume_videos[user_id] = (entry['at'], entry['course_id'], video_id, entry['completed'])
+
+        try:
+            with transaction.atomic():
+                VideoProgress.objects.bulk_create(
+                    video_rows,
+                    update_conflicts=True,
+                    unique_fields=['user', 'video'],
+                    update_fields=['watched_seconds', 'last_watched_at'],
+                    batch_size=500,
+                )
+                CourseProgress.objects.bulk_create(
+                    [
+                        CourseProgress(user_id=user_id, course_id=course_id, last_video_id=video_id)
+                        for (user_id, course_id), (_, video_id) in last_videos.items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['user', 'course'],
+                    update_fields=['last_video', 'last_watched_at'],
+                    batch_size=500,
+                )
+                record_videos(
+                    {
+                        user_id: (course_id, video_id, completed)
+                        for user_id, (_, course_id, video_id, completed) in resume_videos.items()
+                    },
+                    now,
+                )
+                for user_id, seconds in watched_by_user.items():
+                    if seconds:
+                        record_activity(user_id, now, video_seconds=seconds)
+        except Exception:
+            # Nothing was written: keep the pairs dirty for the next flush
+            _restore_dirty(pairs)
+            raise
+        cache.set_many(watermarks, ENTRY_TIMEOUT)
+        logger.debug(f"[VIDEO_PROGRESS] Flushed {len(video_rows)} video positions")
+        return len(video_rows)
+    finally:
+        if cache.get(FLUSH_LOCK_KEY) == owner:
+            cache.delete(FLUSH_LOCK_KEY)
+
+
+def _restore_dirty(pairs):
+    by_user = {}
+    for user_id, video_id in pairs:
+        by_user.setdefault(user_id, []).append((user_id, video_id))
+    for user_id, user_pairs in by_user.items():
+        _mark_dirty(user_id, user_pairs)
@@ -11,7 +11,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import serializers
 
+from .cache_tags import CATALOG_VIDEOS, get_or_set
 from .video_models import VideoCourse, Video, VideoProgress, CourseProgress
+from .video_progress_buffer import MAX_HEARTBEATS, mark_completed, record_heartbeats
+from .activity import record_activity
+from .resume import record_videos
+from .video_navigation import (
+    completed_bitmap, first_unwatched, get_course_video_ids, get_course_video_ids_many, get_neighbours,
+)
 
 
 # ========== Serializers ==========
@@ -94,40 +101,39 @@ class VideoCourseListSerializer(serializers.ModelSerializer):
             'first_video_id', 'next_video_id'
         ]
 
+    def _completed_ids(self, obj):
+        """Completed video IDs for this course, loaded once per request for all courses"""
+        if '_completed_ids' not in self.context:
+            completed = {}
+            request = self.context.get('request')
+            if request and request.user.is_authenticated:
+                for video_id, course_id in VideoProgress.objects.filter(
+                    user=request.user, is_completed=True
+                ).values_list('video_id', 'video__course_id'):
+                    completed.setdefault(course_id, set()).add(video_id)
+            self.context['_completed_ids'] = completed
+        return self.context['_completed_ids'].get(obj.id, set())
+
+    def _video_ids(self, obj):
+        """Ordered video IDs for this course, loaded once per request for all courses"""
+        if '_course_video_ids' not in self.context:
+            instances = self.parent.instance if self.parent is not None else [obj]
+            self.context['_course_video_ids'] = get_course_video_ids_many(course.id for course in instances)
+        video_ids = self.context['_course_video_ids'].get(obj.id)
+        return video_ids if video_ids is not None else get_course_video_ids(obj.id)
+
     def get_videos_completed(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return VideoProgress.objects.filter(
-                user=request.user,
-                video__course=obj,
-                is_completed=True
-            ).count()
-        return 0
+        return len(self._completed_ids(obj))
 
     def get_first_video_id(self, obj):
         """Get ID of first video in course"""
-        first_video = obj.videos.filter(is_active=True).order_by('order').first()
-        return first_video.id if first_video else None
+        video_ids = self._video_ids(obj)
+        return video_ids[0] if video_ids else None
 
     def get_next_video_id(self, obj):
         """Get ID of next unwatched video, or first video if all completed"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            # Get IDs of completed videos
-            completed_ids = set(VideoProgress.objects.filter(
-                user=request.user,
-                video__course=obj,
-                is_completed=True
-            ).values_list('video_id', flat=True))
-            
-            # Find first unwatched video
-            for video in obj.videos.filter(is_active=True).order_by('order'):
-                if video.id not in completed_ids:
-                    return video.id
-        
-        # Return first video if all completed or not authenticated
-        first_video = obj.videos.filter(is_active=True).order_by('order').first()
-        return first_video.id if first_video else None
+        video_ids = self._video_ids(obj)
+        return first_unwatched(video_ids, completed_bitmap(video_ids, self._completed_ids(obj)))
 
     def get_progress_percentage(self, obj):
         total = obj.total_videos
@@ -234,33 +240,36 @@ class VideoDetailSerializer(serializers.ModelSerializer):
         progress = self._get_progress(obj)
         return progress.progress_percentage if progress else 0
 
+    def _navigation(self, obj):
+        """(position, previous_id, next_id, total) from the cached course video order"""
+        if not hasattr(obj, '_navigation'):
+            video_ids = get_course_video_ids(obj.course_id)
+            position, previous_id, next_id = get_neighbours(video_ids, obj.id)
+            obj._navigation = (position or 1, previous_id, next_id, len(video_ids))
+        return obj._navigation
+
     def get_next_video_id(self, obj):
-        # Use cached nav data if available
-        if hasattr(obj, '_next_video_id'):
-            return obj._next_video_id
-        next_video = obj.get_next_video()
-        return next_video.id if next_video else None
+        return self._navigation(obj)[2]
 
     def get_previous_video_id(self, obj):
-        # Use cached nav data if available
-        if hasattr(obj, '_previous_video_id'):
-            return obj._previous_video_id
-        prev_video = obj.get_previous_video()
-        return prev_video.id if prev_video else None
+        return self._navigation(obj)[1]
 
     def get_video_number(self, obj):
-        if hasattr(obj, '_video_number'):
-            return obj._video_number
-        return Video.objects.filter(
-            course=obj.course,
-            order__lt=obj.order,
-            is_active=True
-        ).count() + 1
+        return self._navigation(obj)[0]
 
     def get_total_course_videos(self, obj):
-        if hasattr(obj, '_total_course_videos'):
-            return obj._total_course_videos
-        return obj.course.total_videos
+        return self._navigation(obj)[3]
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    """A single watch position report from the player"""
+    video_id = serializers.IntegerField()
+    watched_seconds = serializers.IntegerField(min_value=0)
+
+
+class HeartbeatBatchSerializer(serializers.Serializer):
+    """Several heartbeats sent together"""
+    heartbeats = HeartbeatSerializer(many=True, allow_empty=False, max_length=MAX_HEARTBEATS)
 
 
 # ========== ViewSets ==========
@@ -288,10 +297,12 @@ class VideoCourseViewSet(viewsets.ReadOnlyModelViewSet):
         return VideoCourseListSerializer
 
     def get_queryset(self):
-        # Model has total_videos as a property, so just prefetch videos
-        return VideoCourse.objects.filter(is_active=True).prefetch_related(
-            'videos'
-        ).order_by('order', 'title')
+        # total_videos is a stored counter and video order comes from the cache
+        # (see quiz/video_navigation.py); only the detail view needs the videos
+        queryset = VideoCourse.objects.filter(is_active=True).order_by('order', 'title')
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('videos')
+        return queryset
     
     def list(self, request, *args, **kwargs):
         """List all courses with caching."""
@@ -300,6 +311,15 @@ class VideoCourseViewSet(viewsets.ReadOnlyModelViewSet):
         return add_cache_headers(response, max_age=300, public=False)
 
 
+def _heartbeat_payload(entry):
+    duration = entry['duration']
+    return {
+        'watched_seconds': entry['watched'],
+        'progress_percentage': min(100, int(entry['watched'] / duration * 100)) if duration else 0,
+        'is_completed': entry['completed'],
+    }
+
+
 class VideoViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for individual videos.
@@ -315,32 +335,11 @@ class VideoViewSet(viewsets.ReadOnlyModelViewSet):
     
     def retrieve(self, request, *args, **kwargs):
         """
-        OPTIMIZED: Precompute navigation and progress data to avoid multiple queries.
+        OPTIMIZED: Precompute progress data to avoid multiple queries.
+        Navigation comes from the cached course video order (quiz/video_navigation.py).
         """
         video = self.get_object()
-        
-        # Get all videos in course in ONE query for navigation
-        course_videos = list(Video.objects.filter(
-            course=video.course,
-            is_active=True
-        ).order_by('order').values_list('id', 'order'))
-        
-        # Find video position and nav
-        video_ids = [v[0] for v in course_videos]
-        video_orders = {v[0]: v[1] for v in course_videos}
-        
-        try:
-            idx = video_ids.index(video.id)
-            video._video_number = idx + 1
-            video._total_course_videos = len(video_ids)
-            video._next_video_id = video_ids[idx + 1] if idx + 1 < len(video_ids) else None
-            video._previous_video_id = video_ids[idx - 1] if idx > 0 else None
-        except ValueError:
-            video._video_number = 1
-            video._total_course_videos = len(video_ids)
-            video._next_video_id = None
-            video._previous_video_id = None
-        
+
         # Cache progress
         if request.user.is_authenticated:
             progress = VideoProgress.objects.filter(
@@ -356,45 +355,44 @@ class VideoViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['post'])
     def update_progress(self, request, pk=None):
         """
-        Update video watch progress.
+        Update video watch progress (buffered, see quiz/video_progress_buffer.py).
         POST /api/videos/<id>/update_progress/
         Body: { "watched_seconds": 120 }
         """
-        video = self.get_object()
         watched_seconds = request.data.get('watched_seconds', 0)
 
         try:
             watched_seconds = int(watched_seconds)
+            video_id = int(pk)
         except (TypeError, ValueError):
             return Response(
                 {'error': 'watched_seconds must be an integer'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        progress, created = VideoProgress.objects.get_or_create(
-            user=request.user,
-            video=video,
-            defaults={'watched_seconds': watched_seconds}
-        )
+        entry = record_heartbeats(request.user.id, [(video_id, watched_seconds)]).get(video_id)
+        if entry is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        if not created:
-            # Only update if new position is further than before
-            if watched_seconds > progress.watched_seconds:
-                progress.watched_seconds = watched_seconds
-                progress.save()
+        return Response(_heartbeat_payload(entry))
 
-        # Update course progress last video
-        course_progress, _ = CourseProgress.objects.get_or_create(
-            user=request.user,
-            course=video.course
-        )
-        course_progress.last_video = video
-        course_progress.save()
+    @action(detail=False, methods=['post'])
+    def heartbeats(self, request):
+        """
+        Buffer several watch heartbeats at once.
+        POST /api/videos/heartbeats/
+        Body: { "heartbeats": [{ "video_id": 1, "watched_seconds": 120 }, ...] }
+        """
+        serializer = HeartbeatBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        entries = record_heartbeats(
+            request.user.id,
+            [(item['video_id'], item['watched_seconds']) for item in serializer.validated_data['heartbeats']],
+        )
         return Response({
-            'watched_seconds': progress.watched_seconds,
-            'progress_percentage': progress.progress_percentage,
-            'is_completed': progress.is_completed
+            str(video_id): _heartbeat_payload(entry) for video_id, entry in entries.items()
         })
 
     @action(detail=True, methods=['post'])
@@ -409,10 +407,14 @@ class VideoViewSet(viewsets.ReadOnlyModelViewSet):
             user=request.user,
             video=video
         )
+        if not progress.is_completed:
+            record_activity(request.user.id, videos_completed=1)
         progress.watched_seconds = video.duration_seconds
         progress.is_completed = True
         progress.completed_at = timezone.now()
         progress.save()
+        mark_completed(request.user.id, video.id, video.duration_seconds)
+        record_videos({request.user.id: (video.course_id, video.id, True)})
 
         # Update course progress
         course_progress, _ = CourseProgress.objects.get_or_create(
@@ -496,10 +498,8 @@ class VideoProgressViewSet(viewsets.ViewSet):
         total_courses = VideoCourse.objects.filter(is_active=True).count()
         courses_started = CourseProgress.objects.filter(user=user).count()
         courses_completed = CourseProgress.objects.filter(
-            user=user
-        ).annotate(
-            total=models.Count('course__videos', filter=models.Q(course__videos__is_active=True))
-        ).filter(videos_completed=models.F('total')).count()
+            user=user, videos_completed=models.F('course__total_videos')
+        ).count()
 
         # Total watch time in seconds
         total_watched = VideoProgress.objects.filter(user=user).aggregate(
@@ -544,47 +544,20 @@ class VideoProgressViewSet(viewsets.ViewSet):
         
         Performance: Uses caching + minimal database queries
         """
-        from django.core.cache import cache
-        
         user = request.user
         
-        # Check cache for course and video data (static - cache for 30 minutes)
-        cache_key = 'video_page_courses'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            courses = cached_data['courses']
-            first_videos = cached_data['first_videos']
-            course_videos = cached_data['course_videos']
-        else:
-            # Query 1: Get all courses with video counts AND total duration
-            courses = list(VideoCourse.objects.filter(is_active=True).annotate(
-                video_count=models.Count('videos', filter=models.Q(videos__is_active=True)),
-                total_duration=models.Sum('videos__duration_seconds', filter=models.Q(videos__is_active=True))
-            ).values(
-                'id', 'title', 'slug', 'category', 'description', 
-                'thumbnail_url', 'order', 'video_count', 'total_duration'
-            ).order_by('order', 'title'))
-            
-            # Query 2: Get ALL videos in one query
-            first_videos = {}
-            course_videos = {}
-            for video in Video.objects.filter(is_active=True).values(
-                'id', 'course_id', 'order'
-            ).order_by('course_id', 'order'):
-                course_id = video['course_id']
-                if course_id not in first_videos:
-                    first_videos[course_id] = video['id']
-                if course_id not in course_videos:
-                    course_videos[course_id] = []
-                course_videos[course_id].append(video['id'])
-            
-            # Cache static data for 30 minutes
-            cache.set(cache_key, {
-                'courses': courses,
-                'first_videos': first_videos,
-                'course_videos': course_videos
-            }, 1800)
+        # Query 1: Get all courses with their stored video counts and total duration
+        # (cached until a course or video changes)
+        courses = get_or_set('video_page_courses', [CATALOG_VIDEOS], lambda: list(
+            VideoCourse.objects.filter(is_active=True).values(
+                'id', 'title', 'slug', 'category', 'description', 'thumbnail_url', 'order',
+                video_count=models.F('total_videos'),
+                total_duration=models.F('total_duration_seconds'),
+            ).order_by('order', 'title')
+        ), local=True)
+
+        # Ordered video IDs per course (cached, invalidated on Video changes)
+        course_videos = get_course_video_ids_many(course['id'] for course in courses)
         
         # User progress (not cached - must be fresh)
         all_progress = {}
@@ -637,15 +610,10 @@ class VideoProgressViewSet(viewsets.ViewSet):
             total_videos = course['video_count'] or 0
             total_duration = course['total_duration'] or 0
             
-            # Calculate first unwatched video
-            first_video_id = first_videos.get(course_id)
-            next_video_id = first_video_id
-            
-            if completed_ids and course_id in course_videos:
-                for vid_id in course_videos[course_id]:
-                    if vid_id not in completed_ids:
-                        next_video_id = vid_id
-                        break
+            # First video, and first unwatched video from the completed bitmap
+            video_ids = course_videos.get(course_id, ())
+            first_video_id = video_ids[0] if video_ids else None
+            next_video_id = first_unwatched(video_ids, completed_bitmap(video_ids, completed_ids))
             
             # Format duration
             hours = total_duration // 3600
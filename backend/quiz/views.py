@@ -22,6 +22,11 @@ from .serializers import (
     QuestionForAttemptSerializer, QuestionAnswerSubmitSerializer, ReviewSerializer, ReviewCreateSerializer
 )
 from .csv_parser import CSVQuestionParser
+from .answer_keys import get_exam_answer_key, get_exam_question_feedback
+from .rescoring import rescore_exam
+from .score_percentiles import record_score, get_percentile
+from .activity import PASS_SCORE, record_activity
+from .snapshot_service import get_snapshot_bytes, snapshot_response, review_response
 from logging_utils import ViewLoggingMixin, log_queryset_access
 
 
@@ -69,6 +74,24 @@ class ExamViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = QuestionDetailSerializer(questions, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    def rescore(self, request, pk=None):
+        """
+        Recompute answer correctness and scores for all attempts of this exam.
+        POST body: {"dry_run": false}
+        """
+        exam = self.get_object()
+        dry_run = str(request.data.get('dry_run', False)).lower() in ('1', 'true', 'yes')
+        try:
+            result = rescore_exam(exam.id, dry_run=dry_run)
+        except OperationalError as e:
+            logger.error(f"Database error rescoring exam {exam.id}: {str(e)}")
+            return Response(
+                {'error': 'Database connection error. Please try again.', 'success': False},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response({'success': True, **result})
+
     @action(detail=False, methods=['get'])
     def config(self, request):
         """Get global exam timing configuration"""
@@ -361,6 +384,7 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
                 speed_reader_enabled=serializer.validated_data.get('speed_reader_enabled', False)
             )
             logger.info(f"[TIMING] [3] Create attempt DB: {(time.time() - step_start)*1000:.2f}ms")
+            record_activity(request.user.id, attempt.started_at, exams_started=1)
             
             # Step 4: Select ALL questions for the exam in order
             step_start = time.time()
@@ -414,6 +438,7 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
         Full details are fetched separately on the results page
         """
         attempt = self.get_object()
+        was_completed = attempt.status == 'completed'
         
         # Update attempt details
         serializer = self.get_serializer(attempt, data=request.data, partial=True)
@@ -426,6 +451,18 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
             attempt.ended_at = timezone.now()
             attempt.score = attempt.calculate_score()
             attempt.save()
+            
+            # Count each attempt once in the exam's score distribution and daily activity
+            if not was_completed:
+                record_score(attempt.exam_id, attempt.score)
+                record_activity(
+                    attempt.user_id, attempt.ended_at,
+                    exams_completed=1,
+                    exams_scored=1 if attempt.score is not None else 0,
+                    exams_passed=1 if attempt.score is not None and attempt.score >= PASS_SCORE else 0,
+                    exam_score_sum=attempt.score or 0,
+                    exam_seconds=attempt.time_spent_seconds or 0,
+                )
         
         # OPTIMIZED: Return minimal response - just what's needed for redirect
         # Full review data is fetched on the results page via /review/ endpoint
@@ -497,25 +534,29 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
         OPTIMIZED: Get questions using pre-serialized snapshot.
         
         Performance: ~50ms vs 17 seconds for regular questions endpoint.
+        The snapshot is served from cached, pre-encoded (gzip) bytes so the
+        JSON blob is never decoded or re-rendered on the request path.
         Falls back to regular questions endpoint if no snapshot.
         """
         try:
             start_time = time.time()
             
-            # Get attempt with exam relation
-            attempt = ExamAttempt.objects.select_related('exam').get(id=pk, user=request.user)
+            # Get attempt with exam relation (without loading the snapshot blob)
+            attempt = ExamAttempt.objects.select_related('exam').defer(
+                'exam__questions_snapshot'
+            ).get(id=pk, user=request.user)
             
-            # Get pre-serialized snapshot
-            snapshot = attempt.exam.questions_snapshot
-            if not snapshot:
+            # Get pre-encoded snapshot bytes
+            entry = get_snapshot_bytes(attempt.exam_id, attempt.exam.snapshot_version)
+            if not entry:
                 # Fallback to regular questions if no snapshot
-                logger.warning(f"No snapshot for exam {attempt.exam.id}, falling back to regular questions")
+                logger.warning(f"No snapshot for exam {attempt.exam_id}, falling back to regular questions")
                 return self.questions(request, pk)
             
             total_time = (time.time() - start_time) * 1000
-            logger.debug(f"[GET_QUESTIONS_FAST] Attempt {pk} - Total: {total_time:.2f}ms | Questions: {len(snapshot)}")
+            logger.debug(f"[GET_QUESTIONS_FAST] Attempt {pk} - Total: {total_time:.2f}ms | Questions: {entry['count']}")
             
-            return Response(snapshot)
+            return snapshot_response(entry, request)
         except ExamAttempt.DoesNotExist:
             if ExamAttempt.objects.filter(id=pk).exists():
                 return Response(
@@ -583,12 +624,22 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            question = get_object_or_404(Question, id=question_id, exam_id=attempt.exam_id)
+            # Validate against the cached answer key (no question query)
+            answer_key = get_exam_answer_key(attempt.exam_id)
+            try:
+                question_id = int(question_id)
+            except (TypeError, ValueError):
+                question_id = None
+            if question_id not in answer_key:
+                return Response(
+                    {'error': 'Question not found in this exam', 'success': False},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             
-            # Create or update answer
+            # Create or update answer (graded from the answer key in QuestionAnswer.save)
             answer, created = QuestionAnswer.objects.update_or_create(
                 exam_attempt=attempt,
-                question=question,
+                question_id=question_id,
                 defaults={
                     'selected_answer': selected_answer,
                     'time_spent_seconds': time_spent_seconds
@@ -597,12 +648,22 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
             
             logger.info(f"Answer submitted for question {question_id} in attempt {attempt.id}")
             
-            # Refresh answer to include full question data
-            answer = QuestionAnswer.objects.select_related('question').get(id=answer.id)
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            # Full question data for the feedback payload, cached with the answer key
+            question_data = get_exam_question_feedback(attempt.exam_id, question_id)
+            if question_data is None:
+                answer.question = Question.objects.prefetch_related('options').get(id=question_id)
+                return Response(QuestionAnswerSubmitSerializer(answer).data, status=response_status)
             
-            # Use submit serializer that includes full question with answers
-            serializer = QuestionAnswerSubmitSerializer(answer)
-            return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+            # Same shape as QuestionAnswerSubmitSerializer
+            return Response({
+                'id': answer.id,
+                'exam_attempt': attempt.id,
+                'question': question_data,
+                'selected_answer': answer.selected_answer,
+                'is_correct': answer.is_correct,
+                'time_spent_seconds': int(answer.time_spent_seconds or 0),
+            }, status=response_status)
         except OperationalError as e:
             logger.error(f"Database connection error submitting answer: {str(e)}")
             return Response(
@@ -701,13 +762,18 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
         - attempt: Attempt metadata (id, score, status, timestamps)
         - questions: Pre-serialized question data from exam.questions_snapshot
         - answers: Dict of {question_id: {selected, is_correct}}
+        
+        The questions are spliced in from cached pre-encoded bytes; only the
+        small attempt/answers fragments are encoded per request.
         """
         try:
             start_time = time.time()
             
             # Check if user owns this attempt
             try:
-                attempt = ExamAttempt.objects.select_related('exam').get(id=pk, user=request.user)
+                attempt = ExamAttempt.objects.select_related('exam').defer(
+                    'exam__questions_snapshot'
+                ).get(id=pk, user=request.user)
             except ExamAttempt.DoesNotExist:
                 # Check if attempt exists but belongs to someone else
                 if ExamAttempt.objects.filter(id=pk).exists():
@@ -720,50 +786,51 @@ class ExamAttemptViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Get pre-serialized snapshot (no DB query for questions!)
-            snapshot = attempt.exam.questions_snapshot
-            if not snapshot:
+            # Get pre-encoded snapshot (no DB query for questions on a cache hit)
+            entry = get_snapshot_bytes(attempt.exam_id, attempt.exam.snapshot_version)
+            if not entry:
                 # Fallback to regular review if no snapshot exists
-                logger.warning(f"No snapshot for exam {attempt.exam.id}, falling back to regular review")
+                logger.warning(f"No snapshot for exam {attempt.exam_id}, falling back to regular review")
                 return self.review(request, pk)
             
             # Get user answers (lightweight query - just this attempt's answers)
             answers_qs = QuestionAnswer.objects.filter(exam_attempt=attempt).values(
                 'question_id', 'selected_answer', 'is_correct'
             )
+            # Stored grades, like attempt.score (rescore_exam updates both when a key changes)
             answers = {
                 a['question_id']: {
                     'selected': a['selected_answer'],
-                    'is_correct': a['is_correct']
+                    'is_correct': a['is_correct'],
                 }
                 for a in answers_qs
             }
             
             # Calculate stats
-            total_questions = len(snapshot)
+            total_questions = entry['count']
             correct_count = sum(1 for a in answers.values() if a['is_correct'])
             
             total_time = (time.time() - start_time) * 1000
             logger.debug(f"[GET_REVIEW_FAST] Attempt {pk} - Total: {total_time:.2f}ms | Questions: {total_questions} | Answers: {len(answers)}")
             
-            return Response({
-                'attempt': {
-                    'id': attempt.id,
-                    'exam_id': attempt.exam.id,
-                    'exam_title': attempt.exam.title,
-                    'status': attempt.status,
-                    'score': attempt.score,
-                    'started_at': attempt.started_at.isoformat() if attempt.started_at else None,
-                    'ended_at': attempt.ended_at.isoformat() if attempt.ended_at else None,
-                    'time_spent_seconds': attempt.time_spent_seconds,
-                    'total_questions': total_questions,
-                    'correct_count': correct_count,
-                    'incorrect_count': len(answers) - correct_count,
-                    'unanswered_count': total_questions - len(answers),
-                },
-                'questions': snapshot,
-                'answers': answers,
-            })
+            return review_response(entry, request, {
+                'id': attempt.id,
+                'exam_id': attempt.exam_id,
+                'exam_title': attempt.exam.title,
+                'status': attempt.status,
+                'score': attempt.score,
+                'started_at': attempt.started_at.isoformat() if attempt.started_at else None,
+                'ended_at': attempt.ended_at.isoformat() if attempt.ended_at else None,
+                'time_spent_seconds': attempt.time_spent_seconds,
+                'total_questions': total_questions,
+                'correct_count': correct_count,
+                'incorrect_count': len(answers) - correct_count,
+                'unanswered_count': total_questions - len(answers),
+                'percentile': (
+                    get_percentile(attempt.exam_id, attempt.score)
+                    if attempt.status == 'completed' else None
+                ),
+            }, answers)
         except Exception as e:
             logger.error(f"Error retrieving fast review: {str(e)}")
             return Response(